@@ -0,0 +1 @@
+"""Banc de mesure des endpoints critiques : python -m bench.run --help"""
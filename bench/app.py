@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.factory import create_app as create_production_app
+
+
+def create_app(workdir, config=None):
+    """
+    App de production (src/factory.py), base SQLite jetable dans `workdir` :
+    pas de threads en tâche de fond ni de compte admin par défaut (le jeu de
+    données fournit le sien), cookies de session acceptés en HTTP. `config`
+    complète ou remplace ces réglages (profil SQLite, réplica...).
+    """
+    return create_production_app({
+        'SECRET_KEY': 'bench',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'UPLOAD_DIR': os.path.join(workdir, 'uploads'),
+        'SESSION_STORE': 'sqlite',
+        'SESSION_DB_PATH': os.path.join(workdir, 'sessions.db'),
+        'SESSION_COOKIE_SECURE': False,
+        'BACKGROUND_TASKS': False,
+        'CREATE_DEFAULT_ADMIN': False,
+        **(config or {}),
+    })
@@ -0,0 +1,137 @@
+"""
+Acceptations concurrentes d'un même devis / d'une même demande.
+
+    python -m bench.race --rounds 50 --acceptors 8
+
+À chaque tour : une demande à N devis, N threads (clients HTTP du même
+client) acceptent chacun un devis différent au même instant. Attendu :
+une seule réponse 200, les autres 409, un seul devis accepté, tous les
+autres rejetés, version incrémentée une fois, compteurs du tableau de
+bord cohérents. Code retour 1 à la première incohérence.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from bench.app import create_app
+from bench.seed import seed
+from src.models.user import db, RepairRequest, Quote
+from src.services import image_pipeline, stats
+
+
+def _new_request(client_id, repairers, quotes):
+    now = datetime.utcnow()
+    # Demande par l'ORM : les compteurs du tableau de bord la prennent en compte
+    repair_request = RepairRequest(
+        title='Course aux devis', description='Acceptations simultanées', category='bike',
+        city='Paris', status='quoted', client_id=client_id,
+    )
+    db.session.add(repair_request)
+    db.session.flush()
+    request_id = repair_request.id
+    db.session.execute(db.insert(Quote), [{
+        'repair_request_id': request_id, 'repairer_id': repairers[i % len(repairers)],
+        'price': 5000 + i, 'estimated_duration': '1 jour', 'conditions': '',
+        'location_type': 'atelier', 'status': 'pending', 'created_at': now,
+    } for i in range(quotes)])
+    db.session.commit()
+    quote_ids = [q for (q,) in db.session.query(Quote.id).filter_by(repair_request_id=request_id).order_by(Quote.id)]
+    return request_id, quote_ids
+
+
+def run_round(app, client_id, quote_ids, same_quote=False):
+    barrier = threading.Barrier(len(quote_ids))
+    statuses = [None] * len(quote_ids)
+
+    def accept(index):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = client_id
+        target = quote_ids[0] if same_quote else quote_ids[index]
+        barrier.wait()
+        statuses[index] = client.post(f'/api/repairs/quotes/{target}/accept').status_code
+
+    threads = [threading.Thread(target=accept, args=(i,)) for i in range(len(quote_ids))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def check(request_id, statuses):
+    """Liste des incohérences après un tour (vide si tout va bien)"""
+    problems = []
+    codes = Counter(statuses)
+    if codes[200] != 1 or codes[200] + codes[409] != len(statuses):
+        problems.append(f'réponses {dict(codes)} (attendu : une 200, le reste 409)')
+
+    db.session.expire_all()
+    repair_request = db.session.get(RepairRequest, request_id)
+    quotes = Counter(s for (s,) in db.session.query(Quote.status).filter_by(repair_request_id=request_id))
+    if repair_request.status != 'accepted' or repair_request.version != 2:
+        problems.append(f'demande {repair_request.status} v{repair_request.version} (attendu : accepted v2)')
+    if quotes['accepted'] != 1 or quotes['rejected'] != sum(quotes.values()) - 1:
+        problems.append(f'devis {dict(quotes)}')
+    winner = db.session.get(Quote, repair_request.accepted_quote_id)
+    if winner is None or winner.status != 'accepted':
+        problems.append('accepted_quote_id ne désigne pas le devis accepté')
+    return problems
+
+
+def check_counters():
+    counters = stats.read_counters()
+    actual = dict(db.session.query(RepairRequest.status, db.func.count()).group_by(RepairRequest.status).all())
+    return [
+        f'compteur requests.status.{status} = {counters.get(f"requests.status.{status}", 0)}, réel {count}'
+        for status, count in actual.items()
+        if counters.get(f'requests.status.{status}', 0) != count
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Acceptations de devis concurrentes')
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--acceptors', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='reparetout-race-')
+    failures = 0
+    try:
+        app = create_app(workdir)
+        with app.app_context():
+            ids = seed(users=30, requests=10, quotes=0, images=0)
+        client_id = ids['clients'][0]
+
+        for round_number in range(args.rounds):
+            # Un tour sur deux : tous les threads visent le même devis
+            same_quote = round_number % 2 == 1
+            with app.app_context():
+                request_id, quote_ids = _new_request(client_id, ids['repairers'], args.acceptors)
+            statuses = run_round(app, client_id, quote_ids, same_quote)
+            with app.app_context():
+                problems = check(request_id, statuses)
+            if problems:
+                failures += 1
+                print(f'tour {round_number} : ' + ' ; '.join(problems))
+
+        with app.app_context():
+            problems = check_counters()
+        for problem in problems:
+            print(problem)
+        failures += len(problems)
+    finally:
+        image_pipeline.shutdown(wait=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f'{args.rounds} tours × {args.acceptors} acceptations simultanées : '
+          f'{"OK" if not failures else f"{failures} incohérence(s)"}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
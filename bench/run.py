@@ -0,0 +1,634 @@
+"""
+Banc de mesure des endpoints critiques (client de test Flask, base SQLite jetable).
+
+    python -m bench.run --scale small
+    python -m bench.run --scale medium --json-out bench-results.json
+    python -m bench.run --save-baseline bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json   # code retour 1 si régression
+    python -m bench.run --concurrency --readers 1 4 8 --writers 2
+    python -m bench.run --concurrency --profiles --save-baseline bench/baseline.json   # connexions seules
+
+Par endpoint : débit, latences p50/p95/p99 et nombre de requêtes SQL.
+Avec --concurrency : débit en lecture / écriture de plusieurs process
+simultanés (workers gunicorn) sur la même base, selon le profil SQLite et
+le routage des lectures vers un réplica ; puis rafales de connexions
+(/api/auth/login) sur un worker, hachage dans le pool de process ou dans
+le thread de la requête : p99 et réponses 429.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+# Cache de réponses désactivé par défaut : on mesure le vrai travail (voir --response-cache)
+if '--response-cache' not in sys.argv:
+    os.environ.setdefault('RESPONSE_CACHE_TTL', '0')
+
+from sqlalchemy import event  # noqa: E402
+
+from bench.app import create_app  # noqa: E402
+from bench.seed import PASSWORD, SCALES, seed  # noqa: E402
+from src.models.user import db, RepairRequest, Quote, User  # noqa: E402
+from src.services import image_pipeline, passwords  # noqa: E402
+
+
+class Context:
+    """État partagé par les scénarios (clients HTTP connectés, identifiants du jeu de données)"""
+
+    def __init__(self, app, ids):
+        self.app = app
+        self.ids = ids
+        self.rng = random.Random(7)
+        self.anonymous = app.test_client()
+        self.admin = self.login(ids['admin'])
+        self.client = self.login(ids['clients'][0])
+        self.repairer = self.login(ids['repairers'][0])
+        with app.app_context():
+            self.request_ids = [r for (r,) in db.session.query(RepairRequest.id)]
+            self.open_requests = [r for (r,) in db.session.query(RepairRequest.id).filter_by(status='open')]
+            self.pending_quotes = [
+                tuple(row) for row in db.session.query(Quote.id, RepairRequest.id, RepairRequest.client_id)
+                .join(RepairRequest, Quote.repair_request_id == RepairRequest.id)
+                .filter(RepairRequest.status == 'quoted', Quote.status == 'pending')
+            ]
+        self.crowded = list(ids['crowded'])
+        crowded_ids = {request_id for request_id, _, _ in self.crowded}
+        self.pending_quotes = [row for row in self.pending_quotes if row[1] not in crowded_ids]
+        self.rng.shuffle(self.open_requests)
+        self.rng.shuffle(self.pending_quotes)
+        self.feed_cursor = self.anonymous.get('/api/repairs/requests?limit=20').get_json()['next_cursor']
+
+    def login(self, user_id):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        return client
+
+
+def _png_bytes(rng, width=120, height=60):
+    # PNG valide (pixels aléatoires) sans Pillow : le contenu est analysé à la réception
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+def _image_bytes(rng):
+    # Contenu unique à chaque envoi (pas de déduplication par SHA-256)
+    try:
+        from PIL import Image
+    except ImportError:
+        return _png_bytes(rng)
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), tuple(rng.randrange(256) for _ in range(3))).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+# Chaque scénario : (nom, code attendu, préparation) ; la préparation (non
+# chronométrée) retourne (client, méthode, url, kwargs)
+def _feed(ctx):
+    return ctx.anonymous, 'get', '/api/repairs/requests?limit=20', {}
+
+
+def _feed_filters(ctx):
+    return ctx.anonymous, 'get', '/api/repairs/requests?limit=20&status=open&category=electronics', {}
+
+
+def _feed_page2(ctx):
+    return ctx.anonymous, 'get', f'/api/repairs/requests?limit=20&cursor={ctx.feed_cursor}', {}
+
+
+def _feed_search(ctx):
+    term = ctx.rng.choice(['écran', 'lave-linge', 'vélo cassé', 'machine café', 'fuit'])
+    return ctx.anonymous, 'get', f'/api/repairs/requests?limit=20&search={term}', {}
+
+
+def _feed_geo(ctx):
+    return ctx.anonymous, 'get', '/api/repairs/requests?limit=20&lat=48.8566&lng=2.3522&radius_km=10', {}
+
+
+def _request_detail(ctx):
+    return ctx.anonymous, 'get', f'/api/repairs/requests/{ctx.rng.choice(ctx.request_ids)}', {}
+
+
+def _create_request(ctx):
+    data = {
+        'title': 'Écran fissuré', 'description': 'Chute du téléphone', 'category': 'electronics',
+        'city': 'Paris', 'budget': '80',
+        'photo': (io.BytesIO(_image_bytes(ctx.rng)), 'photo.jpg'),
+    }
+    return ctx.client, 'post', '/api/repairs/requests', {'data': data, 'content_type': 'multipart/form-data'}
+
+
+def _create_quote(ctx):
+    request_id = ctx.open_requests.pop()
+    payload = {'price': 120, 'estimated_duration': '2 jours', 'location_type': 'atelier'}
+    return ctx.repairer, 'post', f'/api/repairs/requests/{request_id}/quotes', {'json': payload}
+
+
+def _accept_quote(ctx):
+    quote_id, request_id, client_id = ctx.pending_quotes.pop()
+    # Les autres devis de la même demande seront rejetés
+    ctx.pending_quotes = [row for row in ctx.pending_quotes if row[1] != request_id]
+    return ctx.login(client_id), 'post', f'/api/repairs/quotes/{quote_id}/accept', {}
+
+
+def _accept_quote_crowded(ctx):
+    # Demande à plusieurs centaines de devis : un UPDATE pour tous les rejeter
+    request_id, quote_id, client_id = ctx.crowded.pop()
+    return ctx.login(client_id), 'post', f'/api/repairs/quotes/{quote_id}/accept', {}
+
+
+def _my_requests(ctx):
+    return ctx.client, 'get', '/api/repairs/my-requests', {}
+
+
+def _my_quotes(ctx):
+    return ctx.repairer, 'get', '/api/repairs/my-quotes', {}
+
+
+def _admin(path):
+    def prepare(ctx):
+        return ctx.admin, 'get', path, {}
+    return prepare
+
+
+SCENARIOS = [
+    ('feed', 200, _feed),
+    ('feed_filters', 200, _feed_filters),
+    ('feed_page2', 200, _feed_page2),
+    ('feed_search', 200, _feed_search),
+    ('feed_geo', 200, _feed_geo),
+    ('request_detail', 200, _request_detail),
+    ('create_request_upload', 201, _create_request),
+    ('create_quote', 201, _create_quote),
+    ('accept_quote', 200, _accept_quote),
+    ('accept_quote_crowded', 200, _accept_quote_crowded),
+    ('my_requests', 200, _my_requests),
+    ('my_quotes', 200, _my_quotes),
+    ('admin_dashboard', 200, _admin('/api/admin/dashboard')),
+    ('admin_users', 200, _admin('/api/admin/users?limit=50')),
+    ('admin_requests', 200, _admin('/api/admin/requests?limit=50&status=open')),
+    ('admin_quotes', 200, _admin('/api/admin/quotes?limit=50')),
+]
+
+
+def _percentile(values, p):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+def run_scenario(ctx, prepare, expected, iterations, warmup):
+    queries = [0]
+
+    def count(*_args):
+        queries[0] += 1
+
+    with ctx.app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    latencies, query_counts, errors = [], [], 0
+    try:
+        started = time.perf_counter()
+        measured = 0.0
+        for i in range(warmup + iterations):
+            try:
+                client, method, url, kwargs = prepare(ctx)
+            except IndexError:
+                break  # plus de données disponibles (demandes ouvertes, devis...)
+            queries[0] = 0
+            t0 = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            elapsed = time.perf_counter() - t0
+            if i < warmup:
+                continue
+            measured += elapsed
+            latencies.append(elapsed * 1000)
+            query_counts.append(queries[0])
+            if response.status_code != expected:
+                errors += 1
+        wall = time.perf_counter() - started
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    if not latencies:
+        return None
+    return {
+        'n': len(latencies),
+        'rps': round(len(latencies) / measured, 1) if measured else None,
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p95_ms': round(_percentile(latencies, 95), 2),
+        'p99_ms': round(_percentile(latencies, 99), 2),
+        'queries': int(statistics.median(query_counts)),
+        'queries_max': max(query_counts),
+        'errors': errors,
+        'wall_s': round(wall, 2),
+    }
+
+
+def compare(results, baseline, tolerance, floor_ms=2.0):
+    """Régressions : plus de requêtes SQL, ou p95 au-delà de la tolérance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or current is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: requêtes SQL {previous['queries']} -> {current['queries']}")
+        limit = previous['p95_ms'] * (1 + tolerance)
+        if current['p95_ms'] > limit and current['p95_ms'] - previous['p95_ms'] > floor_ms:
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+    return regressions
+
+
+def print_table(results):
+    header = f"{'endpoint':24} {'n':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL':>5} {'err':>4}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        if r is None:
+            print(f'{name:24} (pas de données)')
+            continue
+        print(f"{name:24} {r['n']:5d} {r['rps']:8.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+              f"{r['p99_ms']:8.2f} {r['queries']:5d} {r['errors']:4d}")
+
+
+# ---------------------------------------------------------------------------
+# Concurrence : N process lecteurs (endpoints @read_only : fil, détail d'une
+# demande) et M process écrivains (création de demandes avec photo) sur la
+# même base, pendant `duration` secondes, comme N + M workers gunicorn. La
+# photo est toujours la même : déjà traitée avant la mesure, ses miniatures
+# sont réutilisées (pas de pool de process d'images dans les écrivains).
+# ---------------------------------------------------------------------------
+
+# Profils comparés : SQLite par défaut, profil de production (WAL, pragmas),
+# et lectures routées vers un réplica (ici la même base, ouverte en lecture
+# seule : pool de connexions séparé, toute écriture par le réplica échoue)
+def _replica_config(workdir):
+    url = f"sqlite:///file:{os.path.join(workdir, 'bench.db')}?mode=ro&uri=true"
+    return {'SQLALCHEMY_BINDS': {'replica': {'url': url}}}
+
+
+CONCURRENCY_PROFILES = {
+    'default': lambda workdir: {'SQLITE_TUNING': 'off'},
+    'tuned': lambda workdir: {},
+    'replica': _replica_config,
+}
+
+
+def _new_request_form(photo):
+    return {
+        'title': 'Lampe', 'description': 'Ne s\'allume plus', 'category': 'other', 'city': 'Lyon',
+        'photo': (io.BytesIO(photo), 'lampe.jpg'),
+    }
+
+
+def _concurrency_worker(workdir, config, role, user_id, request_ids, photo, duration, barrier, queue):
+    app = create_app(workdir, config)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    try:
+        barrier.wait(timeout=120)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            if role == 'write':
+                kwargs = {'data': _new_request_form(photo), 'content_type': 'multipart/form-data'}
+                method, url, expected = 'post', '/api/repairs/requests', 201
+            elif rng.random() < 0.5:
+                method, url, kwargs, expected = 'get', '/api/repairs/requests?limit=20', {}, 200
+            else:
+                method, url, kwargs, expected = 'get', f'/api/repairs/requests/{rng.choice(request_ids)}', {}, 200
+            t0 = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if response.status_code != expected:
+                errors += 1
+    finally:
+        queue.put((role, latencies, errors))
+
+
+def run_concurrency(profile, volumes, readers_counts, writers, duration):
+    """Une ligne de résultats par nombre de lecteurs, base fraîche pour le profil"""
+    workdir = tempfile.mkdtemp(prefix=f'reparetout-bench-{profile}-')
+    try:
+        config = CONCURRENCY_PROFILES[profile](workdir)
+        # Jeu de données créé sans réplica : le mode du journal (WAL ou non) est
+        # fixé par le premier process qui écrit dans la base
+        app = create_app(workdir, {k: v for k, v in config.items() if k != 'SQLALCHEMY_BINDS'})
+        with app.app_context():
+            ids = seed(**volumes)
+            request_ids = [r for (r,) in db.session.query(RepairRequest.id)]
+        photo = _image_bytes(random.Random(7))
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = ids['clients'][0]
+        client.post('/api/repairs/requests', data=_new_request_form(photo), content_type='multipart/form-data')
+        image_pipeline.shutdown(wait=True)
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+        # spawn : chaque process construit son app, comme un worker gunicorn
+        mp = multiprocessing.get_context('spawn')
+        rows = []
+        for readers in readers_counts:
+            barrier = mp.Barrier(readers + writers + 1)
+            queue = mp.Queue()
+            roles = ['read'] * readers + ['write'] * writers
+            processes = [
+                mp.Process(target=_concurrency_worker, args=(
+                    workdir, config, role, ids['clients'][i % len(ids['clients'])],
+                    request_ids, photo, duration, barrier, queue,
+                ))
+                for i, role in enumerate(roles)
+            ]
+            for process in processes:
+                process.start()
+            barrier.wait(timeout=120)
+            measured = {'read': [], 'write': []}
+            errors = 0
+            for _ in processes:
+                role, latencies, failed = queue.get()
+                measured[role].extend(latencies)
+                errors += failed
+            for process in processes:
+                process.join()
+            row = {'profile': profile, 'readers': readers, 'writers': writers, 'errors': errors}
+            for role, values in measured.items():
+                row[f'{role}s_per_s'] = round(len(values) / duration, 1)
+                row[f'{role}_p95_ms'] = round(_percentile(values, 95), 2) if values else None
+            rows.append(row)
+            print_concurrency_row(row)
+        return rows
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_concurrency_header():
+    header = (f"{'profil':10} {'lect.':>5} {'écr.':>5} {'lect./s':>9} {'écr./s':>8} "
+              f"{'p95 lect.':>10} {'p95 écr.':>9} {'err':>5}")
+    print(header)
+    print('-' * len(header))
+
+
+def print_concurrency_row(row):
+    def ms(value):
+        return f'{value:.2f}' if value is not None else '-'
+    print(f"{row['profile']:10} {row['readers']:5d} {row['writers']:5d} {row['reads_per_s']:9.1f} "
+          f"{row['writes_per_s']:8.1f} {ms(row['read_p95_ms']):>10} {ms(row['write_p95_ms']):>9} {row['errors']:5d}")
+
+
+# ---------------------------------------------------------------------------
+# Rafales de connexions : C clients simultanés sur un même worker web font
+# chacun K appels à /api/auth/login. Hachage dans le pool de process
+# (PASSWORD_WORKERS, 429 au-delà de PASSWORD_MAX_PENDING) ou dans le thread
+# de la requête (PASSWORD_WORKERS=0). Un process par mesure : les réglages
+# de src/services/passwords.py sont lus à l'import.
+# ---------------------------------------------------------------------------
+
+LOGIN_MODES = {
+    'pool': {},
+    'inline': {'PASSWORD_WORKERS': '0'},
+}
+
+
+def _login_worker(workdir, emails, clients, per_client, queue):
+    app = create_app(workdir)
+    payloads = [{'email': emails[i % len(emails)], 'password': PASSWORD} for i in range(clients)]
+    # Pool de hachage démarré avant la mesure
+    app.test_client().post('/api/auth/login', json=payloads[0])
+    barrier = threading.Barrier(clients)
+    latencies, statuses = [], []
+    lock = threading.Lock()
+
+    def run(payload):
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(per_client):
+            t0 = time.perf_counter()
+            status = client.post('/api/auth/login', json=payload).status_code
+            with lock:
+                latencies.append((time.perf_counter() - t0) * 1000)
+                statuses.append(status)
+
+    threads = [threading.Thread(target=run, args=(payload,)) for payload in payloads]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    passwords.shutdown()
+    queue.put({
+        'n': len(latencies),
+        'ok': statuses.count(200),
+        'rate_limited': statuses.count(429),
+        'errors': sum(1 for status in statuses if status not in (200, 429)),
+        'logins_per_s': round(statuses.count(200) / wall, 1),
+        'p50_ms': round(_percentile(latencies, 50), 1),
+        'p99_ms': round(_percentile(latencies, 99), 1),
+    })
+
+
+def run_logins(volumes, modes, client_counts, per_client):
+    """Résultats par « <mode>_c<clients> » (ex. pool_c16)"""
+    workdir = tempfile.mkdtemp(prefix='reparetout-bench-login-')
+    try:
+        app = create_app(workdir)
+        with app.app_context():
+            ids = seed(**volumes)
+            # Hachages au coût de production : pas de mise à niveau pendant la mesure
+            user_ids = (ids['clients'] + ids['repairers'])[:max(client_counts)]
+            db.session.execute(
+                db.update(User).where(User.id.in_(user_ids))
+                .values(password_hash=passwords._hash(PASSWORD, passwords.HASH_METHOD))
+            )
+            db.session.commit()
+            emails = [email for (email,) in db.session.query(User.email).filter(User.id.in_(user_ids))]
+            for engine in db.engines.values():
+                engine.dispose()
+
+        mp = multiprocessing.get_context('spawn')
+        results = {}
+        for mode in modes:
+            for clients in client_counts:
+                saved = {name: os.environ.get(name) for name in LOGIN_MODES[mode]}
+                os.environ.update(LOGIN_MODES[mode])  # hérité par le process créé
+                try:
+                    queue = mp.Queue()
+                    process = mp.Process(target=_login_worker, args=(workdir, emails, clients, per_client, queue))
+                    process.start()
+                    result = queue.get()
+                    process.join()
+                finally:
+                    for name, value in saved.items():
+                        if value is None:
+                            os.environ.pop(name, None)
+                        else:
+                            os.environ[name] = value
+                result = {'mode': mode, 'clients': clients, **result}
+                results[f'{mode}_c{clients}'] = result
+                print_login_row(result)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_login_header():
+    header = f"{'connexions':12} {'clients':>7} {'n':>5} {'ok/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'429':>5} {'err':>4}"
+    print(header)
+    print('-' * len(header))
+
+
+def print_login_row(row):
+    print(f"{row['mode']:12} {row['clients']:7d} {row['n']:5d} {row['logins_per_s']:7.1f} "
+          f"{row['p50_ms']:8.1f} {row['p99_ms']:8.1f} {row['rate_limited']:5d} {row['errors']:4d}")
+
+
+def compare_logins(results, baseline, tolerance, floor_ms=50.0):
+    """Régressions : p99 des connexions au-delà de la tolérance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('login', {}).get(name)
+        if not previous:
+            continue
+        limit = previous['p99_ms'] * (1 + tolerance)
+        if current['p99_ms'] > limit and current['p99_ms'] - previous['p99_ms'] > floor_ms:
+            regressions.append(f"login {name}: p99 {previous['p99_ms']} ms -> {current['p99_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Banc de mesure des endpoints RépareTout')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for name in ('users', 'requests', 'quotes', 'images', 'crowded', 'crowded_quotes'):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f'surcharge du volume ({name})')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='scénarios à exécuter')
+    parser.add_argument('--response-cache', action='store_true', help='garder le cache de réponses actif')
+    parser.add_argument('--json-out', help='écrit les résultats en JSON')
+    parser.add_argument('--save-baseline', help='écrit les résultats comme référence')
+    parser.add_argument('--baseline', help='compare à une référence (code retour 1 si régression)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='marge p95 tolérée (0.25 = +25 %%)')
+    parser.add_argument('--keep', action='store_true', help='conserve le dossier de travail')
+    parser.add_argument('--concurrency', action='store_true',
+                        help='débit de process lecteurs / écrivains simultanés, par profil SQLite')
+    parser.add_argument('--profiles', nargs='*', choices=sorted(CONCURRENCY_PROFILES),
+                        default=['default', 'tuned', 'replica'])
+    parser.add_argument('--readers', nargs='*', type=int, default=[1, 4, 8], help='process lecteurs (une mesure par valeur)')
+    parser.add_argument('--writers', type=int, default=2, help='process écrivains')
+    parser.add_argument('--duration', type=float, default=3.0, help='durée de chaque mesure (s)')
+    parser.add_argument('--login-modes', nargs='*', choices=sorted(LOGIN_MODES), default=['inline', 'pool'],
+                        help='hachage des mots de passe comparé (rafales de connexions)')
+    parser.add_argument('--login-clients', nargs='*', type=int, default=[16, 32],
+                        help='connexions simultanées (une mesure par valeur)')
+    parser.add_argument('--logins-per-client', type=int, default=6)
+    args = parser.parse_args(argv)
+
+    volumes = dict(SCALES[args.scale])
+    for name in volumes:
+        if getattr(args, name) is not None:
+            volumes[name] = getattr(args, name)
+
+    if args.concurrency:
+        rows = []
+        if args.profiles:
+            print_concurrency_header()
+            for profile in args.profiles:
+                rows.extend(run_concurrency(profile, volumes, args.readers, args.writers, args.duration))
+        logins = {}
+        if args.login_modes:
+            print_login_header()
+            logins = run_logins(volumes, args.login_modes, args.login_clients, args.logins_per_client)
+        if args.json_out:
+            with open(args.json_out, 'w') as f:
+                json.dump({'volumes': volumes, 'duration_s': args.duration, 'concurrency': rows, 'login': logins},
+                          f, indent=2, ensure_ascii=False)
+                f.write('\n')
+        if args.save_baseline:
+            # Référence commune avec les endpoints : seule la section « login » est remplacée
+            report = {}
+            if os.path.exists(args.save_baseline):
+                with open(args.save_baseline) as f:
+                    report = json.load(f)
+            report['login'] = logins
+            with open(args.save_baseline, 'w') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+                f.write('\n')
+        failed = any(row['errors'] for row in rows) or any(row['errors'] for row in logins.values())
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare_logins(logins, json.load(f), args.tolerance)
+            for line in regressions:
+                print(f'RÉGRESSION {line}')
+            failed = failed or bool(regressions)
+        return 1 if failed else 0
+
+    workdir = tempfile.mkdtemp(prefix='reparetout-bench-')
+    try:
+        app = create_app(workdir)
+        with app.app_context():
+            t0 = time.perf_counter()
+            ids = seed(**volumes)
+            print(f"Jeu de données {volumes} généré en {time.perf_counter() - t0:.1f} s ({workdir})")
+        ctx = Context(app, ids)
+
+        results = {}
+        for name, expected, prepare in SCENARIOS:
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_scenario(ctx, prepare, expected, args.iterations, args.warmup)
+        print_table(results)
+    finally:
+        image_pipeline.shutdown(wait=True)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'volumes': volumes,
+        'iterations': args.iterations,
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+    baseline_report = report
+    if args.save_baseline and os.path.exists(args.save_baseline):
+        # Mesures des connexions (--concurrency) conservées dans la référence
+        with open(args.save_baseline) as f:
+            previous = json.load(f)
+        if 'login' in previous:
+            baseline_report = dict(report, login=previous['login'])
+    for path in (args.json_out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(baseline_report if path == args.save_baseline else report, f, indent=2, ensure_ascii=False)
+                f.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'RÉGRESSION {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from src.models.user import db, User, RepairRequest, Quote, RepairImage
+from src.services import stats
+
+# Volumes par défaut (surchargeables en ligne de commande)
+# crowded : demandes « quoted » à crowded_quotes devis chacune (acceptation)
+SCALES = {
+    'small': {'users': 200, 'requests': 2000, 'quotes': 3, 'images': 1, 'crowded': 60, 'crowded_quotes': 300},
+    'medium': {'users': 2000, 'requests': 20000, 'quotes': 3, 'images': 2, 'crowded': 110, 'crowded_quotes': 300},
+    'large': {'users': 10000, 'requests': 200000, 'quotes': 4, 'images': 2, 'crowded': 210, 'crowded_quotes': 500},
+}
+
+PASSWORD = 'bench-password'
+CATEGORIES = ['electronics', 'appliances', 'furniture', 'clothing', 'bike', 'other']
+STATUSES = ['open'] * 6 + ['quoted'] * 2 + ['accepted', 'in_progress', 'done', 'closed']
+CITIES = [
+    ('Paris', 48.8566, 2.3522), ('Lyon', 45.7640, 4.8357), ('Marseille', 43.2965, 5.3698),
+    ('Toulouse', 43.6047, 1.4442), ('Lille', 50.6292, 3.0573), ('Nantes', 47.2184, -1.5536),
+]
+OBJECTS = [
+    'écran de téléphone', 'lave-linge', 'chaise en bois', 'vélo', 'ordinateur portable',
+    'blender', 'fermeture éclair', 'lampe', 'aspirateur', 'machine à café',
+]
+PROBLEMS = ['cassé', 'fissuré', 'ne démarre plus', 'fuit', 'fait du bruit', 'bloqué']
+
+BATCH = 5000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(db.insert(model), rows[start:start + BATCH])
+
+
+def seed(users, requests, quotes, images, crowded=0, crowded_quotes=0, seed_value=42):
+    """
+    Jeu de données synthétique reproductible (INSERT en lots). Retourne les
+    identifiants utiles aux scénarios : admin, clients, réparateurs, et les
+    demandes très sollicitées (demande, premier devis, client).
+    """
+    rng = random.Random(seed_value)
+    password_hash = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+    start = datetime.utcnow() - timedelta(days=90)
+
+    user_rows = [{
+        'id': 1, 'username': 'admin', 'email': 'admin@bench.local', 'password_hash': password_hash,
+        'role': 'admin', 'status': 'active', 'city': 'Paris', 'created_at': start,
+    }]
+    for i in range(2, users + 2):
+        user_rows.append({
+            'id': i, 'username': f'user{i}', 'email': f'user{i}@bench.local', 'password_hash': password_hash,
+            'role': 'repairer' if i % 3 == 0 else 'client', 'status': 'active',
+            'city': rng.choice(CITIES)[0], 'created_at': start + timedelta(minutes=i),
+        })
+    _insert(User, user_rows)
+    clients = [u['id'] for u in user_rows if u['role'] == 'client']
+    repairers = [u['id'] for u in user_rows if u['role'] == 'repairer']
+
+    request_rows, quote_rows, image_rows = [], [], []
+    quote_id = 1
+    for i in range(1, requests + 1):
+        city, lat, lon = rng.choice(CITIES)
+        thing, problem = rng.choice(OBJECTS), rng.choice(PROBLEMS)
+        created = start + timedelta(seconds=i * 90 * 86400 // max(requests, 1))
+        status = rng.choice(STATUSES)
+        request_rows.append({
+            'id': i, 'title': f'{thing.capitalize()} {problem}',
+            'description': f'Mon {thing} est {problem} depuis quelques jours, merci de votre aide.',
+            'category': rng.choice(CATEGORIES), 'city': city,
+            'latitude': lat + rng.uniform(-0.2, 0.2), 'longitude': lon + rng.uniform(-0.2, 0.2),
+            'budget_min': 50, 'budget_max': 50 + rng.randrange(0, 300, 10),
+            'status': status, 'visibility': 'public', 'client_id': rng.choice(clients),
+            'created_at': created, 'updated_at': created,
+        })
+        if status != 'open':
+            for _ in range(quotes):
+                quote_rows.append({
+                    'id': quote_id, 'repair_request_id': i, 'repairer_id': rng.choice(repairers),
+                    'price': rng.randrange(2000, 30000, 500), 'estimated_duration': '2 jours',
+                    'conditions': '', 'location_type': 'atelier', 'status': 'pending',
+                    'created_at': created + timedelta(hours=1),
+                })
+                quote_id += 1
+        for j in range(images):
+            name = f'{rng.getrandbits(256):064x}.jpg'
+            image_rows.append({
+                'repair_request_id': i, 'filename': name, 'url': f'/static/uploads/{name}',
+                'width': 1024, 'height': 768, 'created_at': created,
+            })
+    crowded_rows = []
+    for i in range(requests + 1, requests + crowded + 1):
+        city, lat, lon = rng.choice(CITIES)
+        client_id = rng.choice(clients)
+        request_rows.append({
+            'id': i, 'title': 'Canapé à retapisser', 'description': 'Beaucoup de devis reçus.',
+            'category': 'furniture', 'city': city, 'latitude': lat, 'longitude': lon,
+            'budget_min': 100, 'budget_max': 400, 'status': 'quoted', 'visibility': 'public',
+            'client_id': client_id, 'created_at': start, 'updated_at': start,
+        })
+        crowded_rows.append((i, quote_id, client_id))
+        for _ in range(crowded_quotes):
+            quote_rows.append({
+                'id': quote_id, 'repair_request_id': i, 'repairer_id': rng.choice(repairers),
+                'price': rng.randrange(5000, 40000, 500), 'estimated_duration': '1 semaine',
+                'conditions': '', 'location_type': 'atelier', 'status': 'pending', 'created_at': start,
+            })
+            quote_id += 1
+    _insert(RepairRequest, request_rows)
+    _insert(Quote, quote_rows)
+    _insert(RepairImage, image_rows)
+    db.session.commit()
+
+    # Les INSERT en lots contournent les événements ORM des compteurs
+    stats.rebuild_counters()
+    return {'admin': 1, 'clients': clients, 'repairers': repairers, 'crowded': crowded_rows}
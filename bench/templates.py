@@ -0,0 +1,64 @@
+"""
+Rendu des emails d'une nouvelle demande envoyés à tous les réparateurs ciblés
+(gabarits précompilés de src/services/email_templates.py, contexte « plat »
+comme dans EmailService.send_new_request_notification).
+
+    python -m bench.templates --recipients 2000 --rounds 5
+    python -m bench.templates --min-rate 5000   # code retour 1 en dessous
+
+Un seul thread, sans base de données ni SMTP : sujet + texte brut + HTML par
+destinataire. Affiche le meilleur débit des tours (messages par seconde).
+"""
+import argparse
+import sys
+import time
+
+from src.services.email_templates import render
+
+
+def fan_out_context():
+    return {
+        'title': 'Lave-linge qui fuit',
+        'category': 'appliances',
+        'city': 'Lyon',
+        'budget_min': 50,
+        'budget_max': 120,
+        'description': 'Le lave-linge fuit par le bas pendant l\'essorage.\nModèle de 2018, joint de hublot changé.',
+    }
+
+
+def render_fan_out(recipients):
+    """Messages rendus pour `recipients` réparateurs (un rendu par destinataire)"""
+    context = fan_out_context()
+    messages = []
+    for i in range(recipients):
+        context['username'] = f'reparateur{i}'
+        messages.append(render('new_request', context))
+    return messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Débit de rendu des emails « nouvelle demande »')
+    parser.add_argument('--recipients', type=int, default=2000, help='réparateurs prévenus par demande')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-rate', type=float, help='débit minimal attendu (messages/s)')
+    args = parser.parse_args(argv)
+
+    render_fan_out(10)  # échauffement
+    rates = []
+    for _ in range(args.rounds):
+        t0 = time.perf_counter()
+        render_fan_out(args.recipients)
+        rates.append(args.recipients / (time.perf_counter() - t0))
+
+    best = max(rates)
+    print(f'{args.recipients} destinataires × {args.rounds} tours : '
+          f'{best:.0f} messages/s (meilleur tour), {min(rates):.0f} messages/s (pire)')
+    if args.min_rate and best < args.min_rate:
+        print(f'RÉGRESSION rendu : {best:.0f} < {args.min_rate:.0f} messages/s')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from flask import Flask, abort
+from flask_cors import CORS
+
+# Modèles & routes
+from src.models.user import db, User
+from src.routes.user import user_bp
+from src.routes.auth import auth_bp
+from src.routes.repairs import repairs_bp
+from src.routes.admin import admin_bp
+from src.routes.events import events_bp
+from src.services.migrations import upgrade
+from src.services.sqlite_tuning import configure_sqlite, WalCheckpointer
+from src.services.search import install_search_index
+from src.services.geo import install_geo_index, install_geo_functions
+from src.services.db_routing import database_config, engine_options, normalize_url, REPLICA_BIND
+from src.services.email_service import email_service
+from src.services.email_worker import OutboxWorker
+from src.services.events import events_broker
+from src.services.uploads import MAX_CONTENT_LENGTH
+from src.services.stats import ensure_counters
+from src.services.sessions import install_session_store
+from src.services.json_provider import FastJSONProvider
+from src.services.static_files import StaticIndex, send_static, send_upload
+from src.services.instrumentation import install_instrumentation
+
+SRC_DIR = os.path.dirname(__file__)
+NETLIFY_ORIGIN = os.environ.get("NETLIFY_ORIGIN", "https://reparetout.netlify.app")
+
+
+def _setting(app, name, default):
+    """Réglage : `config` passé à create_app, sinon variable d'environnement"""
+    return app.config.get(name, os.environ.get(name, default))
+
+
+def create_app(config=None):
+    """
+    App de production (src/main.py). `config` surcharge la configuration
+    Flask et les réglages lus dans l'environnement (SESSION_STORE,
+    EMAIL_WORKER, EVENTS, INSTRUMENTATION...) ; BACKGROUND_TASKS=False
+    ne démarre aucun thread en tâche de fond, CREATE_DEFAULT_ADMIN=False ne crée
+    pas le compte admin par défaut (banc de mesure, tests).
+    """
+    # --------------------------------------------------------------------------
+    # App
+    # --------------------------------------------------------------------------
+    app = Flask(__name__, static_folder=os.path.join(SRC_DIR, "static"))
+    # jsonify / get_json via orjson (repli sur json standard)
+    app.json = FastJSONProvider(app)
+
+    # --------------------------------------------------------------------------
+    # Sécurité sessions (cookies cross-site Netlify → Render)
+    # --------------------------------------------------------------------------
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret")
+    app.config.update(
+        SESSION_COOKIE_SAMESITE="None",   # obligatoire si front sur autre domaine
+        SESSION_COOKIE_SECURE=True,       # cookies envoyés seulement en HTTPS
+        PERMANENT_SESSION_LIFETIME=timedelta(days=7),
+    )
+
+    # --------------------------------------------------------------------------
+    # Dossier d'upload d'images (utilisé par /api/repairs)
+    # --------------------------------------------------------------------------
+    app.config["UPLOAD_DIR"] = os.path.join(SRC_DIR, "static", "uploads")
+    # Werkzeug refuse (413) un corps plus gros, sans le lire jusqu'au bout
+    app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+
+    # --------------------------------------------------------------------------
+    # Base de données
+    # --------------------------------------------------------------------------
+    # DATABASE_URL (PostgreSQL en production), options de pool DB_POOL_*,
+    # réplica en lecture facultatif DATABASE_REPLICA_URL : voir src/services/db_routing.py
+    app.config.update(database_config(f"sqlite:///{os.path.join(SRC_DIR, 'database', 'app.db')}"))
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # Base fournie par `config` : ni DATABASE_URL ni réplica de l'environnement
+    app.config.update(config or {})
+    if config and "SQLALCHEMY_DATABASE_URI" in config:
+        url = normalize_url(config["SQLALCHEMY_DATABASE_URI"])
+        app.config["SQLALCHEMY_DATABASE_URI"] = url
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = config.get("SQLALCHEMY_ENGINE_OPTIONS", engine_options(url))
+        app.config["SQLALCHEMY_BINDS"] = config.get("SQLALCHEMY_BINDS", {})
+    Path(app.config["UPLOAD_DIR"]).mkdir(parents=True, exist_ok=True)
+
+    # Cookies de session signés par défaut ; SESSION_STORE=sqlite pour les
+    # sessions côté serveur (fichier SQLite local SESSION_DB_PATH, partagé par
+    # les workers d'une même machine, révocables à la suspension d'un compte)
+    if _setting(app, "SESSION_STORE", "cookie") == "sqlite":
+        install_session_store(app, app.config.get("SESSION_DB_PATH"))
+
+    # --------------------------------------------------------------------------
+    # CORS : autoriser Netlify à appeler /api/* avec les cookies
+    # (⚠️ Une seule initialisation CORS — ne pas la dupliquer)
+    # --------------------------------------------------------------------------
+    allowed_origins = [NETLIFY_ORIGIN]
+
+    CORS(
+        app,
+        supports_credentials=True,
+        origins=allowed_origins,
+        resources={r"/api/*": {"origins": allowed_origins}},
+        methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization"],
+        expose_headers=["Content-Type"]
+    )
+
+    db.init_app(app)
+
+    with app.app_context():
+        # Profil SQLite (WAL, busy_timeout, cache...) sur chaque connexion ;
+        # SQLITE_TUNING=off garde les réglages par défaut de SQLite (comparaison)
+        if _setting(app, "SQLITE_TUNING", "on") != "off":
+            for engine in db.engines.values():
+                configure_sqlite(engine)
+
+        # Schéma versionné (tables, colonnes ajoutées, index) : voir src/services/migrations.py
+        upgrade(db.engine)
+
+        # Index plein texte de la recherche (FTS5 sur SQLite, tsvector sur PostgreSQL)
+        install_search_index(db.engine)
+
+        # Index spatial du mode « autour de moi » (R*Tree sur SQLite)
+        install_geo_index(db.engine)
+        if REPLICA_BIND in db.engines:
+            install_geo_functions(db.engines[REPLICA_BIND])
+
+        # Compteurs du tableau de bord admin (construits au premier démarrage)
+        ensure_counters()
+
+        # Admin par défaut (si non existant)
+        if app.config.get("CREATE_DEFAULT_ADMIN", True):
+            _create_default_admin()
+
+    # --------------------------------------------------------------------------
+    # Instrumentation (facultative) : requêtes SQL et durée par requête HTTP,
+    # métriques Prometheus sur /api/metrics, profils échantillonnés
+    # (PROFILE_SAMPLE_RATE, en-tête X-Profile) : voir src/services/instrumentation.py
+    # --------------------------------------------------------------------------
+    if _setting(app, "INSTRUMENTATION", "off") == "on":
+        with app.app_context():
+            install_instrumentation(app, db.engines.values())
+
+    if app.config.get("BACKGROUND_TASKS", True):
+        _start_background_tasks(app)
+
+    # --------------------------------------------------------------------------
+    # Blueprints API
+    # --------------------------------------------------------------------------
+    app.register_blueprint(user_bp,    url_prefix="/api/users")
+    app.register_blueprint(auth_bp,    url_prefix="/api/auth")
+    app.register_blueprint(repairs_bp, url_prefix="/api/repairs")
+    app.register_blueprint(admin_bp,   url_prefix="/api/admin")
+    app.register_blueprint(events_bp,  url_prefix="/api/events")
+
+    # Petit endpoint de santé pour tester vite fait
+    @app.get("/api/health")
+    def health():
+        return {"status": "ok", "origin": NETLIFY_ORIGIN}, 200
+
+    _install_static(app)
+    return app
+
+
+def _create_default_admin():
+    admin_user = User.query.filter_by(email="admin@reparetout.com").first()
+    if not admin_user:
+        admin_user = User(
+            username="admin",
+            email="admin@reparetout.com",
+            role="admin",
+            city="Paris",
+            bio="Administrateur de la plateforme RépareTout",
+        )
+        admin_user.set_password("admin123")
+        db.session.add(admin_user)
+        db.session.commit()
+
+
+def _start_background_tasks(app):
+    # --------------------------------------------------------------------------
+    # Envoi des emails en tâche de fond (table EmailOutbox)
+    # EMAIL_WORKER=off si le worker tourne dans un process séparé :
+    #   python -m src.services.email_worker
+    # --------------------------------------------------------------------------
+    if _setting(app, "EMAIL_WORKER", "thread") != "off":
+        email_service.worker = OutboxWorker(app).start()
+
+    # --------------------------------------------------------------------------
+    # Relais des événements temps réel (SSE /api/events/stream) : lit la table
+    # user_event et distribue aux flux ouverts sur ce worker. Des milliers de flux
+    # inactifs par worker : gunicorn avec --worker-class gthread et beaucoup de
+    # threads, ou gevent.
+    # --------------------------------------------------------------------------
+    if _setting(app, "EVENTS", "on") != "off":
+        events_broker.start(app)
+
+    # --------------------------------------------------------------------------
+    # Checkpoints WAL en tâche de fond (SQLite uniquement)
+    # --------------------------------------------------------------------------
+    with app.app_context():
+        app.extensions["wal_checkpointer"] = WalCheckpointer(app, db.engine).start()
+
+
+def _install_static(app):
+    # --------------------------------------------------------------------------
+    # Fallback statique (rarement utilisé ici, le front est servi par Netlify)
+    # Index construit au démarrage (variantes gzip/brotli précalculées, ETag),
+    # cache « immutable » pour les fichiers au contenu figé (build Vite, photos
+    # originales), revalidation pour le reste : voir src/services/static_files.py
+    # --------------------------------------------------------------------------
+    static_index = StaticIndex(app.static_folder)
+
+    def static_file(filename):
+        if filename.startswith("uploads/"):
+            response = send_upload(app.config["UPLOAD_DIR"], filename[len("uploads/"):])
+        else:
+            entry = static_index.get(filename)
+            response = send_static(entry) if entry else None
+        if response is None:
+            abort(404)
+        return response
+
+    # Remplace la vue /static/<path> intégrée de Flask
+    app.view_functions["static"] = static_file
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def serve(path):
+        entry = static_index.get(path) if path else None
+        if entry is None:
+            # Route du front (SPA) : on renvoie index.html
+            entry = static_index.get("index.html")
+            if entry is None:
+                return "index.html not found", 404
+        return send_static(entry)
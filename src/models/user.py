@@ -2,7 +2,14 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from src.services.db_routing import RoutingSession
+from src.services.passwords import HASH_METHOD
+
+# Session à routage primaire / réplica (voir src/services/db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Statuts d'un compte (modération)
+USER_STATUSES = ['active', 'suspended', 'pending_verification']
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -17,13 +24,27 @@ class User(db.Model):
     avatar_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     verified_at = db.Column(db.DateTime)
+    # Réparateurs : catégories traitées (« electronics,bike », vide = toutes) et
+    # position de l'atelier, pour le ciblage des nouvelles demandes
+    specialties = db.Column(db.String(255))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     
     # Relations
     repair_requests = db.relationship('RepairRequest', backref='client', lazy=True, foreign_keys='RepairRequest.client_id')
     quotes = db.relationship('Quote', backref='repairer', lazy=True, foreign_keys='Quote.repairer_id')
 
+    # Index pour la pagination par curseur (created_at DESC, id DESC),
+    # éventuellement filtrée par rôle (admin)
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+        db.Index('ix_user_role_created_at', 'role', 'created_at', 'id'),
+    )
+
+    # Hachage synchrone (scripts, admin par défaut) ; les routes passent par
+    # le pool de src/services/passwords.py
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=HASH_METHOD)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -42,10 +63,14 @@ class User(db.Model):
             'bio': self.bio,
             'phone': self.phone,
             'avatar_url': self.avatar_url,
+            'specialties': [c for c in (self.specialties or '').split(',') if c],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'verified_at': self.verified_at.isoformat() if self.verified_at else None
         }
 
+# Statuts d'une demande (tableau de bord, modération), une seule liste pour tous
+REQUEST_STATUSES = ['open', 'quoted', 'accepted', 'in_progress', 'done', 'rated', 'closed']
+
 class RepairRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -64,15 +89,34 @@ class RepairRequest(db.Model):
     accepted_quote_id = db.Column(db.Integer, db.ForeignKey('quote.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Verrou optimiste : chaque UPDATE incrémente la version et échoue
+    # (StaleDataError) si une autre transaction l'a déjà changée
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text('1'))
     
     # Relations
     quotes = db.relationship('Quote', backref='repair_request', lazy=True, foreign_keys='Quote.repair_request_id')
     images = db.relationship('RepairImage', backref='repair_request', lazy=True)
 
+    # Index pour la pagination par curseur (created_at DESC, id DESC), seule
+    # ou après les filtres du fil / de l'admin (statut, catégorie, client),
+    # et le préfiltre géographique hors SQLite (voir src/services/geo.py)
+    __table_args__ = (
+        db.Index('ix_repair_request_created_at_id', 'created_at', 'id'),
+        db.Index('ix_repair_request_status_category_created_at', 'status', 'category', 'created_at', 'id'),
+        db.Index('ix_repair_request_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_repair_request_category_created_at', 'category', 'created_at', 'id'),
+        db.Index('ix_repair_request_client_created_at', 'client_id', 'created_at', 'id'),
+        db.Index('ix_repair_request_lat_lon', 'latitude', 'longitude'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
     def __repr__(self):
         return f'<RepairRequest {self.title}>'
 
-    def to_dict(self):
+    def to_dict(self, quotes_count=None):
+        # quotes_count peut être fourni en lot (voir src/services/serializers.py)
+        if quotes_count is None:
+            quotes_count = len(self.quotes)
         return {
             'id': self.id,
             'title': self.title,
@@ -91,8 +135,9 @@ class RepairRequest(db.Model):
             'accepted_quote_id': self.accepted_quote_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'quotes_count': len(self.quotes),
-            'client': self.client.to_dict() if self.client else None
+            'quotes_count': quotes_count,
+            'client': self.client.to_dict() if self.client else None,
+            'images': [image.to_dict() for image in self.images]
         }
 
 class Quote(db.Model):
@@ -105,7 +150,17 @@ class Quote(db.Model):
     location_type = db.Column(db.String(20), nullable=False, default='domicile')  # domicile, atelier
     status = db.Column(db.String(20), nullable=False, default='pending')  # pending, accepted, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
+
+    # Index pour la pagination par curseur (created_at DESC, id DESC),
+    # « mes devis » (réparateur), le filtre admin par statut, et les devis
+    # d'une demande (comptage groupé, acceptation)
+    __table_args__ = (
+        db.Index('ix_quote_created_at_id', 'created_at', 'id'),
+        db.Index('ix_quote_repairer_created_at', 'repairer_id', 'created_at', 'id'),
+        db.Index('ix_quote_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_quote_repair_request_status', 'repair_request_id', 'status'),
+    )
+
     def __repr__(self):
         return f'<Quote {self.id}>'
 
@@ -125,17 +180,101 @@ class Quote(db.Model):
 
 class RepairImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    repair_request_id = db.Column(db.Integer, db.ForeignKey('repair_request.id'), nullable=False)
-    filename = db.Column(db.String(255), nullable=False)
+    repair_request_id = db.Column(db.Integer, db.ForeignKey('repair_request.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False, index=True)  # <sha256>.<ext>, partagé entre doublons
     url = db.Column(db.String(255), nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Miniatures générées par src/services/image_pipeline.py
+    variants = db.relationship('RepairImageVariant', backref='image', lazy=True)
+
     def to_dict(self):
+        variants = {}
+        for variant in self.variants:
+            variants.setdefault(variant.label, {})[variant.format] = variant.to_dict()
+        thumb = variants.get('thumb', {})
+        thumbnail = thumb.get('webp') or thumb.get('avif')
         return {
             'id': self.id,
             'repair_request_id': self.repair_request_id,
             'filename': self.filename,
             'url': self.url,
+            'width': self.width,
+            'height': self.height,
+            'thumbnail_url': thumbnail['url'] if thumbnail else self.url,
+            'variants': variants,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class RepairImageVariant(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(db.Integer, db.ForeignKey('repair_image.id'), nullable=False, index=True)
+    label = db.Column(db.String(20), nullable=False)  # thumb, large
+    format = db.Column(db.String(10), nullable=False)  # webp, avif
+    url = db.Column(db.String(255), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    size_bytes = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'width': self.width,
+            'height': self.height,
+            'size_bytes': self.size_bytes
+        }
+
+class EmailOutbox(db.Model):
+    """File d'attente des emails sortants, vidée par src/services/email_worker.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text)  # version HTML (multipart/alternative) si renseignée
+    is_html = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status}>'
+
+class StatCounter(db.Model):
+    """
+    Compteurs du tableau de bord admin, tenus à jour par src/services/stats.py.
+    Chaque compteur est réparti sur plusieurs lignes (shard) : valeur = somme.
+    """
+    name = db.Column(db.String(64), primary_key=True)  # ex: requests.status.open
+    shard = db.Column(db.Integer, primary_key=True, default=0)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}[{self.shard}]={self.value}>'
+
+class UserEvent(db.Model):
+    """Événements poussés aux utilisateurs (SSE), relayés par src/services/events.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(50), nullable=False)  # ex: quote.created, request.status
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Reprise après reconnexion (Last-Event-ID) et purge des anciens événements
+    __table_args__ = (
+        db.Index('ix_user_event_user_id_id', 'user_id', 'id'),
+        db.Index('ix_user_event_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<UserEvent {self.id} {self.kind}>'
@@ -1,6 +1,25 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, RepairRequest, Quote
-from datetime import datetime, timedelta
+from flask import Blueprint, current_app, request, jsonify, session, send_file, stream_with_context
+from src.models.user import db, User, RepairRequest, Quote, USER_STATUSES, REQUEST_STATUSES
+from src.services.stats import dashboard_stats
+from src.services.db_routing import read_only
+from src.services.identity import current_user
+from src.services.sessions import revoke_user_sessions
+from src.services.response_cache import cache_stats
+from src.services.events import publish
+from src.services.ndjson import wants_ndjson, iter_query, ndjson_response
+from src.services.json_provider import dumps_bytes
+from src.services.export import (
+    export_query, iter_csv, iter_ndjson, start_parquet_export, load_job, job_file, ExportError,
+    CSV_MIMETYPE, NDJSON_MIMETYPE
+)
+from src.services.moderation import bulk_user_status, bulk_request_status, BulkError
+from src.services.pagination import keyset_page, parse_limit, InvalidCursor
+from src.services.serializers import (
+    serialize_users, serialize_requests, serialize_quotes,
+    REQUEST_LOAD_OPTIONS, QUOTE_LOAD_OPTIONS
+)
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime
 import os
 
 admin_bp = Blueprint('admin', __name__)
@@ -9,13 +28,44 @@ def require_admin():
     if 'user_id' not in session:
         return jsonify({'error': 'Connexion requise'}), 401
 
-    user = User.query.get(session['user_id'])
+    user = current_user()
     if not user or user.role != 'admin':
         return jsonify({'error': 'Accès administrateur requis'}), 403
 
     return None
 
 
+def paginated_response(query, model, key, serialize):
+    """
+    Liste paginée : par curseur (?cursor=&limit=) par défaut, ou mode
+    historique ?page=&per_page= (COUNT + OFFSET) pour les anciens clients.
+    ?format=ndjson : toute la liste en flux, une ligne JSON par élément.
+    """
+    if 'page' in request.args:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        items = query.order_by(model.created_at.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        return jsonify({
+            key: serialize(items.items),
+            'total': items.total,
+            'pages': items.pages,
+            'current_page': page
+        }), 200
+
+    if wants_ndjson():
+        return ndjson_response(iter_query(query, model, serialize))
+
+    limit = parse_limit(request.args.get('limit', request.args.get('per_page')))
+    items, next_cursor = keyset_page(query, model, request.args.get('cursor'), limit)
+    return jsonify({
+        key: serialize(items),
+        'limit': limit,
+        'next_cursor': next_cursor
+    }), 200
+
+
 @admin_bp.route('/dashboard', methods=['GET'])
 def get_dashboard():
     auth_error = require_admin()
@@ -23,59 +73,33 @@ def get_dashboard():
         return auth_error
 
     try:
-        # Statistiques générales
-        total_users = User.query.count()
-        total_requests = RepairRequest.query.count()
-        total_quotes = Quote.query.count()
-
-        # Demandes par statut
-        requests_by_status = {}
-        statuses = ['open', 'quoted', 'accepted', 'in_progress', 'done', 'closed']
-        for status in statuses:
-            count = RepairRequest.query.filter_by(status=status).count()
-            requests_by_status[status] = count
-
-        # Utilisateurs par rôle
-        users_by_role = {}
-        roles = ['client', 'repairer', 'admin']
-        for role in roles:
-            count = User.query.filter_by(role=role).count()
-            users_by_role[role] = count
-
-        # Activité récente (7 derniers jours)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_users = User.query.filter(User.created_at >= week_ago).count()
-        recent_requests = RepairRequest.query.filter(RepairRequest.created_at >= week_ago).count()
-        recent_quotes = Quote.query.filter(Quote.created_at >= week_ago).count()
-
-        return jsonify({
-            'stats': {
-                'total_users': total_users,
-                'total_requests': total_requests,
-                'total_quotes': total_quotes,
-                'requests_by_status': requests_by_status,
-                'users_by_role': users_by_role,
-                'recent_activity': {
-                    'new_users': recent_users,
-                    'new_requests': recent_requests,
-                    'new_quotes': recent_quotes
-                }
-            }
-        }), 200
+        # Compteurs maintenus au fil de l'eau + cache court ; ?refresh=1 pour tout recalculer
+        force = request.args.get('refresh') in ('1', 'true')
+        return jsonify({'stats': dashboard_stats(force=force)}), 200
 
     except Exception:
+        db.session.rollback()
         return jsonify({'error': 'Erreur lors de la récupération des statistiques'}), 500
 
 
+@admin_bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    # Compteurs du cache de réponses de ce worker (fil et détail des demandes)
+    return jsonify({'response_cache': cache_stats()}), 200
+
+
 @admin_bp.route('/users', methods=['GET'])
+@read_only
 def get_all_users():
     auth_error = require_admin()
     if auth_error:
         return auth_error
 
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         role_filter = request.args.get('role')
         status_filter = request.args.get('status')
 
@@ -87,17 +111,10 @@ def get_all_users():
         if status_filter:
             query = query.filter(User.status == status_filter)
 
-        users = query.order_by(User.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-
-        return jsonify({
-            'users': [user.to_dict() for user in users.items],
-            'total': users.total,
-            'pages': users.pages,
-            'current_page': page
-        }), 200
+        return paginated_response(query, User, 'users', serialize_users)
 
+    except InvalidCursor:
+        return jsonify({'error': 'Curseur de pagination invalide'}), 400
     except Exception:
         return jsonify({'error': 'Erreur lors de la récupération des utilisateurs'}), 500
 
@@ -115,7 +132,7 @@ def update_user_status(user_id):
         if 'status' not in data:
             return jsonify({'error': 'Statut requis'}), 400
 
-        if data['status'] not in ['active', 'suspended', 'pending_verification']:
+        if data['status'] not in USER_STATUSES:
             return jsonify({'error': 'Statut invalide'}), 400
 
         user.status = data['status']
@@ -125,6 +142,10 @@ def update_user_status(user_id):
 
         db.session.commit()
 
+        # Compte suspendu : déconnecté tout de suite sur tous les appareils
+        if user.status == 'suspended':
+            revoke_user_sessions(user.id)
+
         return jsonify({
             'message': 'Statut utilisateur mis à jour',
             'user': user.to_dict()
@@ -136,18 +157,17 @@ def update_user_status(user_id):
 
 
 @admin_bp.route('/requests', methods=['GET'])
+@read_only
 def get_all_requests():
     auth_error = require_admin()
     if auth_error:
         return auth_error
 
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         status_filter = request.args.get('status')
         category_filter = request.args.get('category')
 
-        query = RepairRequest.query
+        query = RepairRequest.query.options(*REQUEST_LOAD_OPTIONS)
 
         if status_filter:
             query = query.filter(RepairRequest.status == status_filter)
@@ -155,17 +175,10 @@ def get_all_requests():
         if category_filter:
             query = query.filter(RepairRequest.category == category_filter)
 
-        requests = query.order_by(RepairRequest.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-
-        return jsonify({
-            'requests': [req.to_dict() for req in requests.items],
-            'total': requests.total,
-            'pages': requests.pages,
-            'current_page': page
-        }), 200
+        return paginated_response(query, RepairRequest, 'requests', serialize_requests)
 
+    except InvalidCursor:
+        return jsonify({'error': 'Curseur de pagination invalide'}), 400
     except Exception:
         return jsonify({'error': 'Erreur lors de la récupération des demandes'}), 500
 
@@ -183,13 +196,21 @@ def update_request_status(request_id):
         if 'status' not in data:
             return jsonify({'error': 'Statut requis'}), 400
 
-        valid_statuses = ['open', 'quoted', 'accepted', 'in_progress', 'done', 'rated', 'closed']
-        if data['status'] not in valid_statuses:
+        if data['status'] not in REQUEST_STATUSES:
             return jsonify({'error': 'Statut invalide'}), 400
 
         repair_request.status = data['status']
         repair_request.updated_at = datetime.utcnow()
 
+        # Événement temps réel pour le client et le réparateur retenu
+        recipients = {repair_request.client_id}
+        if repair_request.accepted_quote_id:
+            accepted = db.session.get(Quote, repair_request.accepted_quote_id)
+            if accepted:
+                recipients.add(accepted.repairer_id)
+        for user_id in recipients:
+            publish(user_id, 'request.status', repair_request_id=request_id, status=data['status'])
+
         db.session.commit()
 
         return jsonify({
@@ -197,42 +218,194 @@ def update_request_status(request_id):
             'request': repair_request.to_dict()
         }), 200
 
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'La demande a été modifiée entre-temps, rechargez-la'}), 409
     except Exception:
         db.session.rollback()
         return jsonify({'error': 'Erreur lors de la mise à jour du statut'}), 500
 
 
+def bulk_response(operation):
+    """
+    Bilan JSON de l'opération en masse, ou ?format=ndjson : une ligne
+    d'avancement par lot commité, puis le bilan (done: true).
+    """
+    if wants_ndjson():
+        def lines():
+            progress = {}
+            try:
+                for progress in operation:
+                    yield dumps_bytes(progress) + b'\n'
+            except Exception:
+                yield dumps_bytes({'error': 'Opération interrompue', 'progress': progress}) + b'\n'
+        return ndjson_response(lines())
+
+    progress = {}
+    try:
+        for progress in operation:
+            pass
+    except Exception:
+        # Les lots déjà commités restent appliqués
+        return jsonify({'error': 'Opération interrompue', 'progress': progress}), 500
+    return jsonify(progress), 200
+
+
+@admin_bp.route('/users/bulk-status', methods=['POST'])
+def bulk_update_user_status():
+    """
+    {"status": "suspended", "ids": [...]} ou {"filter": {"email_domain": ...,
+    "created_after": ...}} ; "dry_run": true pour compter sans modifier
+    """
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    try:
+        data = request.get_json() or {}
+        if 'status' not in data:
+            return jsonify({'error': 'Statut requis'}), 400
+        operation = bulk_user_status(data, data['status'], dry_run=bool(data.get('dry_run')))
+        return bulk_response(operation)
+
+    except BulkError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Erreur lors de la mise à jour des statuts'}), 500
+
+
+@admin_bp.route('/requests/bulk-status', methods=['POST'])
+def bulk_update_request_status():
+    """
+    {"status": "closed", "filter": {"status": "open", "older_than_days": 90}}
+    ou {"ids": [...]} ; "notify": false sans événement, "dry_run": true pour
+    compter sans modifier
+    """
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    try:
+        data = request.get_json() or {}
+        if 'status' not in data:
+            return jsonify({'error': 'Statut requis'}), 400
+        operation = bulk_request_status(
+            data, data['status'], notify=data.get('notify', True) is not False, dry_run=bool(data.get('dry_run'))
+        )
+        return bulk_response(operation)
+
+    except BulkError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception:
+        db.session.rollback()
+        return jsonify({'error': 'Erreur lors de la mise à jour des statuts'}), 500
+
+
 @admin_bp.route('/quotes', methods=['GET'])
+@read_only
 def get_all_quotes():
     auth_error = require_admin()
     if auth_error:
         return auth_error
 
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         status_filter = request.args.get('status')
 
-        query = Quote.query
+        query = Quote.query.options(*QUOTE_LOAD_OPTIONS)
 
         if status_filter:
             query = query.filter(Quote.status == status_filter)
 
-        quotes = query.order_by(Quote.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-
-        return jsonify({
-            'quotes': [quote.to_dict() for quote in quotes.items],
-            'total': quotes.total,
-            'pages': quotes.pages,
-            'current_page': page
-        }), 200
+        return paginated_response(query, Quote, 'quotes', serialize_quotes)
 
+    except InvalidCursor:
+        return jsonify({'error': 'Curseur de pagination invalide'}), 400
     except Exception:
         return jsonify({'error': 'Erreur lors de la récupération des devis'}), 500
 
 
+@admin_bp.route('/export/<kind>', methods=['GET'])
+@read_only
+def export_data(kind):
+    """
+    Export complet users / requests / quotes en flux : ?format=csv (défaut)
+    ou ndjson, mêmes filtres que les listes (+ created_after / created_before).
+    Parquet : POST sur la même URL, fichier produit en arrière-plan.
+    """
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Format invalide (csv ou ndjson ; parquet en POST)'}), 400
+        names, statement = export_query(kind, request.args)
+
+        lines = iter_csv(names, statement) if export_format == 'csv' else iter_ndjson(names, statement)
+        mimetype = CSV_MIMETYPE if export_format == 'csv' else NDJSON_MIMETYPE
+        # stream_with_context : la session (et le réplica) restent disponibles pendant l'envoi
+        response = current_app.response_class(stream_with_context(lines), mimetype=mimetype)
+        filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except ExportError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception:
+        return jsonify({'error': 'Erreur lors de l\'export'}), 500
+
+
+@admin_bp.route('/export/<kind>', methods=['POST'])
+def start_export(kind):
+    """Export Parquet en arrière-plan : 202 puis suivi sur /export/jobs/<id>"""
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    try:
+        if request.args.get('format', 'parquet') != 'parquet':
+            return jsonify({'error': 'Seul le format parquet est produit en arrière-plan'}), 400
+        job = start_parquet_export(current_app._get_current_object(), kind, request.args.to_dict())
+        return jsonify({'job': job, 'status_url': f"/api/admin/export/jobs/{job['id']}"}), 202
+
+    except ExportError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception:
+        return jsonify({'error': 'Erreur lors du lancement de l\'export'}), 500
+
+
+@admin_bp.route('/export/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    job = load_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export introuvable'}), 404
+    if job['status'] == 'done':
+        job['download_url'] = f'/api/admin/export/jobs/{job_id}/file'
+    return jsonify({'job': job}), 200
+
+
+@admin_bp.route('/export/jobs/<job_id>/file', methods=['GET'])
+def download_export(job_id):
+    auth_error = require_admin()
+    if auth_error:
+        return auth_error
+
+    job = load_job(job_id)
+    if job is None or job['status'] != 'done':
+        return jsonify({'error': 'Export introuvable ou pas encore prêt'}), 404
+    return send_file(
+        job_file(job_id), mimetype='application/vnd.apache.parquet', as_attachment=True,
+        download_name=f"{job['kind']}-{job['started_at'][:10]}.parquet"
+    )
+
+
 # -------------------------------------------------------------------
 # 🔧 Route TEMPORAIRE de nettoyage : suppression par email
 #    Sécurisée par un token :
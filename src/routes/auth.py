@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User
 from src.services.email_service import email_service
+from src.services.passwords import hash_password, verify_password, HashingBusy
+from src.services.identity import current_user
+from src.services.matching import parse_specialties
 from werkzeug.security import check_password_hash
 import re
 
@@ -39,9 +42,12 @@ def register():
             role=data.get('role', 'client'),
             city=data.get('city', ''),
             bio=data.get('bio', ''),
-            phone=data.get('phone', '')
+            phone=data.get('phone', ''),
+            specialties=parse_specialties(data.get('specialties')),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude')
         )
-        user.set_password(data['password'])
+        user.password_hash = hash_password(data['password'])
         
         db.session.add(user)
         db.session.commit()
@@ -55,12 +61,16 @@ def register():
         # Connecter automatiquement l'utilisateur
         session['user_id'] = user.id
         session['user_role'] = user.role
+        session.permanent = True  # cookie valable PERMANENT_SESSION_LIFETIME
         
         return jsonify({
             'message': 'Inscription réussie ! Un email de bienvenue vous a été envoyé.',
             'user': user.to_dict()
         }), 201
         
+    except HashingBusy as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Erreur lors de l\'inscription'}), 500
@@ -75,20 +85,32 @@ def login():
         
         user = User.query.filter_by(email=data['email']).first()
         
-        if not user or not user.check_password(data['password']):
+        if not user:
+            return jsonify({'error': 'Email ou mot de passe incorrect'}), 401
+        
+        valid, new_hash = verify_password(user.password_hash, data['password'])
+        if not valid:
             return jsonify({'error': 'Email ou mot de passe incorrect'}), 401
         
         if user.status == 'suspended':
             return jsonify({'error': 'Compte suspendu'}), 403
         
+        # Paramètres de hachage changés depuis : on met le hachage à niveau
+        if new_hash:
+            user.password_hash = new_hash
+            db.session.commit()
+        
         session['user_id'] = user.id
         session['user_role'] = user.role
+        session.permanent = True  # cookie valable PERMANENT_SESSION_LIFETIME
         
         return jsonify({
             'message': 'Connexion réussie',
             'user': user.to_dict()
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({'error': e.message}), e.status_code, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': 'Erreur lors de la connexion'}), 500
 
@@ -102,7 +124,7 @@ def get_current_user():
     if 'user_id' not in session:
         return jsonify({'error': 'Non connecté'}), 401
     
-    user = User.query.get(session['user_id'])
+    user = current_user()
     if not user:
         session.clear()
         return jsonify({'error': 'Utilisateur introuvable'}), 404
@@ -137,6 +159,12 @@ def update_profile():
             user.phone = data['phone']
         if 'role' in data and data['role'] in ['client', 'repairer']:
             user.role = data['role']
+        # Ciblage des nouvelles demandes (réparateurs)
+        if 'specialties' in data:
+            user.specialties = parse_specialties(data['specialties'])
+        if 'latitude' in data and 'longitude' in data:
+            user.latitude = data['latitude']
+            user.longitude = data['longitude']
         
         db.session.commit()
         
@@ -0,0 +1,44 @@
+from flask import Blueprint, Response, jsonify, request, session
+
+from src.services.events import events_broker, replay, stream as event_stream, parse_last_event_id, TooManyStreams
+
+events_bp = Blueprint('events', __name__)
+
+
+@events_bp.route('/stream', methods=['GET'])
+def stream():
+    """
+    Flux Server-Sent Events de l'utilisateur connecté (new EventSource(url,
+    { withCredentials: true })) : quote.created, quote.accepted,
+    quote.rejected, request.status. Remplace l'interrogation périodique de
+    /my-requests et /my-quotes.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Connexion requise'}), 401
+    user_id = session['user_id']
+
+    try:
+        subscription = events_broker.subscribe(user_id)
+    except TooManyStreams as e:
+        response = jsonify({'error': e.message})
+        response.status_code = e.status_code
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    try:
+        # Abonné avant la reprise : aucun événement perdu entre les deux
+        last_event_id = parse_last_event_id(
+            request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        )
+        backlog = replay(user_id, last_event_id) if last_event_id is not None else ()
+    except Exception:
+        events_broker.unsubscribe(subscription)
+        return jsonify({'error': 'Erreur lors de l\'ouverture du flux'}), 500
+
+    # Pas de stream_with_context : la connexion SQL est rendue dès la fin de la vue
+    response = Response(event_stream(subscription, backlog), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Désabonnement même si le serveur ne démarre jamais le générateur
+    response.call_on_close(lambda: events_broker.unsubscribe(subscription))
+    return response
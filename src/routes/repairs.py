@@ -1,20 +1,35 @@
 import os
-from uuid import uuid4
 from datetime import datetime
 from flask import Blueprint, request, jsonify, session, current_app
-from werkzeug.utils import secure_filename
 
-from src.models.user import db, User, RepairRequest  # + Quote si besoin (pas ici)
+from sqlalchemy.orm.exc import StaleDataError
+
+from src.models.user import db, User, RepairRequest, RepairImage, Quote
+from src.services import image_pipeline
+from src.services.uploads import receive_upload, UploadError, MAX_BYTES
+from src.services.serializers import (
+    serialize_requests, serialize_quotes, REQUEST_LOAD_OPTIONS, QUOTE_LOAD_OPTIONS
+)
+from src.services.identity import current_user, UserSnapshot
+from src.services.email_service import email_service
+from src.services.events import publish, publish_many
+from src.services.stats import record_bulk_change
+from src.services.db_routing import read_only
+from src.services.response_cache import cached_response
+from src.services.ndjson import wants_ndjson, iter_query, ndjson_response
+from src.services.pagination import keyset_page, parse_limit, InvalidCursor
+from src.services.search import search_requests
+from src.services.geo import near_requests, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
 
 repairs_bp = Blueprint("repairs", __name__)
 
+# Statuts d'une demande dont un devis peut encore être accepté
+ACCEPTABLE_STATUSES = ("open", "quoted")
+
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
 
-ALLOWED_EXT = {"jpg", "jpeg", "png", "webp"}
-MAX_BYTES = 3 * 1024 * 1024  # ~3 Mo
-
 def _ensure_upload_dir():
     updir = current_app.config.get("UPLOAD_DIR")
     if not updir:
@@ -33,14 +48,105 @@ def _parse_budget(value: str) -> float:
     except Exception:
         return 0.0
 
+def _parse_coordinates(form):
+    """(latitude, longitude) du formulaire, (None, None) si absentes ; ValueError si invalides"""
+    lat, lng = form.get("latitude"), form.get("longitude")
+    if lat in (None, "") and lng in (None, ""):
+        return None, None
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("coordonnées hors limites")
+    return lat, lng
+
 def _require_login():
     if "user_id" not in session:
         return jsonify({"error": "Connexion requise"}), 401
-    user = User.query.get(session["user_id"])
+    user = current_user()
     if not user:
         return jsonify({"error": "Utilisateur introuvable"}), 401
     return user
 
+# ---------------------------------------------------------------------
+# GET /api/repairs/requests : fil public (curseur, recherche, autour de moi)
+# ---------------------------------------------------------------------
+
+@repairs_bp.route("/requests", methods=["GET"])
+@cached_response
+@read_only
+def get_repair_requests():
+    try:
+        # Paramètres de filtrage
+        category = request.args.get("category")
+        city = request.args.get("city")
+        status = request.args.get("status", "open")
+        search = request.args.get("search", "")
+        cursor = request.args.get("cursor")
+        limit = parse_limit(request.args.get("limit"))
+        # Mode « autour de moi » : ?lat=&lng=&radius_km=
+        lat = request.args.get("lat", type=float)
+        lng = request.args.get("lng", type=float)
+        radius_km = request.args.get("radius_km", DEFAULT_RADIUS_KM, type=float)
+
+        query = RepairRequest.query.options(*REQUEST_LOAD_OPTIONS)
+
+        if category and category != "all":
+            query = query.filter(RepairRequest.category == category)
+        if city:
+            query = query.filter(RepairRequest.city.ilike(f"%{city}%"))
+        if status != "all":
+            query = query.filter(RepairRequest.status == status)
+
+        # Recherche plein texte (FTS5 / tsvector), triée par pertinence
+        rank = None
+        if search:
+            query, rank = search_requests(query, search)
+
+        # Autour d'un point : les plus proches d'abord, avec leur distance
+        if lat is not None and lng is not None:
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius_km <= 0:
+                return jsonify({"error": "Position ou rayon invalide"}), 400
+            radius_km = min(radius_km, MAX_RADIUS_KM)
+            query, distance = near_requests(query, lat, lng, radius_km, db.engine.dialect.name)
+            rows, next_cursor = keyset_page(
+                query, RepairRequest, cursor, limit, rank=distance, with_rank=True
+            )
+            payload = serialize_requests([req for req, _ in rows])
+            for item, (_, km) in zip(payload, rows):
+                item["distance_km"] = round(km, 2)
+            return jsonify({"requests": payload, "limit": limit, "next_cursor": next_cursor}), 200
+
+        # Tout le fil en flux NDJSON (?format=ndjson), sans construire la liste en mémoire
+        if wants_ndjson():
+            return ndjson_response(iter_query(query, RepairRequest, serialize_requests, rank=rank))
+
+        # Plus récent (ou plus pertinent) en premier, page par page (curseur opaque)
+        items, next_cursor = keyset_page(query, RepairRequest, cursor, limit, rank=rank)
+        return jsonify({
+            "requests": serialize_requests(items),
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }), 200
+
+    except InvalidCursor:
+        return jsonify({"error": "Curseur de pagination invalide"}), 400
+    except Exception:
+        current_app.logger.exception("Erreur lecture du fil")
+        return jsonify({"error": "Erreur lors de la récupération des demandes"}), 500
+
+
+# ---------------------------------------------------------------------
+# GET /api/repairs/requests/<id> : détail d'une demande
+# ---------------------------------------------------------------------
+
+@repairs_bp.route("/requests/<int:request_id>", methods=["GET"])
+@cached_response
+@read_only
+def get_repair_request(request_id):
+    repair_request = db.session.get(RepairRequest, request_id)
+    if repair_request is None:
+        return jsonify({"error": "Demande introuvable"}), 404
+    return jsonify({"request": repair_request.to_dict()}), 200
+
 # ---------------------------------------------------------------------
 # POST /api/repairs/requests : créer une demande avec photo (FormData)
 # ---------------------------------------------------------------------
@@ -48,7 +154,7 @@ def _require_login():
 @repairs_bp.route("/requests", methods=["POST"])
 def create_request():
     user = _require_login()
-    if not isinstance(user, User):
+    if not isinstance(user, UserSnapshot):
         return user  # (json, status) de _require_login
 
     try:
@@ -62,29 +168,28 @@ def create_request():
         if not title or not description or not category or not city:
             return jsonify({"error": "Champs manquants"}), 400
 
+        # position facultative (mode « autour de moi » du fil)
+        try:
+            latitude, longitude = _parse_coordinates(request.form)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Position invalide"}), 400
+
         # fichier
         file = request.files.get("photo")
         if not file or file.filename == "":
             return jsonify({"error": "Photo obligatoire"}), 400
 
-        filename = secure_filename(file.filename)
-        ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-        if ext not in ALLOWED_EXT:
-            return jsonify({"error": "Format image non supporté (jpg, jpeg, png, webp)"}), 415
-
-        # limite taille (si l’en-tête est présent) — le backend Render coupe parfois, donc on garde souple
-        clen = request.content_length or 0
-        if clen and clen > MAX_BYTES + 512_000:  # petite marge
-            return jsonify({"error": "Image trop volumineuse (> 3 Mo)"}), 413
-
-        # enregistrer le fichier
+        # enregistrer le fichier : copie par morceaux, taille plafonnée,
+        # type vérifié sur les octets magiques, métadonnées EXIF / GPS
+        # retirées, nom = SHA-256 du contenu nettoyé
         updir = _ensure_upload_dir()
-        unique = f"{uuid4().hex}.{ext}"
-        dst = os.path.join(updir, unique)
-        file.save(dst)
+        try:
+            stored = receive_upload(file, updir, MAX_BYTES)
+        except UploadError as e:
+            return jsonify({"error": e.message}), e.status_code
 
         # chemin public (servi par /static/uploads/... sur Netlify ou Render)
-        public_path = f"/static/uploads/{unique}"
+        public_path = f"/static/uploads/{stored.filename}"
 
         # créer l’objet SQLAlchemy
         rr = RepairRequest(
@@ -92,8 +197,10 @@ def create_request():
             description=description,
             category=category,
             city=city,
+            latitude=latitude,
+            longitude=longitude,
             status="open",
-            user_id=user.id,
+            client_id=user.id,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow(),
         )
@@ -115,8 +222,27 @@ def create_request():
             rr.image_url = public_path
 
         db.session.add(rr)
+        db.session.flush()
+        image = RepairImage(repair_request_id=rr.id, filename=stored.filename, url=public_path)
+        db.session.add(image)
+        db.session.flush()
+        # photo déjà connue : on reprend ses miniatures
+        reused = not stored.created and image_pipeline.reuse_variants(image)
         db.session.commit()
 
+        # miniatures WebP / AVIF en tâche de fond (pool de process), original inchangé
+        if not reused:
+            try:
+                image_pipeline.schedule(current_app._get_current_object(), image.id, stored.path)
+            except Exception:
+                current_app.logger.exception("Traitement image non planifié")
+
+        # réparateurs ciblés (catégorie, ville, distance) prévenus par email
+        try:
+            email_service.notify_new_request(rr)
+        except Exception:
+            current_app.logger.exception("Erreur notification nouvelle demande")
+
         # to_dict() si dispo, sinon JSON minimal
         if hasattr(rr, "to_dict"):
             payload = rr.to_dict()
@@ -146,25 +272,185 @@ def create_request():
 
 
 # ---------------------------------------------------------------------
-# GET /api/repairs/requests/mine : lister mes demandes
+# Mes demandes / mes devis : pages par curseur (?cursor=&limit=), plus
+# récents d'abord, sérialisés avec un nombre constant de requêtes SQL
 # ---------------------------------------------------------------------
+
+def _my_page(query, model, key, serialize):
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        items, next_cursor = keyset_page(query, model, request.args.get("cursor"), limit)
+        return jsonify({key: serialize(items), "limit": limit, "next_cursor": next_cursor}), 200
+    except InvalidCursor:
+        return jsonify({"error": "Curseur de pagination invalide"}), 400
+
+
 @repairs_bp.route("/requests/mine", methods=["GET"])
+@repairs_bp.route("/my-requests", methods=["GET"], endpoint="get_my_requests")
 def my_requests():
     user = _require_login()
-    if not isinstance(user, User):
+    if not isinstance(user, UserSnapshot):
+        return user
+
+    try:
+        query = RepairRequest.query.options(*REQUEST_LOAD_OPTIONS).filter_by(client_id=user.id)
+        # /requests/mine : clé « items » ; /my-requests (ancien front) : « requests »
+        key = "items" if request.path.endswith("/mine") else "requests"
+        return _my_page(query, RepairRequest, key, serialize_requests)
+    except Exception:
+        current_app.logger.exception("Erreur lecture de mes demandes")
+        return jsonify({"error": "Erreur lors de la récupération des demandes"}), 500
+
+
+@repairs_bp.route("/my-quotes", methods=["GET"])
+def get_my_quotes():
+    user = _require_login()
+    if not isinstance(user, UserSnapshot):
+        return user
+
+    try:
+        query = Quote.query.options(*QUOTE_LOAD_OPTIONS).filter_by(repairer_id=user.id)
+        return _my_page(query, Quote, "quotes", serialize_quotes)
+    except Exception:
+        current_app.logger.exception("Erreur lecture de mes devis")
+        return jsonify({"error": "Erreur lors de la récupération des devis"}), 500
+
+
+# ---------------------------------------------------------------------
+# POST /api/repairs/requests/<id>/quotes : un réparateur propose un devis
+# ---------------------------------------------------------------------
+@repairs_bp.route("/requests/<int:request_id>/quotes", methods=["POST"])
+def create_quote(request_id):
+    user = _require_login()
+    if not isinstance(user, UserSnapshot):
         return user
 
-    q = RepairRequest.query.filter_by(user_id=user.id).order_by(RepairRequest.created_at.desc())
-    items = []
-    for r in q.all():
-        if hasattr(r, "to_dict"):
-            items.append(r.to_dict())
+    try:
+        if user.role not in ("repairer", "admin"):
+            return jsonify({"error": "Seuls les réparateurs peuvent faire des devis"}), 403
+
+        repair_request = db.session.get(RepairRequest, request_id)
+        if repair_request is None:
+            return jsonify({"error": "Demande introuvable"}), 404
+        if repair_request.status != "open":
+            return jsonify({"error": "Cette demande n'accepte plus de devis"}), 400
+
+        data = request.get_json() or {}
+        if not data.get("price") or not data.get("estimated_duration"):
+            return jsonify({"error": "Prix et durée estimée sont obligatoires"}), 400
+
+        quote = Quote(
+            repair_request_id=request_id,
+            repairer_id=user.id,
+            price=int(data["price"] * 100),  # en centimes
+            estimated_duration=data["estimated_duration"],
+            conditions=data.get("conditions", ""),
+            location_type=data.get("location_type", "domicile"),
+        )
+        db.session.add(quote)
+        repair_request.status = "quoted"
+
+        # Événement temps réel pour le client (envoyé au commit)
+        db.session.flush()
+        publish(repair_request.client_id, "quote.created",
+                quote_id=quote.id, repair_request_id=request_id, repairer_id=quote.repairer_id,
+                price=quote.price, request_status=repair_request.status)
+        db.session.commit()
+
+        try:
+            email_service.send_quote_notification(quote)
+        except Exception:
+            current_app.logger.exception("Erreur envoi notification devis")
+
+        return jsonify({"message": "Devis envoyé avec succès", "quote": quote.to_dict()}), 201
+
+    except StaleDataError:
+        # Demande modifiée entre la lecture et l'écriture (devis accepté...)
+        db.session.rollback()
+        return jsonify({"error": "La demande a été modifiée entre-temps, rechargez-la"}), 409
+    except Exception:
+        current_app.logger.exception("Erreur création devis")
+        db.session.rollback()
+        return jsonify({"error": "Erreur lors de l'envoi du devis"}), 500
+
+
+# ---------------------------------------------------------------------
+# POST /api/repairs/quotes/<id>/accept : le client retient un devis
+# ---------------------------------------------------------------------
+@repairs_bp.route("/quotes/<int:quote_id>/accept", methods=["POST"])
+def accept_quote(quote_id):
+    if "user_id" not in session:
+        return jsonify({"error": "Connexion requise"}), 401
+
+    try:
+        quote = db.session.get(Quote, quote_id)
+        if quote is None:
+            return jsonify({"error": "Devis introuvable"}), 404
+        repair_request = db.session.get(RepairRequest, quote.repair_request_id)
+
+        # Seul le client de la demande peut accepter
+        if repair_request.client_id != session["user_id"]:
+            return jsonify({"error": "Non autorisé"}), 403
+        if repair_request.status not in ACCEPTABLE_STATUSES or quote.status != "pending":
+            return jsonify({"error": "Ce devis ne peut plus être accepté"}), 409
+        previous_status = repair_request.status
+
+        # Garde optimiste, en un seul UPDATE : la demande est encore ouverte et
+        # n'a pas changé depuis sa lecture (version). Deux acceptations
+        # simultanées : une seule modifie la ligne, l'autre reçoit 409.
+        accepted = db.session.execute(
+            db.update(RepairRequest)
+            .where(
+                RepairRequest.id == repair_request.id,
+                RepairRequest.status.in_(ACCEPTABLE_STATUSES),
+                RepairRequest.version == repair_request.version,
+            )
+            .values(
+                status="accepted", accepted_quote_id=quote_id,
+                updated_at=datetime.utcnow(), version=RepairRequest.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if accepted == 1:
+            accepted = db.session.execute(
+                db.update(Quote)
+                .where(Quote.id == quote_id, Quote.status == "pending")
+                .values(status="accepted")
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        if accepted != 1:
+            db.session.rollback()
+            return jsonify({"error": "La demande a été modifiée entre-temps, rechargez-la"}), 409
+
+        # Tous les autres devis rejetés en un seul UPDATE
+        others = (Quote.repair_request_id == repair_request.id, Quote.id != quote_id, Quote.status != "rejected")
+        reject = db.update(Quote).where(*others).values(status="rejected").execution_options(synchronize_session=False)
+        if db.engine.dialect.update_returning:
+            rejected = db.session.execute(reject.returning(Quote.id, Quote.repairer_id)).all()
         else:
-            items.append({
-                "id": r.id,
-                "title": r.title,
-                "status": r.status,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-                "image": getattr(r, "image", None) or getattr(r, "photo_url", None) or getattr(r, "image_url", None),
-            })
-    return jsonify({"items": items}), 200
+            rejected = db.session.query(Quote.id, Quote.repairer_id).filter(*others).all()
+            db.session.execute(reject)
+        record_bulk_change(RepairRequest, previous_status, "accepted")
+
+        # Événements temps réel (envoyés au commit)
+        publish(quote.repairer_id, "quote.accepted", quote_id=quote_id, repair_request_id=repair_request.id)
+        publish_many(
+            (repairer_id, "quote.rejected", {"quote_id": other_id, "repair_request_id": repair_request.id})
+            for other_id, repairer_id in rejected
+        )
+        publish(repair_request.client_id, "request.status",
+                repair_request_id=repair_request.id, status="accepted", accepted_quote_id=quote_id)
+        db.session.commit()
+
+        try:
+            email_service.send_quote_accepted_notification(quote)
+        except Exception:
+            current_app.logger.exception("Erreur envoi notification acceptation")
+
+        return jsonify({"message": "Devis accepté", "quote": quote.to_dict()}), 200
+
+    except Exception:
+        current_app.logger.exception("Erreur acceptation devis")
+        db.session.rollback()
+        return jsonify({"error": "Erreur lors de l'acceptation du devis"}), 500
+
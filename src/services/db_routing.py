@@ -0,0 +1,94 @@
+import os
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Clé de bind du réplica en lecture (SQLALCHEMY_BINDS)
+REPLICA_BIND = 'replica'
+
+
+def _env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'off', 'no')
+
+
+def normalize_url(url):
+    # Render / Heroku fournissent postgres://, refusé par SQLAlchemy 2
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Options du pool de connexions pour une URL donnée (surchargeables par l'environnement)"""
+    is_sqlite = url.startswith('sqlite')
+    options = {'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', not is_sqlite)}
+    if not is_sqlite:
+        # Par worker gunicorn : workers × (pool_size + max_overflow) doit rester
+        # sous max_connections du serveur PostgreSQL
+        options.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+            # Connexions recyclées avant les coupures d'inactivité côté serveur / proxy
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        )
+    return options
+
+
+def database_config(default_url):
+    """
+    Configuration Flask-SQLAlchemy : DATABASE_URL (sinon `default_url`),
+    options de pool, et bind « replica » si DATABASE_REPLICA_URL est défini.
+    """
+    url = normalize_url(os.getenv('DATABASE_URL', default_url))
+    config = {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(url),
+        'SQLALCHEMY_BINDS': {},
+    }
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    if replica_url:
+        replica_url = normalize_url(replica_url)
+        config['SQLALCHEMY_BINDS'][REPLICA_BIND] = {'url': replica_url, **engine_options(replica_url)}
+    return config
+
+
+def read_only(view):
+    """Endpoint en lecture seule : ses requêtes partent vers le réplica s'il existe"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """
+    Session qui envoie les lectures des endpoints @read_only au réplica.
+
+    Tout le reste va au primaire : écritures (flush), endpoints non marqués,
+    code hors requête (workers), et toute la suite d'une requête dès qu'elle
+    a écrit (on relit ce qu'on vient d'écrire).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica():
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self):
+        if self._flushing or self.info.get('wrote'):
+            return False
+        if not has_request_context() or not g.get('db_read_only'):
+            return False
+        return REPLICA_BIND in self._db.engines
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, _flush_context):
+    session.info['wrote'] = True
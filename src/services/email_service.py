@@ -1,215 +1,191 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import os
 
+from src.services.smtp_transport import SMTPTransport
+from src.services.email_templates import render
+
 class EmailService:
     def __init__(self):
         # Configuration email (à adapter selon votre fournisseur)
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
+        self.smtp_server = os.getenv('SMTP_SERVER', "smtp.gmail.com")
+        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        self.smtp_starttls = os.getenv('SMTP_STARTTLS', '1') != '0'
         self.admin_email = "haknprestige@gmail.com"
         self.admin_password = os.getenv('EMAIL_PASSWORD', '')  # À configurer dans les variables d'environnement
-        
+        self.worker = None  # OutboxWorker démarré par main.py, réveillé à chaque envoi
+        self._transport = None
+
     def send_email(self, to_email, subject, body, is_html=False):
-        """Envoie un email"""
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = self.admin_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            if is_html:
-                msg.attach(MIMEText(body, 'html'))
-            else:
-                msg.attach(MIMEText(body, 'plain'))
-            
-            # Connexion au serveur SMTP
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.admin_email, self.admin_password)
-            
-            # Envoi de l'email
-            text = msg.as_string()
-            server.sendmail(self.admin_email, to_email, text)
-            server.quit()
-            
+        """Met un email en file d'attente (envoi réel par le worker)"""
+        return self._enqueue([self._message(to_email, subject, body, is_html)])
+
+    def _message(self, to_email, subject, body, is_html=False, html_body=None):
+        return {
+            'to_email': to_email,
+            'subject': subject,
+            'body': body,
+            'html_body': html_body,
+            'is_html': is_html,
+        }
+
+    def _enqueue(self, messages):
+        """Insère les emails dans l'outbox en un seul INSERT / commit"""
+        from src.models.user import db, EmailOutbox
+
+        if not messages:
             return True
+        try:
+            db.session.execute(db.insert(EmailOutbox), messages)
+            db.session.commit()
         except Exception as e:
-            print(f"Erreur lors de l'envoi de l'email: {e}")
+            db.session.rollback()
+            print(f"Erreur lors de la mise en file de l'email: {e}")
             return False
+        if self.worker:
+            self.worker.wake()
+        return True
+
+    @property
+    def transport(self):
+        """Pool de connexions SMTP (créé au premier envoi)"""
+        if self._transport is None:
+            self._transport = SMTPTransport(
+                self.smtp_server, self.smtp_port,
+                username=self.admin_email,
+                password=self.admin_password,
+                starttls=self.smtp_starttls,
+                pool_size=int(os.getenv('SMTP_POOL_SIZE', 2)),
+            )
+        return self._transport
+
+    def _build(self, to_email, subject, body, is_html=False, html_body=None):
+        if html_body:
+            # Texte brut + HTML : le client mail choisit la version à afficher
+            msg = MIMEMultipart('alternative')
+            msg.attach(MIMEText(body, 'plain'))
+            msg.attach(MIMEText(html_body, 'html'))
+        else:
+            msg = MIMEMultipart()
+            msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
+        msg['From'] = self.admin_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        return msg.as_string()
+
+    def deliver(self, to_email, subject, body, is_html=False, html_body=None):
+        """Envoie réellement un email via SMTP (lève une exception en cas d'échec)"""
+        self.transport.send(
+            self.admin_email, to_email, self._build(to_email, subject, body, is_html, html_body)
+        )
+
+    def deliver_batch(self, messages):
+        """
+        Envoie une liste de dicts (to_email, subject, body, is_html, html_body)
+        sur une même session SMTP ; retourne None ou l'exception pour chaque email.
+        """
+        payloads = [(m['to_email'], self._build(**m)) for m in messages]
+        return self.transport.send_batch(self.admin_email, payloads)
     
+    # -- Contextes « plats » pour les gabarits (src/services/email_templates.py) --
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    def _quote_context(self, quote):
+        """Lit une seule fois les relations du devis (demande, client, réparateur)"""
+        repair_request = quote.repair_request
+        client = repair_request.client
+        repairer = quote.repairer
+        return {
+            'request_title': repair_request.title,
+            'request_city': repair_request.city,
+            'client_username': client.username,
+            'client_email': client.email,
+            'repairer_username': repairer.username,
+            'repairer_email': repairer.email,
+            'price': quote.price / 100,
+            'estimated_duration': quote.estimated_duration,
+            'conditions': quote.conditions,
+            'location': 'À domicile' if quote.location_type == 'domicile' else 'En atelier',
+            'date': self._now(),
+        }
+
+    def _templated(self, to_email, template, context):
+        subject, body, html_body = render(template, context)
+        return self._message(to_email, subject, body, html_body=html_body)
+
     def send_welcome_email(self, user):
         """Email de bienvenue après inscription"""
-        subject = "Bienvenue sur RépareTout !"
-        
-        if user.role == 'client':
-            body = f"""
-Bonjour {user.username},
-
-Bienvenue sur RépareTout, la plateforme qui remet vos objets en vie !
-
-Votre compte client a été créé avec succès. Vous pouvez maintenant :
-- Publier des demandes de réparation
-- Recevoir des devis de réparateurs qualifiés
-- Suivre l'avancement de vos réparations
-
-Connectez-vous dès maintenant pour publier votre première demande.
-
-L'équipe RépareTout
-"""
-        else:  # repairer
-            body = f"""
-Bonjour {user.username},
-
-Bienvenue sur RépareTout, la plateforme qui remet les objets en vie !
-
-Votre compte réparateur a été créé avec succès. Vous pouvez maintenant :
-- Consulter les demandes de réparation
-- Envoyer des devis aux clients
-- Gérer vos interventions
-
-Votre compte sera vérifié sous 24h pour garantir la qualité de nos services.
-
-L'équipe RépareTout
-"""
-        
-        # Envoi à l'utilisateur
-        self.send_email(user.email, subject, body)
-        
-        # Notification à l'admin
-        admin_subject = f"Nouvelle inscription - {user.role}"
-        admin_body = f"""
-Nouvelle inscription sur RépareTout :
-
-Utilisateur: {user.username}
-Email: {user.email}
-Rôle: {user.role}
-Ville: {user.city}
-Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-
-{"Compte réparateur à vérifier." if user.role == 'repairer' else ""}
-"""
-        self.send_email(self.admin_email, admin_subject, admin_body)
+        context = {
+            'username': user.username,
+            'email': user.email,
+            'role': user.role,
+            'city': user.city,
+            'date': self._now(),
+        }
+        template = 'welcome_client' if user.role == 'client' else 'welcome_repairer'
+        self._enqueue([
+            # Envoi à l'utilisateur
+            self._templated(user.email, template, context),
+            # Notification à l'admin
+            self._templated(self.admin_email, 'admin_new_user', context),
+        ])
     
     def send_new_request_notification(self, request, repairers):
         """Notification aux réparateurs pour une nouvelle demande"""
-        subject = f"Nouvelle demande de réparation - {request.category}"
-        
+        context = {
+            'title': request.title,
+            'category': request.category,
+            'city': request.city,
+            'budget_min': request.budget_min,
+            'budget_max': request.budget_max,
+            'description': request.description,
+        }
+        messages = []
         for repairer in repairers:
-            body = f"""
-Bonjour {repairer.username},
-
-Une nouvelle demande de réparation correspond à vos compétences :
-
-Titre: {request.title}
-Catégorie: {request.category}
-Ville: {request.city}
-Budget: {request.budget_min}-{request.budget_max}€ (si renseigné)
+            context['username'] = repairer.username
+            messages.append(self._templated(repairer.email, 'new_request', context))
+        self._enqueue(messages)
 
-Description:
-{request.description}
+    def notify_new_request(self, request):
+        """Nouvelle demande : réparateurs ciblés par l'index (catégorie, ville, distance)"""
+        from src.services.matching import repairer_index
 
-Connectez-vous pour consulter la demande complète et envoyer votre devis.
+        repairers = repairer_index.match(
+            request.category, request.city, request.latitude, request.longitude,
+            exclude={request.client_id},
+        )
+        self.send_new_request_notification(request, repairers)
+        return len(repairers)
 
-L'équipe RépareTout
-"""
-            self.send_email(repairer.email, subject, body)
-    
     def send_quote_notification(self, quote):
         """Notification au client quand il reçoit un devis"""
-        subject = "Nouveau devis reçu sur RépareTout"
-        
-        body = f"""
-Bonjour {quote.repair_request.client.username},
-
-Vous avez reçu un nouveau devis pour votre demande "{quote.repair_request.title}" :
-
-Réparateur: {quote.repairer.username}
-Prix: {quote.price / 100}€
-Durée estimée: {quote.estimated_duration}
-Lieu: {'À domicile' if quote.location_type == 'domicile' else 'En atelier'}
-
-Conditions:
-{quote.conditions}
-
-Connectez-vous pour consulter le devis complet et l'accepter si il vous convient.
-
-L'équipe RépareTout
-"""
-        self.send_email(quote.repair_request.client.email, subject, body)
-        
-        # Notification à l'admin
-        admin_body = f"""
-Nouveau devis envoyé :
-
-Demande: {quote.repair_request.title}
-Client: {quote.repair_request.client.username}
-Réparateur: {quote.repairer.username}
-Prix: {quote.price / 100}€
-Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-"""
-        self.send_email(self.admin_email, "Nouveau devis envoyé", admin_body)
+        context = self._quote_context(quote)
+        self._enqueue([
+            self._templated(context['client_email'], 'quote_received', context),
+            # Notification à l'admin
+            self._templated(self.admin_email, 'admin_new_quote', context),
+        ])
     
     def send_quote_accepted_notification(self, quote):
         """Notification quand un devis est accepté"""
-        # Au réparateur
-        subject = "Votre devis a été accepté !"
-        body = f"""
-Bonjour {quote.repairer.username},
-
-Excellente nouvelle ! Votre devis pour "{quote.repair_request.title}" a été accepté.
-
-Client: {quote.repair_request.client.username}
-Ville: {quote.repair_request.city}
-Prix convenu: {quote.price / 100}€
-
-Vous pouvez maintenant contacter le client pour organiser l'intervention.
-
-L'équipe RépareTout
-"""
-        self.send_email(quote.repairer.email, subject, body)
-        
-        # Au client
-        client_subject = "Devis accepté - Prochaines étapes"
-        client_body = f"""
-Bonjour {quote.repair_request.client.username},
-
-Votre devis a été accepté. Le réparateur {quote.repairer.username} va vous contacter pour organiser l'intervention.
-
-Détails de l'intervention :
-Prix: {quote.price / 100}€
-Durée estimée: {quote.estimated_duration}
-Lieu: {'À domicile' if quote.location_type == 'domicile' else 'En atelier'}
-
-L'équipe RépareTout
-"""
-        self.send_email(quote.repair_request.client.email, client_subject, client_body)
-        
-        # Notification à l'admin
-        admin_body = f"""
-Devis accepté :
-
-Demande: {quote.repair_request.title}
-Client: {quote.repair_request.client.username} ({quote.repair_request.client.email})
-Réparateur: {quote.repairer.username} ({quote.repairer.email})
-Prix: {quote.price / 100}€
-Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-"""
-        self.send_email(self.admin_email, "Devis accepté - Intervention à suivre", admin_body)
+        context = self._quote_context(quote)
+        self._enqueue([
+            # Au réparateur
+            self._templated(context['repairer_email'], 'quote_accepted_repairer', context),
+            # Au client
+            self._templated(context['client_email'], 'quote_accepted_client', context),
+            # Notification à l'admin
+            self._templated(self.admin_email, 'admin_quote_accepted', context),
+        ])
     
     def send_admin_alert(self, subject, message):
         """Envoie une alerte à l'administrateur"""
-        full_subject = f"[RépareTout Alert] {subject}"
-        body = f"""
-Alerte RépareTout :
-
-{message}
-
-Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}
-"""
-        self.send_email(self.admin_email, full_subject, body)
+        context = {'subject': subject, 'message': message, 'date': self._now()}
+        self._enqueue([self._templated(self.admin_email, 'admin_alert', context)])
 
 # Instance globale du service email
 email_service = EmailService()
@@ -0,0 +1,261 @@
+from jinja2 import Environment, DictLoader, StrictUndefined, select_autoescape
+
+# Chaque email = trois gabarits : <nom>.subject, <nom>.txt et <nom>.html.
+# Ils sont compilés une seule fois à l'import, puis rendus à partir d'un
+# dict « plat » (chaînes, nombres) préparé par EmailService : aucun accès
+# aux relations SQLAlchemy pendant le rendu.
+_SOURCES = {
+    'base.html': """<!doctype html>
+<html lang="fr">
+<body style="margin:0;background:#F5F5DC;font-family:Arial,sans-serif;color:#222">
+<div style="max-width:560px;margin:24px auto;background:#fff;border-radius:8px;padding:24px">
+<h1 style="color:#2D5016;font-size:20px;margin-top:0">RépareTout</h1>
+{% block content %}{% endblock %}
+<p style="color:#2D5016">L'équipe RépareTout</p>
+</div>
+</body>
+</html>
+""",
+
+    # --- Inscription --------------------------------------------------------
+    'welcome_client.subject': "Bienvenue sur RépareTout !",
+    'welcome_client.txt': """
+Bonjour {{ username }},
+
+Bienvenue sur RépareTout, la plateforme qui remet vos objets en vie !
+
+Votre compte client a été créé avec succès. Vous pouvez maintenant :
+- Publier des demandes de réparation
+- Recevoir des devis de réparateurs qualifiés
+- Suivre l'avancement de vos réparations
+
+Connectez-vous dès maintenant pour publier votre première demande.
+
+L'équipe RépareTout
+""",
+    'welcome_client.html': """{% extends 'base.html' %}{% block content %}
+<p>Bonjour {{ username }},</p>
+<p>Bienvenue sur RépareTout, la plateforme qui remet vos objets en vie !</p>
+<p>Votre compte client a été créé avec succès. Vous pouvez maintenant :</p>
+<ul>
+<li>Publier des demandes de réparation</li>
+<li>Recevoir des devis de réparateurs qualifiés</li>
+<li>Suivre l'avancement de vos réparations</li>
+</ul>
+<p>Connectez-vous dès maintenant pour publier votre première demande.</p>
+{% endblock %}""",
+
+    'welcome_repairer.subject': "Bienvenue sur RépareTout !",
+    'welcome_repairer.txt': """
+Bonjour {{ username }},
+
+Bienvenue sur RépareTout, la plateforme qui remet les objets en vie !
+
+Votre compte réparateur a été créé avec succès. Vous pouvez maintenant :
+- Consulter les demandes de réparation
+- Envoyer des devis aux clients
+- Gérer vos interventions
+
+Votre compte sera vérifié sous 24h pour garantir la qualité de nos services.
+
+L'équipe RépareTout
+""",
+    'welcome_repairer.html': """{% extends 'base.html' %}{% block content %}
+<p>Bonjour {{ username }},</p>
+<p>Bienvenue sur RépareTout, la plateforme qui remet les objets en vie !</p>
+<p>Votre compte réparateur a été créé avec succès. Vous pouvez maintenant :</p>
+<ul>
+<li>Consulter les demandes de réparation</li>
+<li>Envoyer des devis aux clients</li>
+<li>Gérer vos interventions</li>
+</ul>
+<p>Votre compte sera vérifié sous 24h pour garantir la qualité de nos services.</p>
+{% endblock %}""",
+
+    'admin_new_user.subject': "Nouvelle inscription - {{ role }}",
+    'admin_new_user.txt': """
+Nouvelle inscription sur RépareTout :
+
+Utilisateur: {{ username }}
+Email: {{ email }}
+Rôle: {{ role }}
+Ville: {{ city }}
+Date: {{ date }}
+
+{{ "Compte réparateur à vérifier." if role == 'repairer' else "" }}
+""",
+    'admin_new_user.html': """{% extends 'base.html' %}{% block content %}
+<p>Nouvelle inscription sur RépareTout :</p>
+<p>Utilisateur : {{ username }}<br>Email : {{ email }}<br>Rôle : {{ role }}<br>
+Ville : {{ city }}<br>Date : {{ date }}</p>
+{% if role == 'repairer' %}<p><strong>Compte réparateur à vérifier.</strong></p>{% endif %}
+{% endblock %}""",
+
+    # --- Nouvelle demande ---------------------------------------------------
+    'new_request.subject': "Nouvelle demande de réparation - {{ category }}",
+    'new_request.txt': """
+Bonjour {{ username }},
+
+Une nouvelle demande de réparation correspond à vos compétences :
+
+Titre: {{ title }}
+Catégorie: {{ category }}
+Ville: {{ city }}
+Budget: {{ budget_min }}-{{ budget_max }}€ (si renseigné)
+
+Description:
+{{ description }}
+
+Connectez-vous pour consulter la demande complète et envoyer votre devis.
+
+L'équipe RépareTout
+""",
+    'new_request.html': """{% extends 'base.html' %}{% block content %}
+<p>Bonjour {{ username }},</p>
+<p>Une nouvelle demande de réparation correspond à vos compétences :</p>
+<p><strong>{{ title }}</strong><br>Catégorie : {{ category }}<br>Ville : {{ city }}<br>
+Budget : {{ budget_min }}-{{ budget_max }}€ (si renseigné)</p>
+<p style="white-space:pre-line">{{ description }}</p>
+<p>Connectez-vous pour consulter la demande complète et envoyer votre devis.</p>
+{% endblock %}""",
+
+    # --- Devis --------------------------------------------------------------
+    'quote_received.subject': "Nouveau devis reçu sur RépareTout",
+    'quote_received.txt': """
+Bonjour {{ client_username }},
+
+Vous avez reçu un nouveau devis pour votre demande "{{ request_title }}" :
+
+Réparateur: {{ repairer_username }}
+Prix: {{ price }}€
+Durée estimée: {{ estimated_duration }}
+Lieu: {{ location }}
+
+Conditions:
+{{ conditions }}
+
+Connectez-vous pour consulter le devis complet et l'accepter si il vous convient.
+
+L'équipe RépareTout
+""",
+    'quote_received.html': """{% extends 'base.html' %}{% block content %}
+<p>Bonjour {{ client_username }},</p>
+<p>Vous avez reçu un nouveau devis pour votre demande « {{ request_title }} » :</p>
+<p>Réparateur : {{ repairer_username }}<br>Prix : <strong>{{ price }}€</strong><br>
+Durée estimée : {{ estimated_duration }}<br>Lieu : {{ location }}</p>
+<p style="white-space:pre-line">{{ conditions }}</p>
+<p>Connectez-vous pour consulter le devis complet et l'accepter s'il vous convient.</p>
+{% endblock %}""",
+
+    'admin_new_quote.subject': "Nouveau devis envoyé",
+    'admin_new_quote.txt': """
+Nouveau devis envoyé :
+
+Demande: {{ request_title }}
+Client: {{ client_username }}
+Réparateur: {{ repairer_username }}
+Prix: {{ price }}€
+Date: {{ date }}
+""",
+    'admin_new_quote.html': """{% extends 'base.html' %}{% block content %}
+<p>Nouveau devis envoyé :</p>
+<p>Demande : {{ request_title }}<br>Client : {{ client_username }}<br>
+Réparateur : {{ repairer_username }}<br>Prix : {{ price }}€<br>Date : {{ date }}</p>
+{% endblock %}""",
+
+    'quote_accepted_repairer.subject': "Votre devis a été accepté !",
+    'quote_accepted_repairer.txt': """
+Bonjour {{ repairer_username }},
+
+Excellente nouvelle ! Votre devis pour "{{ request_title }}" a été accepté.
+
+Client: {{ client_username }}
+Ville: {{ request_city }}
+Prix convenu: {{ price }}€
+
+Vous pouvez maintenant contacter le client pour organiser l'intervention.
+
+L'équipe RépareTout
+""",
+    'quote_accepted_repairer.html': """{% extends 'base.html' %}{% block content %}
+<p>Bonjour {{ repairer_username }},</p>
+<p>Excellente nouvelle ! Votre devis pour « {{ request_title }} » a été accepté.</p>
+<p>Client : {{ client_username }}<br>Ville : {{ request_city }}<br>Prix convenu : <strong>{{ price }}€</strong></p>
+<p>Vous pouvez maintenant contacter le client pour organiser l'intervention.</p>
+{% endblock %}""",
+
+    'quote_accepted_client.subject': "Devis accepté - Prochaines étapes",
+    'quote_accepted_client.txt': """
+Bonjour {{ client_username }},
+
+Votre devis a été accepté. Le réparateur {{ repairer_username }} va vous contacter pour organiser l'intervention.
+
+Détails de l'intervention :
+Prix: {{ price }}€
+Durée estimée: {{ estimated_duration }}
+Lieu: {{ location }}
+
+L'équipe RépareTout
+""",
+    'quote_accepted_client.html': """{% extends 'base.html' %}{% block content %}
+<p>Bonjour {{ client_username }},</p>
+<p>Votre devis a été accepté. Le réparateur {{ repairer_username }} va vous contacter pour organiser l'intervention.</p>
+<p>Prix : <strong>{{ price }}€</strong><br>Durée estimée : {{ estimated_duration }}<br>Lieu : {{ location }}</p>
+{% endblock %}""",
+
+    'admin_quote_accepted.subject': "Devis accepté - Intervention à suivre",
+    'admin_quote_accepted.txt': """
+Devis accepté :
+
+Demande: {{ request_title }}
+Client: {{ client_username }} ({{ client_email }})
+Réparateur: {{ repairer_username }} ({{ repairer_email }})
+Prix: {{ price }}€
+Date: {{ date }}
+""",
+    'admin_quote_accepted.html': """{% extends 'base.html' %}{% block content %}
+<p>Devis accepté :</p>
+<p>Demande : {{ request_title }}<br>Client : {{ client_username }} ({{ client_email }})<br>
+Réparateur : {{ repairer_username }} ({{ repairer_email }})<br>Prix : {{ price }}€<br>Date : {{ date }}</p>
+{% endblock %}""",
+
+    # --- Divers -------------------------------------------------------------
+    'admin_alert.subject': "[RépareTout Alert] {{ subject }}",
+    'admin_alert.txt': """
+Alerte RépareTout :
+
+{{ message }}
+
+Date: {{ date }}
+""",
+    'admin_alert.html': """{% extends 'base.html' %}{% block content %}
+<p><strong>Alerte RépareTout :</strong></p>
+<p style="white-space:pre-line">{{ message }}</p>
+<p>Date : {{ date }}</p>
+{% endblock %}""",
+}
+
+_env = Environment(
+    loader=DictLoader(_SOURCES),
+    autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+    undefined=StrictUndefined,
+    keep_trailing_newline=True,
+)
+
+TEMPLATE_NAMES = sorted({name.rsplit('.', 1)[0] for name in _SOURCES if name != 'base.html'})
+
+# Compilation unique au démarrage
+_TEMPLATES = {
+    name: (
+        _env.get_template(f'{name}.subject'),
+        _env.get_template(f'{name}.txt'),
+        _env.get_template(f'{name}.html'),
+    )
+    for name in TEMPLATE_NAMES
+}
+
+
+def render(name, context):
+    """Rend le gabarit `name` ; retourne (sujet, texte brut, html)"""
+    subject, text, html = _TEMPLATES[name]
+    return subject.render(context), text.render(context), html.render(context)
@@ -0,0 +1,145 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from src.models.user import db, EmailOutbox
+from src.services.email_service import email_service
+
+POLL_INTERVAL = float(os.getenv('EMAIL_WORKER_POLL_SECONDS', 5))
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+BASE_BACKOFF = timedelta(seconds=30)
+MAX_BACKOFF = timedelta(hours=1)
+# Un email resté « sending » plus longtemps (worker tué en plein envoi) est repris
+STALE_LOCK = timedelta(minutes=10)
+
+
+def backoff(attempts):
+    """Délai avant la prochaine tentative : 30 s, 1 min, 2 min... plafonné à 1 h"""
+    return min(BASE_BACKOFF * (2 ** max(attempts - 1, 0)), MAX_BACKOFF)
+
+
+class OutboxWorker:
+    """
+    Vide la table EmailOutbox en tâche de fond.
+
+    Plusieurs workers (un par process gunicorn) peuvent tourner en parallèle :
+    chaque email est réservé par un UPDATE conditionnel avant l'envoi.
+    """
+
+    def __init__(self, app, service=email_service, poll_interval=POLL_INTERVAL):
+        self.app = app
+        self.service = service
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='email-outbox', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Appelé après une mise en file : envoi sans attendre le prochain tour"""
+        self._wakeup.set()
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    sent = self.drain()
+            except Exception:
+                self.app.logger.exception("Erreur worker email")
+                sent = 0
+            # Lot plein : on enchaîne, sinon on attend un réveil ou le prochain tour
+            if sent < BATCH_SIZE:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self, now):
+        """Réserve un lot d'emails à envoyer ; retourne leurs lignes"""
+        stale = now - STALE_LOCK
+        candidates = (
+            db.session.query(EmailOutbox.id)
+            .filter(db.or_(
+                db.and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+                db.and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale),
+            ))
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        claimed = []
+        for (outbox_id,) in candidates:
+            result = db.session.execute(
+                db.update(EmailOutbox)
+                .where(
+                    EmailOutbox.id == outbox_id,
+                    db.or_(
+                        EmailOutbox.status == 'pending',
+                        db.and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale),
+                    ),
+                )
+                .values(status='sending', locked_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append(outbox_id)
+        db.session.commit()
+        if not claimed:
+            return []
+        return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).all()
+
+    def drain(self):
+        """Envoie un lot d'emails en attente sur une seule session SMTP ; retourne le nombre traité"""
+        messages = self._claim(datetime.utcnow())
+        if not messages:
+            return 0
+        results = self.service.deliver_batch([
+            {
+                'to_email': m.to_email,
+                'subject': m.subject,
+                'body': m.body,
+                'html_body': m.html_body,
+                'is_html': m.is_html,
+            }
+            for m in messages
+        ])
+        batch = self.service.transport.last_batch
+        if batch is not None:
+            self.app.logger.debug('Lot SMTP : %s', batch.to_dict())
+        for message, error in zip(messages, results):
+            self._record(message, error)
+        db.session.commit()
+        return len(messages)
+
+    def _record(self, message, error):
+        message.attempts += 1
+        message.locked_at = None
+        if error is None:
+            message.status = 'sent'
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+        elif message.attempts >= MAX_ATTEMPTS:
+            message.status = 'failed'
+            message.last_error = str(error)[:1000]
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = datetime.utcnow() + backoff(message.attempts)
+            message.last_error = str(error)[:1000]
+
+if __name__ == '__main__':
+    # Worker dans un process séparé : EMAIL_WORKER=off côté gunicorn, puis
+    #   python -m src.services.email_worker
+    from src.factory import create_app
+
+    OutboxWorker(create_app({'EMAIL_WORKER': 'off'})).run_forever()
@@ -0,0 +1,282 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from src.models.user import db, UserEvent
+from src.services.db_routing import RoutingSession
+from src.services.json_provider import dumps_bytes
+
+# Événements poussés aux utilisateurs (Server-Sent Events).
+#
+# publish() écrit l'événement dans la transaction en cours (table user_event) :
+# rien n'est envoyé si elle est annulée. Dans chaque worker, un thread relais
+# lit les nouvelles lignes (réveillé tout de suite après un commit local,
+# sinon toutes les EVENTS_POLL_SECONDS pour les autres workers / machines)
+# et les distribue aux flux SSE ouverts sur ce worker.
+POLL_INTERVAL = float(os.getenv('EVENTS_POLL_SECONDS', 1))
+HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', 25))  # sous le délai d'inactivité des proxys
+MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', 2000))  # par worker
+MAX_STREAMS_PER_USER = int(os.getenv('EVENTS_MAX_STREAMS_PER_USER', 5))
+# Flux fermé au bout de ce délai : le navigateur se reconnecte (Last-Event-ID),
+# ce qui répartit à nouveau les connexions entre workers
+STREAM_MAX_AGE = float(os.getenv('EVENTS_STREAM_MAX_AGE', 900))
+RETENTION = timedelta(hours=float(os.getenv('EVENTS_RETENTION_HOURS', 24)))
+REPLAY_LIMIT = 100
+QUEUE_SIZE = 100  # événements en attente par flux ; au-delà le flux est fermé
+BATCH_SIZE = 500
+# Relecture des derniers identifiants : sur PostgreSQL deux transactions
+# peuvent être commitées dans le désordre de leurs identifiants
+LOOKBACK = 50
+PURGE_EVERY = 600  # tours du relais
+
+
+class TooManyStreams(Exception):
+    status_code = 503
+    message = 'Trop de connexions en direct, réessayez plus tard'
+    retry_after = 5
+
+
+def publish(user_id, kind, **data):
+    """Événement pour un utilisateur, envoyé au commit de la transaction en cours"""
+    db.session.add(UserEvent(user_id=user_id, kind=kind, payload=dumps_bytes(data).decode('utf-8')))
+    db.session.info['events_published'] = True
+
+
+def publish_many(events):
+    """Plusieurs événements (user_id, kind, data) en un seul INSERT, envoyés au commit"""
+    rows = [
+        {'user_id': user_id, 'kind': kind, 'payload': dumps_bytes(data).decode('utf-8')}
+        for user_id, kind, data in events
+    ]
+    if rows:
+        db.session.execute(db.insert(UserEvent), rows)
+        db.session.info['events_published'] = True
+
+
+def format_event(event_id, kind, payload):
+    """Message SSE (payload : JSON déjà sérialisé, sur une ligne)"""
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+def replay(user_id, after_id, limit=REPLAY_LIMIT):
+    """
+    Événements manqués depuis Last-Event-ID (reconnexion). None s'il y en a
+    trop : le client doit alors tout recharger (événement « resync »).
+    """
+    rows = (
+        db.session.query(UserEvent.id, UserEvent.kind, UserEvent.payload)
+        .filter(UserEvent.user_id == user_id, UserEvent.id > after_id)
+        .order_by(UserEvent.id)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return None
+    return [tuple(row) for row in rows]
+
+
+class Subscription:
+    """Un flux SSE ouvert : file d'événements bornée"""
+    __slots__ = ('user_id', 'closed', '_queue')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.closed = False
+        self._queue = queue.Queue(QUEUE_SIZE)
+
+    def put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Client trop lent : on coupe, il reprendra avec Last-Event-ID
+            self.close()
+
+    def close(self):
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def get(self, timeout):
+        """(id, kind, payload), None si fermé, ou False sans événement avant timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+
+
+class EventBroker:
+    """Abonnements par utilisateur et thread relais (une instance par worker)"""
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.app = None
+        self._subscribers = {}  # user_id -> set(Subscription)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._floor = 0  # événements antérieurs au démarrage : jamais relayés
+        self._seen = deque(maxlen=LOOKBACK * 4)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -- abonnements ---------------------------------------------------------
+
+    def subscribe(self, user_id):
+        with self._lock:
+            streams = self._subscribers.setdefault(user_id, set())
+            if self._count >= MAX_STREAMS or len(streams) >= MAX_STREAMS_PER_USER:
+                if not streams:
+                    del self._subscribers[user_id]
+                raise TooManyStreams()
+            subscription = Subscription(user_id)
+            streams.add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams and subscription in streams:
+                streams.discard(subscription)
+                self._count -= 1
+                if not streams:
+                    del self._subscribers[subscription.user_id]
+
+    def stream_count(self):
+        return self._count
+
+    def dispatch(self, rows):
+        with self._lock:
+            for event_id, user_id, kind, payload in rows:
+                for subscription in self._subscribers.get(user_id, ()):
+                    subscription.put((event_id, kind, payload))
+
+    # -- relais --------------------------------------------------------------
+
+    def start(self, app):
+        if self._thread and self._thread.is_alive():
+            return self
+        self.app = app
+        with app.app_context():
+            self._last_id = self._floor = db.session.query(db.func.max(UserEvent.id)).scalar() or 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='event-relay', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._lock:
+            for streams in self._subscribers.values():
+                for subscription in streams:
+                    subscription.close()
+
+    def wake(self):
+        """Appelé après un commit contenant des événements : relais immédiat"""
+        self._wakeup.set()
+
+    def run_forever(self):
+        rounds = 0
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    fetched = self.poll()
+                    rounds += 1
+                    if rounds % PURGE_EVERY == 0:
+                        self.purge()
+            except Exception:
+                self.app.logger.exception("Erreur relais événements")
+                fetched = 0
+            if fetched < BATCH_SIZE + LOOKBACK:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def poll(self):
+        """Distribue les nouveaux événements ; retourne le nombre de lignes lues"""
+        limit = BATCH_SIZE + LOOKBACK
+        rows = (
+            db.session.query(UserEvent.id, UserEvent.user_id, UserEvent.kind, UserEvent.payload)
+            .filter(UserEvent.id > max(self._last_id - LOOKBACK, self._floor))
+            .order_by(UserEvent.id)
+            .limit(limit)
+            .all()
+        )
+        db.session.rollback()  # pas de transaction ouverte entre deux tours
+        seen = set(self._seen)
+        fresh = [tuple(row) for row in rows if row[0] not in seen]
+        if fresh:
+            self._seen.extend(row[0] for row in fresh)
+            self._last_id = max(self._last_id, fresh[-1][0])
+            self.dispatch(fresh)
+        return len(rows)
+
+    def purge(self):
+        db.session.execute(db.delete(UserEvent).where(UserEvent.created_at < datetime.utcnow() - RETENTION))
+        db.session.commit()
+
+
+events_broker = EventBroker()
+
+
+def stream(subscription, backlog=(), heartbeat=HEARTBEAT, max_age=STREAM_MAX_AGE):
+    """
+    Générateur du flux SSE : événements manqués (ou « resync » si backlog est
+    None), puis événements en direct et commentaires de maintien de
+    connexion. Ne touche pas à la base.
+    """
+    deadline = time.monotonic() + max_age
+    last_id = 0
+    try:
+        yield f'retry: {int(POLL_INTERVAL * 3000)}\n\n'
+        if backlog is None:
+            yield 'event: resync\ndata: {}\n\n'
+            backlog = ()
+        for event_id, kind, payload in backlog:
+            last_id = event_id
+            yield format_event(event_id, kind, payload)
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = subscription.get(min(heartbeat, remaining))
+            if item is None:
+                break
+            if item is False:
+                yield ': ping\n\n'
+                continue
+            event_id, kind, payload = item
+            if event_id <= last_id:
+                continue  # déjà envoyé par la reprise
+            last_id = event_id
+            yield format_event(event_id, kind, payload)
+    finally:
+        events_broker.unsubscribe(subscription)
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(db_session):
+    if db_session.info.pop('events_published', False):
+        events_broker.wake()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _after_rollback(db_session):
+    db_session.info.pop('events_published', None)
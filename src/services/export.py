@@ -0,0 +1,369 @@
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Float, Integer, String, func, select
+from sqlalchemy.orm import aliased
+
+from src.models.user import db, User, RepairRequest, Quote
+from src.services.json_provider import dumps_bytes
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow absent : exports CSV et NDJSON seulement
+    pa = None
+
+# Exports administrateur : une seule requête SQL par export (jointures et
+# sous-requêtes corrélées, pas de to_dict()), lue par lots de EXPORT_YIELD_PER
+# lignes (curseur côté serveur sur PostgreSQL) et écrite au fil de l'eau.
+YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', 2000))
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'reparetout-exports'))
+RETENTION = timedelta(hours=float(os.getenv('EXPORT_RETENTION_HOURS', 24)))
+MAX_WORKERS = int(os.getenv('EXPORT_WORKERS', 1))
+PARQUET_ROW_GROUP = 100000
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Cellule interprétée comme une formule par les tableurs
+_FORMULA_START = '=+-@\t\r'
+_JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ExportError(Exception):
+    status_code = 400
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.message = message
+        if status_code is not None:
+            self.status_code = status_code
+
+
+# ---------------------------------------------------------------------------
+# Requêtes d'export : colonnes (nom, expression SQL) et filtres ?clé=valeur
+# ---------------------------------------------------------------------------
+
+def _users():
+    return User, [
+        ('id', User.id),
+        ('username', User.username),
+        ('email', User.email),
+        ('role', User.role),
+        ('status', User.status),
+        ('city', User.city),
+        ('phone', User.phone),
+        ('specialties', User.specialties),
+        ('latitude', User.latitude),
+        ('longitude', User.longitude),
+        ('created_at', User.created_at),
+        ('verified_at', User.verified_at),
+    ], {'role': User.role, 'status': User.status}, []
+
+
+def _requests():
+    client = aliased(User)
+    accepted = aliased(Quote)
+    repairer = aliased(User)
+    # Sous-requête corrélée sur l'index (repair_request_id, status) : pas de
+    # GROUP BY préalable sur tous les devis, les premières lignes partent tout de suite
+    quotes_count = (
+        select(func.count(Quote.id)).where(Quote.repair_request_id == RepairRequest.id)
+        .correlate(RepairRequest).scalar_subquery()
+    )
+    columns = [
+        ('id', RepairRequest.id),
+        ('title', RepairRequest.title),
+        ('category', RepairRequest.category),
+        ('subcategory', RepairRequest.subcategory),
+        ('city', RepairRequest.city),
+        ('latitude', RepairRequest.latitude),
+        ('longitude', RepairRequest.longitude),
+        ('budget_min', RepairRequest.budget_min),
+        ('budget_max', RepairRequest.budget_max),
+        ('status', RepairRequest.status),
+        ('visibility', RepairRequest.visibility),
+        ('client_id', RepairRequest.client_id),
+        ('client_username', client.username),
+        ('client_email', client.email),
+        ('quotes_count', quotes_count),
+        ('accepted_quote_id', RepairRequest.accepted_quote_id),
+        ('accepted_price', accepted.price),
+        ('accepted_repairer_id', accepted.repairer_id),
+        ('accepted_repairer_username', repairer.username),
+        ('created_at', RepairRequest.created_at),
+        ('updated_at', RepairRequest.updated_at),
+    ]
+    joins = [
+        (client, client.id == RepairRequest.client_id, False),
+        (accepted, accepted.id == RepairRequest.accepted_quote_id, True),
+        (repairer, repairer.id == accepted.repairer_id, True),
+    ]
+    filters = {
+        'status': RepairRequest.status,
+        'category': RepairRequest.category,
+        'client_id': RepairRequest.client_id,
+    }
+    return RepairRequest, columns, filters, joins
+
+
+def _quotes():
+    repairer = aliased(User)
+    columns = [
+        ('id', Quote.id),
+        ('repair_request_id', Quote.repair_request_id),
+        ('request_title', RepairRequest.title),
+        ('request_category', RepairRequest.category),
+        ('request_city', RepairRequest.city),
+        ('request_status', RepairRequest.status),
+        ('repairer_id', Quote.repairer_id),
+        ('repairer_username', repairer.username),
+        ('repairer_email', repairer.email),
+        ('price', Quote.price),  # en centimes
+        ('estimated_duration', Quote.estimated_duration),
+        ('location_type', Quote.location_type),
+        ('status', Quote.status),
+        ('created_at', Quote.created_at),
+    ]
+    joins = [
+        (RepairRequest, RepairRequest.id == Quote.repair_request_id, False),
+        (repairer, repairer.id == Quote.repairer_id, False),
+    ]
+    filters = {'status': Quote.status, 'repairer_id': Quote.repairer_id, 'repair_request_id': Quote.repair_request_id}
+    return Quote, columns, filters, joins
+
+
+EXPORTS = {
+    'users': _users,
+    'requests': _requests,
+    'quotes': _quotes,
+}
+
+
+def _date(args, name):
+    try:
+        return datetime.fromisoformat(args[name])
+    except ValueError:
+        raise ExportError(f'Date invalide pour {name} (format ISO 8601 attendu)')
+
+
+def export_query(kind, args):
+    """
+    (noms de colonnes, SELECT) de l'export `kind`, trié par identifiant.
+    Filtres : ceux du type (role, status, category...) et created_after /
+    created_before ; un paramètre inconnu est une erreur.
+    """
+    if kind not in EXPORTS:
+        raise ExportError('Export inconnu', 404)
+    model, columns, filters, joins = EXPORTS[kind]()
+
+    statement = select(*(expression.label(name) for name, expression in columns)).select_from(model)
+    for target, on, outer in joins:
+        statement = statement.join(target, on, isouter=outer)
+
+    for name in args:
+        if name == 'format':
+            continue
+        if name == 'created_after':
+            statement = statement.where(model.created_at >= _date(args, name))
+        elif name == 'created_before':
+            statement = statement.where(model.created_at < _date(args, name))
+        elif name in filters:
+            column = filters[name]
+            value = args[name]
+            if isinstance(column.type, Integer):
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise ExportError(f'Valeur invalide pour {name}')
+            statement = statement.where(column == value)
+        else:
+            raise ExportError(f'Filtre inconnu : {name}')
+
+    return [name for name, _ in columns], statement.order_by(model.id)
+
+
+def _partitions(statement):
+    """Lots de lignes lus au fil de l'eau (yield_per : curseur serveur sur PostgreSQL)"""
+    result = db.session.execute(statement.execution_options(yield_per=YIELD_PER))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+# ---------------------------------------------------------------------------
+# Flux CSV / NDJSON : un morceau de réponse par lot, mémoire constante
+# ---------------------------------------------------------------------------
+
+def iter_csv(names, statement):
+    # Conversions limitées aux colonnes concernées (type SQL), pas cellule par cellule
+    types = [column.type for column in statement.selected_columns]
+    dates = [i for i, sql_type in enumerate(types) if isinstance(sql_type, DateTime)]
+    texts = [i for i, sql_type in enumerate(types) if isinstance(sql_type, String)]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM : Excel ouvre le fichier en UTF-8 ; en-tête envoyé avant la première lecture
+    writer.writerow(names)
+    yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+
+    for rows in _partitions(statement):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            row = list(row)
+            for i in dates:
+                if row[i] is not None:
+                    row[i] = row[i].isoformat()
+            for i in texts:
+                # Pas de formule exécutée à l'ouverture dans un tableur (titres saisis par les utilisateurs)
+                if row[i] and row[i][0] in _FORMULA_START:
+                    row[i] = "'" + row[i]
+            writer.writerow(row)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(names, statement):
+    for rows in _partitions(statement):
+        yield b''.join(dumps_bytes(dict(zip(names, row))) + b'\n' for row in rows)
+
+
+# ---------------------------------------------------------------------------
+# Parquet : fichier écrit hors du thread de la requête, état sur disque
+# (lisible par tous les workers), récupéré ensuite par l'administrateur
+# ---------------------------------------------------------------------------
+
+def parquet_available():
+    return pa is not None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='export')
+        return _executor
+
+
+def _job_path(job_id, extension):
+    return os.path.join(EXPORT_DIR, f'{job_id}.{extension}')
+
+
+def _save_job(job):
+    # Fichier temporaire + rename : jamais d'état à moitié écrit
+    path = _job_path(job['id'], 'json')
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(job, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_job(job_id):
+    """État d'un export Parquet, None si inconnu ou expiré"""
+    if not _JOB_ID.fullmatch(job_id or ''):
+        return None
+    try:
+        with open(_job_path(job_id, 'json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def job_file(job_id):
+    return _job_path(job_id, 'parquet')
+
+
+def purge_jobs():
+    """Supprime les exports plus vieux que EXPORT_RETENTION_HOURS"""
+    limit = time.time() - RETENTION.total_seconds()
+    try:
+        names = os.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _arrow_type(sql_type):
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Float):
+        return pa.float64()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def _write_parquet(app, job, args):
+    with app.app_context():
+        tmp_path = f"{job_file(job['id'])}.tmp"
+        try:
+            names, statement = export_query(job['kind'], args)
+            schema = pa.schema([
+                (name, _arrow_type(column.type)) for name, column in zip(names, statement.selected_columns)
+            ])
+            rows = 0
+            with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+                for partition in _partitions(statement):
+                    values = list(zip(*partition))
+                    writer.write_batch(
+                        pa.record_batch([pa.array(col, type=field.type) for col, field in zip(values, schema)], schema=schema),
+                        row_group_size=PARQUET_ROW_GROUP,
+                    )
+                    rows += len(partition)
+                    if rows % (YIELD_PER * 50) == 0:
+                        _save_job(dict(job, rows=rows))  # avancement
+            os.replace(tmp_path, job_file(job['id']))
+            job.update(status='done', rows=rows, size_bytes=os.path.getsize(job_file(job['id'])))
+        except Exception as e:
+            app.logger.exception("Export Parquet %s impossible", job['id'])
+            job.update(status='error', error=str(e))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        finally:
+            db.session.remove()
+        job['finished_at'] = datetime.utcnow().isoformat()
+        _save_job(job)
+
+
+def start_parquet_export(app, kind, args):
+    """Lance l'export Parquet en arrière-plan ; retourne l'état initial du travail"""
+    if not parquet_available():
+        raise ExportError('Export Parquet indisponible (pyarrow non installé)', 501)
+    export_query(kind, args)  # filtres validés avant de répondre
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    purge_jobs()
+
+    job = {
+        'id': uuid.uuid4().hex, 'kind': kind, 'format': 'parquet', 'status': 'running',
+        'rows': 0, 'started_at': datetime.utcnow().isoformat(),
+    }
+    _save_job(job)
+    _get_executor().submit(_write_parquet, app, dict(job), dict(args))
+    return job
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
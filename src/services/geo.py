@@ -0,0 +1,157 @@
+import math
+
+from sqlalchemy import event, text, Integer, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.user import RepairRequest
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+DEFAULT_RADIUS_KM = 15.0
+MAX_RADIUS_KM = 200.0
+
+GEO_TABLE = 'repair_request_geo'
+
+# 'rtree' (SQLite R*Tree) ou 'bbox' (filtre sur latitude/longitude indexées)
+_backend = 'bbox'
+
+_SQLITE_DDL = [
+    # Index spatial : un point = une boîte de taille nulle
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {GEO_TABLE} USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_ai AFTER INSERT ON repair_request
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO {GEO_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_ad AFTER DELETE ON repair_request BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_au AFTER UPDATE OF latitude, longitude ON repair_request BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+        INSERT INTO {GEO_TABLE}
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END
+    """,
+]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en km entre deux points (degrés)"""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """Boîte (min_lat, max_lat, min_lon, max_lon) englobant le cercle de rayon donné"""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or abs(lat) + dlat >= 90:
+        # Près des pôles la boîte couvre toutes les longitudes
+        return max(lat - dlat, -90.0), min(lat + dlat, 90.0), -180.0, 180.0
+    dlon = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def _register_sqlite_functions(dbapi_conn, _record):
+    dbapi_conn.create_function('haversine_km', 4, haversine_km, deterministic=True)
+
+
+def install_geo_functions(engine):
+    """Fonction SQL haversine_km sur chaque connexion (aussi pour un réplica SQLite)"""
+    if engine.dialect.name != 'sqlite':
+        return
+    if not event.contains(engine, 'connect', _register_sqlite_functions):
+        event.listen(engine, 'connect', _register_sqlite_functions)
+        # Les connexions déjà ouvertes n'ont pas la fonction : on repart à neuf
+        engine.dispose()
+
+
+def install_geo_index(engine):
+    """Installe l'index spatial (R*Tree sur SQLite) et la fonction haversine_km"""
+    global _backend
+    if engine.dialect.name != 'sqlite':
+        _backend = 'bbox'
+        return _backend
+
+    install_geo_functions(engine)
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': GEO_TABLE}
+            ).first()
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            if not exists:
+                conn.execute(text(
+                    f"INSERT INTO {GEO_TABLE} "
+                    "SELECT id, latitude, latitude, longitude, longitude FROM repair_request "
+                    "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+                ))
+        _backend = 'rtree'
+    except SQLAlchemyError:
+        # Module R*Tree absent de cette build SQLite
+        _backend = 'bbox'
+    return _backend
+
+
+def _distance_expression(lat, lon, dialect_name):
+    if dialect_name == 'sqlite':
+        return func.haversine_km(lat, lon, RepairRequest.latitude, RepairRequest.longitude)
+
+    phi1 = math.radians(lat)
+    phi2 = func.radians(RepairRequest.latitude)
+    dphi = phi2 - phi1
+    dlambda = func.radians(RepairRequest.longitude) - math.radians(lon)
+    a = (
+        func.power(func.sin(dphi / 2), 2)
+        + math.cos(phi1) * func.cos(phi2) * func.power(func.sin(dlambda / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def near_requests(query, lat, lon, radius_km=DEFAULT_RADIUS_KM, dialect_name='sqlite'):
+    """
+    Restreint `query` aux demandes situées à moins de `radius_km` du point.
+
+    Préfiltre par boîte englobante (R*Tree ou index latitude/longitude),
+    puis distance exacte (haversine). Retourne (query, distance) où
+    `distance` est l'expression SQL en km, à utiliser pour le tri.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    bounds = {'min_lat': min_lat, 'max_lat': max_lat, 'min_lon': min_lon, 'max_lon': max_lon}
+
+    if _backend == 'rtree':
+        candidates = (
+            text(
+                f"SELECT id FROM {GEO_TABLE} "
+                "WHERE max_lat >= :min_lat AND min_lat <= :max_lat "
+                "AND max_lon >= :min_lon AND min_lon <= :max_lon"
+            )
+            .bindparams(**bounds)
+            .columns(id=Integer)
+            .subquery('geo_candidates')
+        )
+        query = query.join(candidates, candidates.c.id == RepairRequest.id)
+    else:
+        query = query.filter(
+            RepairRequest.latitude.between(min_lat, max_lat),
+            RepairRequest.longitude.between(min_lon, max_lon),
+        )
+
+    distance = _distance_expression(lat, lon, dialect_name)
+    return query.filter(distance <= radius_km), distance
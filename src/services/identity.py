@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, session
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from src.models.user import db, User
+from src.services.db_routing import RoutingSession
+
+CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+# Borne la durée pendant laquelle un autre worker peut voir un profil périmé
+CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 30))
+
+
+class UserSnapshot:
+    """Copie figée et légère d'un utilisateur (pas d'accès base, pas de session ORM)"""
+
+    __slots__ = ('id', 'username', 'email', 'role', 'status', '_data')
+
+    def __init__(self, user):
+        self._data = user.to_dict()
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.role = user.role
+        self.status = user.status
+
+    def to_dict(self):
+        return dict(self._data)
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+
+class _LRUCache:
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_users = _LRUCache(CACHE_SIZE, CACHE_TTL)
+
+
+def load_user(user_id):
+    """Instantané de l'utilisateur, depuis le cache du worker si possible"""
+    snapshot = _users.get(user_id)
+    if snapshot is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot(user)
+        _users.put(user_id, snapshot)
+    return snapshot
+
+
+def current_user():
+    """Utilisateur connecté (UserSnapshot) ou None ; aucune requête si déjà en cache"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    if 'current_user' not in g:
+        g.current_user = load_user(user_id)
+    return g.current_user
+
+
+def invalidate_user(user_id):
+    _users.pop(user_id)
+
+
+# Profil, rôle ou statut modifié / compte supprimé : l'instantané est retiré
+# du cache de ce worker, au flush puis au commit (une lecture entre les deux
+# aurait pu remettre l'ancienne version). Les autres workers le rechargent
+# au plus tard après CACHE_TTL.
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _on_user_change(mapper, connection, target):
+    invalidate_user(target.id)
+    object_session(target).info.setdefault('changed_users', set()).add(target.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(db_session):
+    for user_id in db_session.info.pop('changed_users', ()):
+        invalidate_user(user_id)
@@ -0,0 +1,174 @@
+import io
+import struct
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow absent : nettoyage sans perte uniquement
+    Image = None
+
+# Nettoyage des photos à la réception, avant le calcul du SHA-256 (nom du
+# fichier) : métadonnées EXIF (position GPS, appareil...), XMP, IPTC et
+# commentaires retirés sans toucher aux données de l'image. Seule une photo
+# prise « de travers » (orientation EXIF != 1) est réencodée, pixels tournés,
+# si Pillow est installé ; sinon l'orientation est conservée seule.
+
+ORIENTATION_TAG = 0x0112
+JPEG_QUALITY = 92
+
+# Segments JPEG retirés : APP1 (EXIF, XMP), APP13 (IPTC / Photoshop), COM
+_JPEG_DROPPED = {0xE1, 0xED, 0xFE}
+# Blocs PNG retirés : EXIF, textes (auteur, logiciel...), date de modification
+_PNG_DROPPED = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+# Blocs WebP retirés, et drapeaux correspondants de l'en-tête VP8X
+_WEBP_DROPPED = {b'EXIF': 0x08, b'XMP ': 0x04}
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class InvalidImage(ValueError):
+    """Structure du fichier illisible (tronqué, faux en-tête...)"""
+
+
+def _tiff_orientation(tiff):
+    """Valeur de l'étiquette Orientation d'un bloc TIFF (EXIF), ou None"""
+    if tiff.startswith(b'Exif\x00\x00'):
+        tiff = tiff[6:]
+    if len(tiff) < 8 or tiff[:2] not in (b'II', b'MM'):
+        return None
+    order = '<' if tiff[:2] == b'II' else '>'
+    try:
+        (offset,) = struct.unpack_from(order + 'I', tiff, 4)
+        (count,) = struct.unpack_from(order + 'H', tiff, offset)
+        for i in range(count):
+            tag, kind, _n, value = struct.unpack_from(order + 'HHI4s', tiff, offset + 2 + 12 * i)
+            if tag == ORIENTATION_TAG and kind == 3:
+                return struct.unpack_from(order + 'H', value)[0]
+    except struct.error:
+        return None
+    return None
+
+
+def _orientation_segment(orientation):
+    """APP1 EXIF minimal : la seule étiquette Orientation"""
+    tiff = b'MM\x00\x2a' + struct.pack('>IH', 8, 1) + struct.pack('>HHIHH', ORIENTATION_TAG, 3, 1, orientation, 0)
+    payload = b'Exif\x00\x00' + tiff + struct.pack('>I', 0)
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _strip_jpeg(data):
+    if not data.startswith(b'\xff\xd8'):
+        raise InvalidImage()
+    kept, orientation = [b'\xff\xd8'], None
+    pos = 2
+    while True:
+        if pos + 4 > len(data) or data[pos] != 0xFF:
+            raise InvalidImage()
+        marker = data[pos + 1]
+        if marker == 0xFF:  # octet de bourrage
+            pos += 1
+            continue
+        if marker == 0xDA:  # début des données compressées : recopiées telles quelles
+            kept.append(data[pos:])
+            break
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            kept.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        (length,) = struct.unpack_from('>H', data, pos + 2)
+        end = pos + 2 + length
+        if length < 2 or end > len(data):
+            raise InvalidImage()
+        if marker in _JPEG_DROPPED:
+            if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+                orientation = _tiff_orientation(data[pos + 4:end]) or orientation
+        else:
+            kept.append(data[pos:end])
+        pos = end
+    return kept, orientation
+
+
+def _strip_png(data):
+    if not data.startswith(_PNG_SIGNATURE):
+        raise InvalidImage()
+    kept, orientation = [_PNG_SIGNATURE], None
+    pos = len(_PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 12 > len(data):
+            raise InvalidImage()
+        (length,) = struct.unpack_from('>I', data, pos)
+        kind = data[pos + 4:pos + 8]
+        end = pos + 12 + length
+        if end > len(data):
+            raise InvalidImage()
+        if kind in _PNG_DROPPED:
+            if kind == b'eXIf':
+                orientation = _tiff_orientation(data[pos + 8:end - 4])
+        else:
+            kept.append(data[pos:end])
+        pos = end
+        if kind == b'IEND':
+            break
+    return kept, orientation
+
+
+def _strip_webp(data):
+    if len(data) < 12 or data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        raise InvalidImage()
+    chunks, orientation, dropped_flags = [], None, 0
+    pos = 12
+    while pos + 8 <= len(data):
+        kind = data[pos:pos + 4]
+        (size,) = struct.unpack_from('<I', data, pos + 4)
+        end = pos + 8 + size + (size & 1)
+        if pos + 8 + size > len(data):
+            raise InvalidImage()
+        if kind in _WEBP_DROPPED:
+            dropped_flags |= _WEBP_DROPPED[kind]
+            if kind == b'EXIF':
+                orientation = _tiff_orientation(data[pos + 8:pos + 8 + size])
+        else:
+            chunks.append(bytearray(data[pos:end]))
+        pos = end
+    for chunk in chunks:
+        if chunk[:4] == b'VP8X':
+            chunk[8] &= ~dropped_flags & 0xFF
+    body = b'WEBP' + b''.join(chunks)
+    return [b'RIFF', struct.pack('<I', len(body)), body], orientation
+
+
+_STRIPPERS = {'jpg': _strip_jpeg, 'png': _strip_png, 'webp': _strip_webp}
+
+
+def _reencode_upright(data, ext):
+    """Pixels tournés selon l'orientation EXIF, réenregistrés sans métadonnées"""
+    with Image.open(io.BytesIO(data)) as source:
+        icc_profile = source.info.get('icc_profile')
+        image = ImageOps.exif_transpose(source)
+        buffer = io.BytesIO()
+        if ext == 'jpg':
+            image.save(buffer, 'JPEG', quality=JPEG_QUALITY, icc_profile=icc_profile)
+        elif ext == 'png':
+            image.save(buffer, 'PNG', icc_profile=icc_profile)
+        else:
+            image.save(buffer, 'WEBP', quality=JPEG_QUALITY, icc_profile=icc_profile)
+    return buffer.getvalue()
+
+
+def strip_metadata(data, ext):
+    """
+    Contenu de l'image (`ext` : jpg, png, webp) sans métadonnées, orientation
+    appliquée. Même entrée, même sortie : les doublons gardent le même SHA-256.
+    Lève InvalidImage si la structure du fichier est illisible.
+    """
+    parts, orientation = _STRIPPERS[ext](data)
+    if orientation in (None, 1):
+        return b''.join(parts)
+    if Image is not None:
+        try:
+            return strip_metadata(_reencode_upright(data, ext), ext)
+        except (OSError, ValueError):
+            raise InvalidImage()
+    if ext == 'jpg':
+        # Sans Pillow : orientation gardée seule, appliquée par les navigateurs
+        at = 2 if len(parts) > 1 and parts[1].startswith(b'\xff\xe0') else 1  # après l'APP0 JFIF
+        return b''.join(parts[:at]) + _orientation_segment(orientation) + b''.join(parts[at:])
+    return b''.join(parts)
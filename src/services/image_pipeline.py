@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow absent : originaux (nettoyés à la réception) sans miniatures
+    Image = None
+
+# (libellé, largeur max en px) des miniatures générées pour chaque photo
+VARIANTS = (('thumb', 320), ('large', 1024))
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+MAX_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+_executor = None
+_executor_lock = threading.Lock()
+# Traitements en cours par chemin d'original
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def available():
+    return Image is not None
+
+
+def _formats():
+    formats = [('webp', 'WEBP', {'quality': WEBP_QUALITY, 'method': 4})]
+    if features.check('avif'):
+        formats.append(('avif', 'AVIF', {'quality': AVIF_QUALITY}))
+    return formats
+
+
+def process_image(path):
+    """
+    Exécuté dans un process du pool (pas d'accès base de données).
+
+    Génère les miniatures WebP (et AVIF si supporté) à côté de l'original,
+    orientation appliquée. L'original n'est jamais modifié : son nom est le
+    SHA-256 de son contenu, déjà débarrassé des métadonnées à la réception
+    (src/services/image_metadata.py). Retourne les dimensions de l'original
+    et la liste des variantes.
+    """
+    directory, filename = os.path.split(path)
+    stem = filename.rsplit('.', 1)[0]
+
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        width, height = image.size
+
+        variants = []
+        for label, max_width in VARIANTS:
+            resized = image
+            if width > max_width:
+                resized = image.resize((max_width, round(height * max_width / width)), Image.LANCZOS)
+            for extension, pil_format, options in _formats():
+                name = f'{stem}_{max_width}.{extension}'
+                target = os.path.join(directory, name)
+                # fichier temporaire + rename : jamais de fichier à moitié écrit servi
+                tmp_path = f'{target}.{os.getpid()}.tmp'
+                resized.save(tmp_path, format=pil_format, **options)
+                os.replace(tmp_path, target)
+                variants.append({
+                    'label': label,
+                    'format': extension,
+                    'filename': name,
+                    'width': resized.width,
+                    'height': resized.height,
+                    'size_bytes': os.path.getsize(target),
+                })
+
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn : pas de fork d'un worker web multi-thread
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def _store_result(app, image_id, future):
+    from src.models.user import db, RepairImage, RepairImageVariant
+
+    try:
+        result = future.result()
+    except Exception as e:
+        app.logger.error("Traitement de l'image %s impossible: %s", image_id, e)
+        return
+
+    with app.app_context():
+        try:
+            image = db.session.get(RepairImage, image_id)
+            if image is None:
+                return
+            image.width = result['width']
+            image.height = result['height']
+            base_url = image.url.rsplit('/', 1)[0]
+            # Variantes déjà enregistrées (copiées d'un doublon...) : pas de doublon de ligne
+            existing = {(v.label, v.format) for v in image.variants}
+            for variant in result['variants']:
+                if (variant['label'], variant['format']) in existing:
+                    continue
+                db.session.add(RepairImageVariant(
+                    image_id=image_id,
+                    label=variant['label'],
+                    format=variant['format'],
+                    url=f"{base_url}/{variant['filename']}",
+                    width=variant['width'],
+                    height=variant['height'],
+                    size_bytes=variant['size_bytes'],
+                ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Enregistrement des variantes de l'image %s impossible", image_id)
+
+
+def reuse_variants(image):
+    """
+    Photo déjà stockée (même contenu, voir src/services/uploads.py) : recopie
+    les variantes d'une image existante au lieu de relancer le traitement.
+    Retourne False si aucune image traitée n'est disponible.
+    """
+    from src.models.user import db, RepairImage, RepairImageVariant
+
+    source = (
+        RepairImage.query
+        .filter(RepairImage.filename == image.filename, RepairImage.id != image.id)
+        .filter(RepairImage.width.isnot(None))
+        .first()
+    )
+    if source is None or not source.variants:
+        return False
+    image.width, image.height = source.width, source.height
+    for variant in source.variants:
+        db.session.add(RepairImageVariant(
+            image_id=image.id,
+            label=variant.label,
+            format=variant.format,
+            url=variant.url,
+            width=variant.width,
+            height=variant.height,
+            size_bytes=variant.size_bytes,
+        ))
+    return True
+
+
+def _finished(path, future):
+    with _pending_lock:
+        if _pending.get(path) is future:
+            del _pending[path]
+
+
+def schedule(app, image_id, path):
+    """
+    Lance le traitement de la photo hors du thread de la requête. Un même
+    fichier (doublon envoyé pendant le traitement) n'est traité qu'une fois :
+    chaque image reçoit le résultat du calcul en cours.
+    """
+    if not available():
+        return None
+    with _pending_lock:
+        future = _pending.get(path)
+        if future is None:
+            future = _pending[path] = _get_executor().submit(process_image, path)
+            future.add_done_callback(lambda f: _finished(path, f))
+    future.add_done_callback(lambda f: _store_result(app, image_id, f))
+    return future
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,341 @@
+import cProfile
+import heapq
+import hmac
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request, request_finished, request_started, request_tearing_down
+from sqlalchemy import event
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument absent : profils cProfile (.prof, lisibles avec pstats / snakeviz)
+    Profiler = None
+
+# Instrumentation facultative (INSTRUMENTATION=on, voir src/factory.py) : nombre et
+# durée des requêtes SQL par requête HTTP, histogrammes Prometheus sur
+# /api/metrics, profils échantillonnés. Les métriques sont propres à chaque
+# worker gunicorn.
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+SLOWEST_KEPT = int(os.getenv('SLOWEST_STATEMENTS_KEPT', 5))
+# Même requête SQL répétée au moins N fois dans une requête HTTP : N+1 probable
+REPEATED_STATEMENT_THRESHOLD = int(os.getenv('REPEATED_STATEMENT_THRESHOLD', 10))
+# Authorization: Bearer <token> exigé si défini ; sinon session administrateur
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # 0.01 = 1 requête sur 100
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')  # X-Profile: <token> force un profil
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'reparetout-profiles'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 50))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Histogram:
+    """Histogramme cumulatif au format d'exposition texte de Prometheus"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # valeurs des labels -> [compteurs par seuil, somme, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labelvalues, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _labels(self.labelnames, labelvalues, ('le', repr(float(bound))))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _labels(self.labelnames, labelvalues, ('le', '+Inf'))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _labels(self.labelnames, labelvalues)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labelvalues)} {value}')
+        return lines
+
+
+# Label « endpoint » = règle d'URL (/api/admin/users/<int:user_id>/status) :
+# cardinalité bornée quel que soit le trafic
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Durée des requêtes HTTP', ('method', 'endpoint', 'status'))
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'Requêtes SQL par requête HTTP', ('method', 'endpoint'), QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds', 'Temps SQL cumulé par requête HTTP', ('method', 'endpoint'))
+STATEMENT_DURATION = Histogram('db_statement_duration_seconds', 'Durée de chaque requête SQL')
+SLOW_REQUESTS = CounterMetric(
+    'http_slow_requests_total', f'Requêtes HTTP de plus de {SLOW_REQUEST_MS:g} ms', ('method', 'endpoint'))
+REPEATED_STATEMENTS = CounterMetric(
+    'http_repeated_statement_requests_total', 'Requêtes HTTP avec une même requête SQL répétée (N+1 probable)',
+    ('method', 'endpoint'))
+PROFILES = CounterMetric('http_profiles_total', 'Profils capturés', ('trigger',))
+# Envois SMTP (src/services/smtp_transport.py), alimentés même sans INSTRUMENTATION=on
+SMTP_MESSAGES = CounterMetric('smtp_messages_total', 'Emails soumis au serveur SMTP', ('result',))
+SMTP_RECONNECTS = CounterMetric('smtp_reconnects_total', 'Reconnexions SMTP en cours de lot')
+SMTP_BATCH_DURATION = Histogram('smtp_batch_duration_seconds', 'Durée des envois groupés SMTP')
+
+METRICS = (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_TIME, STATEMENT_DURATION,
+           SLOW_REQUESTS, REPEATED_STATEMENTS, PROFILES,
+           SMTP_MESSAGES, SMTP_RECONNECTS, SMTP_BATCH_DURATION)
+
+
+class RequestStats:
+    """Requêtes SQL d'une requête HTTP (stockées sur flask.g)"""
+    __slots__ = ('started', 'count', 'db_time', 'slowest', 'statements', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest = []  # tas (durée, requête) des SLOWEST_KEPT plus lentes
+        self.statements = Counter()
+        self.profiler = None
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+        item = (elapsed, statement)
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, item)
+        elif item > self.slowest[0]:
+            heapq.heapreplace(self.slowest, item)
+
+
+# ------------------------------------------------------------------------------
+# SQL
+# ------------------------------------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    STATEMENT_DURATION.observe(elapsed)
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    # Requête en échec : after_cursor_execute n'est pas appelé
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+
+def instrument_engine(engine):
+    if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+# ------------------------------------------------------------------------------
+# Profils
+# ------------------------------------------------------------------------------
+# Un seul profil à la fois par process (les profileurs Python sont exclusifs)
+_profile_lock = threading.Lock()
+
+
+def _profile_trigger():
+    header = request.headers.get('X-Profile')
+    if header and PROFILE_TOKEN and hmac.compare_digest(header, PROFILE_TOKEN):
+        return 'header'
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def _start_profile():
+    trigger = _profile_trigger()
+    if trigger is None or not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = Profiler() if Profiler is not None else cProfile.Profile()
+    try:
+        if Profiler is not None:
+            profiler.start()
+        else:
+            profiler.enable()
+    except Exception:
+        _profile_lock.release()
+        return None
+    PROFILES.inc(trigger)
+    return profiler
+
+
+def _stop_profile(profiler):
+    try:
+        if Profiler is not None:
+            profiler.stop()
+        else:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+
+
+def _save_profile(profiler, endpoint):
+    """Écrit le profil dans PROFILE_DIR (PROFILE_KEEP derniers conservés), retourne son nom"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', endpoint).strip('_') or 'root'
+    extension = 'html' if Profiler is not None else 'prof'
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{slug}.{extension}'
+    path = os.path.join(PROFILE_DIR, name)
+    if Profiler is not None:
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.dump_stats(path)
+
+    profiles = sorted(os.listdir(PROFILE_DIR))
+    for old in profiles[:-PROFILE_KEEP]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old))
+        except OSError:
+            pass
+    return name
+
+
+# ------------------------------------------------------------------------------
+# Requêtes HTTP (signaux Flask)
+# ------------------------------------------------------------------------------
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _on_request_started(sender, **extra):
+    g.request_stats = stats = RequestStats()
+    stats.profiler = _start_profile()
+
+
+def _on_request_finished(sender, response, **extra):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - stats.started
+    method, endpoint = request.method, _endpoint()
+
+    if stats.profiler is not None:
+        profiler, stats.profiler = stats.profiler, None
+        _stop_profile(profiler)
+        try:
+            response.headers['X-Profile-Id'] = _save_profile(profiler, endpoint)
+        except OSError:
+            current_app.logger.exception('Profil non enregistré')
+
+    REQUEST_DURATION.observe(elapsed, method, endpoint, str(response.status_code))
+    REQUEST_QUERIES.observe(stats.count, method, endpoint)
+    REQUEST_DB_TIME.observe(stats.db_time, method, endpoint)
+    response.headers['Server-Timing'] = (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.count} SQL", app;dur={elapsed * 1000:.1f}'
+    )
+
+    repeated = [(n, sql) for sql, n in stats.statements.items() if n >= REPEATED_STATEMENT_THRESHOLD]
+    if repeated:
+        REPEATED_STATEMENTS.inc(method, endpoint)
+    if elapsed * 1000 >= SLOW_REQUEST_MS or repeated:
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            SLOW_REQUESTS.inc(method, endpoint)
+        slowest = '\n'.join(
+            f'  {duration * 1000:.1f} ms  {" ".join(sql.split())[:300]}'
+            for duration, sql in sorted(stats.slowest, reverse=True)
+        )
+        repeated_lines = '\n'.join(f'  x{n}  {" ".join(sql.split())[:300]}' for n, sql in sorted(repeated, reverse=True))
+        current_app.logger.warning(
+            '%s %s -> %s en %.1f ms, %d requêtes SQL (%.1f ms)\nPlus lentes :\n%s%s',
+            method, request.full_path.rstrip('?'), response.status_code, elapsed * 1000,
+            stats.count, stats.db_time * 1000, slowest,
+            f'\nRépétées (N+1 ?) :\n{repeated_lines}' if repeated else '',
+        )
+
+
+def _on_request_tearing_down(sender, **extra):
+    # Exception non rattrapée avant request_finished : ne pas laisser le profileur actif
+    stats = g.pop('request_stats', None)
+    if stats is not None and stats.profiler is not None:
+        _stop_profile(stats.profiler)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    # Jamais public : routes, latences et volumes d'envoi renseignent un attaquant
+    if METRICS_TOKEN:
+        expected = f'Bearer {METRICS_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return {'error': 'Accès non autorisé'}, 401
+    else:
+        from src.routes.admin import require_admin
+        auth_error = require_admin()
+        if auth_error:
+            return auth_error
+    return current_app.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def install_instrumentation(app, engines):
+    """Branche l'instrumentation sur l'app et les moteurs SQLAlchemy, expose /api/metrics"""
+    for engine in engines:
+        instrument_engine(engine)
+    request_started.connect(_on_request_started, app)
+    request_finished.connect(_on_request_finished, app)
+    request_tearing_down.connect(_on_request_tearing_down, app)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_view, methods=['GET'])
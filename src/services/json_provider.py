@@ -0,0 +1,67 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson absent : json de la bibliothèque standard
+    orjson = None
+
+
+def _default(obj):
+    """Types non gérés nativement : lignes de modèle, Decimal, dates (repli stdlib)"""
+    to_dict = getattr(obj, 'to_dict', None)
+    if callable(to_dict):
+        return to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Objet de type {type(obj).__name__} non sérialisable en JSON")
+
+
+def dumps_bytes(obj, sort_keys=False, indent=False):
+    """JSON en octets UTF-8 (orjson si disponible)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, sort_keys=sort_keys,
+        indent=2 if indent else None, separators=None if indent else (',', ':'),
+    ).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Fournisseur JSON de l'app (jsonify, request.get_json) : orjson avec repli
+    sur la bibliothèque standard. Dates en ISO 8601, objets à to_dict() acceptés.
+    """
+
+    def _indent(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Octets directement : pas d'aller-retour par une chaîne Python
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, indent=self._indent())
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,230 @@
+import heapq
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from operator import itemgetter
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+
+from src.models.user import db, User
+from src.services.db_routing import RoutingSession
+from src.services.geo import bounding_box
+
+# Rayon autour de l'atelier d'un réparateur (demandes géolocalisées)
+MATCH_RADIUS_KM = float(os.getenv('MATCH_RADIUS_KM', 25))
+# Plafond de destinataires par nouvelle demande (les plus proches d'abord)
+MATCH_MAX_RECIPIENTS = int(os.getenv('MATCH_MAX_RECIPIENTS', 200))
+# Reconstruction complète périodique : changements faits par un autre worker
+# ou par des UPDATE en masse (hors événements ORM)
+MATCH_INDEX_TTL = float(os.getenv('MATCH_INDEX_TTL', 300))
+
+ANY_CATEGORY = '*'
+# Côté d'une cellule de la grille, en degrés de latitude
+CELL_DEG = MATCH_RADIUS_KM / 111.32
+
+
+def normalize(value):
+    """« Saint-Étienne » et « saint etienne » : même clé"""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(value.casefold().replace('-', ' ').split())
+
+
+def parse_specialties(value):
+    """Liste ou chaîne « a, b » -> chaîne normalisée « a,b » (None = toutes catégories)"""
+    if value is None:
+        return None
+    items = value.split(',') if isinstance(value, str) else value
+    codes = sorted({str(item).strip().lower() for item in items if str(item).strip()})
+    return ','.join(codes) or None
+
+
+def _float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _cell(lat, lon):
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+def _cells_around(lat, lon, radius_km):
+    """Cellules de la grille qui recouvrent le cercle (rayon en km)"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    (row_min, col_min), (row_max, col_max) = _cell(min_lat, min_lon), _cell(max_lat, max_lon)
+    for row in range(row_min, row_max + 1):
+        for col in range(col_min, col_max + 1):
+            yield row, col
+
+
+class Repairer:
+    """Réparateur éligible : actif, vérifié ; de quoi lui écrire et le situer"""
+    __slots__ = ('id', 'username', 'email', 'city', 'categories', 'latitude', 'longitude')
+
+    def __init__(self, id, username, email, city, specialties, latitude, longitude):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.city = normalize(city)
+        self.categories = tuple(specialties.split(',')) if specialties else (ANY_CATEGORY,)
+        self.latitude = _float(latitude)
+        self.longitude = _float(longitude)
+
+    @property
+    def located(self):
+        return self.latitude is not None and self.longitude is not None
+
+    @classmethod
+    def from_user(cls, user):
+        """None si l'utilisateur ne doit pas recevoir les nouvelles demandes"""
+        if user.role != 'repairer' or user.status != 'active' or user.verified_at is None:
+            return None
+        return cls(user.id, user.username, user.email, user.city, user.specialties, user.latitude, user.longitude)
+
+
+class RepairerIndex:
+    """
+    Index inversé en mémoire (par worker) : (catégorie, ville) et
+    (catégorie, cellule géographique) -> réparateurs. Une nouvelle demande
+    est résolue sans requête SQL ; les réparateurs sans spécialité sont
+    rangés sous ANY_CATEGORY.
+    """
+
+    def __init__(self, ttl=MATCH_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._repairers = {}
+        self._by_city = defaultdict(set)
+        self._by_cell = defaultdict(dict)  # -> {user_id: (latitude, longitude)}
+        self._expires = 0.0
+
+    # -- construction --------------------------------------------------------
+
+    def rebuild(self):
+        rows = db.session.execute(
+            select(User.id, User.username, User.email, User.city, User.specialties, User.latitude, User.longitude)
+            .where(User.role == 'repairer', User.status == 'active', User.verified_at.isnot(None))
+        ).all()
+        with self._lock:
+            self._repairers.clear()
+            self._by_city.clear()
+            self._by_cell.clear()
+            for row in rows:
+                self._add(Repairer(*row))
+            self._expires = time.monotonic() + self.ttl
+        return len(rows)
+
+    def invalidate(self):
+        """Reconstruction complète à la prochaine utilisation (après un UPDATE en masse)"""
+        with self._lock:
+            self._expires = 0.0
+
+    def _ensure(self):
+        if self._expires <= time.monotonic():
+            with self._lock:
+                if self._expires <= time.monotonic():
+                    self.rebuild()
+
+    def _add(self, repairer):
+        self._repairers[repairer.id] = repairer
+        for category in repairer.categories:
+            if repairer.city:
+                self._by_city[(category, repairer.city)].add(repairer.id)
+            if repairer.located:
+                cell = _cell(repairer.latitude, repairer.longitude)
+                self._by_cell[(category, cell)][repairer.id] = (repairer.latitude, repairer.longitude)
+
+    def _remove(self, user_id):
+        repairer = self._repairers.pop(user_id, None)
+        if repairer is None:
+            return
+        for category in repairer.categories:
+            if repairer.city:
+                self._by_city[(category, repairer.city)].discard(user_id)
+            if repairer.located:
+                self._by_cell[(category, _cell(repairer.latitude, repairer.longitude))].pop(user_id, None)
+
+    def apply(self, changes):
+        """Changements commités : user_id -> Repairer, ou None (retiré de l'index)"""
+        with self._lock:
+            for user_id, repairer in changes.items():
+                self._remove(user_id)
+                if repairer is not None:
+                    self._add(repairer)
+
+    def __len__(self):
+        self._ensure()
+        return len(self._repairers)
+
+    # -- résolution ----------------------------------------------------------
+
+    def match(self, category, city=None, latitude=None, longitude=None, exclude=(), limit=MATCH_MAX_RECIPIENTS):
+        """
+        Réparateurs de la catégorie (ou sans spécialité) situés dans la ville
+        de la demande ou à moins de MATCH_RADIUS_KM de son point, les plus
+        proches d'abord.
+        """
+        self._ensure()
+        category = (category or '').strip().lower()
+        keys = (category, ANY_CATEGORY) if category else (ANY_CATEGORY,)
+        city = normalize(city)
+        latitude, longitude = _float(latitude), _float(longitude)
+
+        with self._lock:
+            near = {}  # user_id -> distance² (en degrés de latitude)
+            if latitude is not None and longitude is not None:
+                # Projection équirectangulaire : écart négligeable à cette échelle
+                cos_lat = math.cos(math.radians(latitude))
+                max_d2 = CELL_DEG * CELL_DEG
+                for cell in _cells_around(latitude, longitude, MATCH_RADIUS_KM):
+                    for key in keys:
+                        for user_id, (lat, lon) in self._by_cell.get((key, cell), {}).items():
+                            d2 = (lat - latitude) ** 2 + ((lon - longitude) * cos_lat) ** 2
+                            if d2 <= max_d2:
+                                near[user_id] = d2
+            in_city = set().union(*(self._by_city.get((key, city), ()) for key in keys)) if city else set()
+            in_city.difference_update(near, exclude)
+            for user_id in exclude:
+                near.pop(user_id, None)
+
+            # Les plus proches d'abord, puis ceux de la ville sans position
+            ranked = [user_id for user_id, _ in heapq.nsmallest(limit, near.items(), key=itemgetter(1))]
+            if len(ranked) < limit:
+                ranked.extend(heapq.nsmallest(limit - len(ranked), in_city))
+            return [self._repairers[user_id] for user_id in ranked]
+
+
+repairer_index = RepairerIndex()
+
+
+# Profil, rôle, statut ou vérification modifiés : l'entrée est recalculée
+# depuis l'objet au flush et appliquée à l'index au commit seulement
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def _on_user_saved(mapper, connection, target):
+    object_session(target).info.setdefault('repairer_changes', {})[target.id] = Repairer.from_user(target)
+
+
+@event.listens_for(User, 'after_delete')
+def _on_user_deleted(mapper, connection, target):
+    object_session(target).info.setdefault('repairer_changes', {})[target.id] = None
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(db_session):
+    changes = db_session.info.pop('repairer_changes', None)
+    if changes:
+        repairer_index.apply(changes)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _after_rollback(db_session):
+    db_session.info.pop('repairer_changes', None)
@@ -0,0 +1,349 @@
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text, inspect, select,
+)
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+# Un seul process migre à la fois (workers gunicorn qui démarrent ensemble) :
+# pg_advisory_lock sur PostgreSQL, BEGIN IMMEDIATE sur SQLite
+ADVISORY_LOCK_KEY = 72_657_061  # identifiant arbitraire, propre à cette application
+LOCK_TIMEOUT = 600  # secondes d'attente au plus derrière un autre process (SQLite)
+
+# Versions déjà appliquées, une ligne par migration
+_meta = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _meta,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+# Schéma de départ de la migration 1, figé : il ne suit pas les modèles, les
+# évolutions suivantes passent par de nouvelles migrations
+_baseline = MetaData()
+Table(
+    'user', _baseline,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(255), nullable=False),
+    Column('role', String(20), nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('city', String(100)),
+    Column('bio', Text),
+    Column('phone', String(20)),
+    Column('avatar_url', String(255)),
+    Column('created_at', DateTime),
+    Column('verified_at', DateTime),
+)
+Table(
+    'repair_request', _baseline,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('description', Text, nullable=False),
+    Column('category', String(50), nullable=False),
+    Column('subcategory', String(50)),
+    Column('city', String(100), nullable=False),
+    Column('address', String(255)),
+    Column('latitude', Float),
+    Column('longitude', Float),
+    Column('budget_min', Integer),
+    Column('budget_max', Integer),
+    Column('status', String(20), nullable=False),
+    Column('visibility', String(20), nullable=False),
+    Column('client_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('accepted_quote_id', Integer, ForeignKey('quote.id', use_alter=True)),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+Table(
+    'quote', _baseline,
+    Column('id', Integer, primary_key=True),
+    Column('repair_request_id', Integer, ForeignKey('repair_request.id'), nullable=False),
+    Column('repairer_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('price', Integer, nullable=False),
+    Column('estimated_duration', String(100)),
+    Column('conditions', Text),
+    Column('location_type', String(20), nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('created_at', DateTime),
+)
+Table(
+    'repair_image', _baseline,
+    Column('id', Integer, primary_key=True),
+    Column('repair_request_id', Integer, ForeignKey('repair_request.id'), nullable=False),
+    Column('filename', String(255), nullable=False),
+    Column('url', String(255), nullable=False),
+    Column('created_at', DateTime),
+)
+Table(
+    'repair_image_variant', _baseline,
+    Column('id', Integer, primary_key=True),
+    Column('image_id', Integer, ForeignKey('repair_image.id'), nullable=False),
+    Column('label', String(20), nullable=False),
+    Column('format', String(10), nullable=False),
+    Column('url', String(255), nullable=False),
+    Column('width', Integer, nullable=False),
+    Column('height', Integer, nullable=False),
+    Column('size_bytes', Integer),
+    Column('created_at', DateTime),
+)
+Table(
+    'email_outbox', _baseline,
+    Column('id', Integer, primary_key=True),
+    Column('to_email', String(120), nullable=False),
+    Column('subject', String(255), nullable=False),
+    Column('body', Text, nullable=False),
+    Column('is_html', Boolean, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('next_attempt_at', DateTime),
+    Column('locked_at', DateTime),
+    Column('last_error', Text),
+    Column('created_at', DateTime),
+    Column('sent_at', DateTime),
+)
+Table(
+    'stat_counter', _baseline,
+    Column('name', String(64), primary_key=True),
+    Column('value', Integer, nullable=False),
+)
+
+
+# ---------------------------------------------------------------------------
+# Outils
+# ---------------------------------------------------------------------------
+
+def _add_column(connection, table_name, column_name):
+    """ALTER TABLE ... ADD COLUMN d'après la définition du modèle (si absente)"""
+    existing = {c['name'] for c in inspect(connection).get_columns(table_name)}
+    if column_name in existing:
+        return
+    column = db.metadata.tables[table_name].c[column_name]
+    ddl = f'ALTER TABLE "{table_name}" ADD COLUMN "{column_name}" {column.type.compile(dialect=connection.dialect)}'
+    if column.server_default is not None:
+        # Lignes existantes remplies par la valeur par défaut (server_default=text(...))
+        ddl += f' DEFAULT {getattr(column.server_default.arg, "text", column.server_default.arg)}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+    connection.exec_driver_sql(ddl)
+
+
+def _create_tables(connection, names):
+    """Crée les tables déclarées dans les modèles (ignorées si elles existent déjà)"""
+    for name in names:
+        db.metadata.tables[name].create(connection, checkfirst=True)
+
+
+def _create_indexes(connection, names):
+    """Crée les index déclarés dans les modèles (ignorés s'ils existent déjà)"""
+    indexes = {
+        index.name: index
+        for table in db.metadata.tables.values()
+        for index in table.indexes
+    }
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+
+# ---------------------------------------------------------------------------
+# Migrations (ne jamais modifier une migration publiée : en ajouter une)
+# ---------------------------------------------------------------------------
+
+def _initial(connection):
+    # Tables manquantes du schéma de départ (base neuve) ; colonnes et index
+    # ajoutés depuis : migrations suivantes
+    _baseline.create_all(connection)
+
+
+def _new_columns(connection):
+    _add_column(connection, 'email_outbox', 'html_body')
+    _add_column(connection, 'repair_image', 'width')
+    _add_column(connection, 'repair_image', 'height')
+
+
+def _pagination_indexes(connection):
+    _create_indexes(connection, [
+        'ix_user_created_at_id',
+        'ix_repair_request_created_at_id',
+        'ix_repair_request_lat_lon',
+        'ix_quote_created_at_id',
+        'ix_repair_image_filename',
+        'ix_repair_image_variant_image_id',
+        'ix_email_outbox_status_next_attempt',
+    ])
+
+
+def _query_shape_indexes(connection):
+    # Filtres du fil, de l'admin et de « mes demandes / mes devis », suivis
+    # du tri created_at DESC, id DESC : plus de parcours complet + tri
+    _create_indexes(connection, [
+        'ix_user_role_created_at',
+        'ix_repair_request_status_category_created_at',
+        'ix_repair_request_status_created_at',
+        'ix_repair_request_category_created_at',
+        'ix_repair_request_client_created_at',
+        'ix_quote_repairer_created_at',
+        'ix_quote_status_created_at',
+        'ix_quote_repair_request_status',
+        'ix_repair_image_repair_request_id',
+    ])
+
+
+def _repairer_matching_columns(connection):
+    _add_column(connection, 'user', 'specialties')
+    _add_column(connection, 'user', 'latitude')
+    _add_column(connection, 'user', 'longitude')
+
+
+
+def _user_events(connection):
+    _create_tables(connection, ['user_event'])
+
+
+
+def _repair_request_version(connection):
+    _add_column(connection, 'repair_request', 'version')
+
+
+def _sharded_counters(connection):
+    # Clé primaire (name, shard) : table recréée ; les compteurs se déduisent
+    # des tables, ensure_counters les reconstruit au démarrage
+    if 'shard' in {c['name'] for c in inspect(connection).get_columns('stat_counter')}:
+        return
+    connection.exec_driver_sql('DROP TABLE stat_counter')
+    _create_tables(connection, ['stat_counter'])
+
+
+# Index dont created_at sert au tri des listes paginées
+_CREATED_AT_INDEXES = [
+    'ix_user_created_at_id',
+    'ix_user_role_created_at',
+    'ix_repair_request_created_at_id',
+    'ix_repair_request_status_category_created_at',
+    'ix_repair_request_status_created_at',
+    'ix_repair_request_category_created_at',
+    'ix_repair_request_client_created_at',
+    'ix_quote_created_at_id',
+    'ix_quote_repairer_created_at',
+    'ix_quote_status_created_at',
+]
+
+
+def _created_at_nulls_first(connection):
+    # PostgreSQL : le tri created_at DESC NULLS LAST, id DESC (pagination.py)
+    # est l'ordre inverse de (created_at NULLS FIRST, id) ; un index
+    # (created_at, id) ordinaire ne le sert plus sans tri. SQLite range déjà
+    # les NULL en premier par ordre croissant, ses index sont inchangés.
+    if connection.dialect.name != 'postgresql':
+        return
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    for name in _CREATED_AT_INDEXES:
+        index = indexes[name]
+        columns = ', '.join(
+            f'"{column.name}" NULLS FIRST' if column.name == 'created_at' else f'"{column.name}"'
+            for column in index.columns
+        )
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+        connection.exec_driver_sql(f'CREATE INDEX "{name}" ON "{index.table.name}" ({columns})')
+
+
+MIGRATIONS = [
+    (1, 'Schéma initial', _initial),
+    (2, 'Colonnes html_body (email_outbox), width/height (repair_image)', _new_columns),
+    (3, 'Index de pagination, géo, photos et outbox', _pagination_indexes),
+    (4, 'Index composites des requêtes du fil, de l\'admin et des listes perso', _query_shape_indexes),
+    (5, 'Colonnes specialties, latitude, longitude (user) pour le ciblage des réparateurs', _repairer_matching_columns),
+    (6, 'Table user_event (événements poussés en SSE)', _user_events),
+    (7, 'Colonne version (repair_request) : verrou optimiste', _repair_request_version),
+    (8, 'Compteurs du tableau de bord répartis sur plusieurs lignes (stat_counter.shard)', _sharded_counters),
+    (9, 'Index created_at NULLS FIRST sur PostgreSQL (tri DESC NULLS LAST de la pagination)', _created_at_nulls_first),
+]
+
+
+def applied_versions(engine):
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def _begin_immediate(connection):
+    """BEGIN IMMEDIATE : verrou d'écriture SQLite pris d'emblée, réessayé jusqu'à LOCK_TIMEOUT"""
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            return
+        except OperationalError as e:
+            connection.rollback()
+            if 'locked' not in str(e) or time.monotonic() > deadline:
+                raise
+
+
+@contextmanager
+def _migration_lock(engine):
+    """
+    Connexion dédiée aux migrations. PostgreSQL : verrou consultatif tenu
+    jusqu'à la fin ; SQLite : chaque migration ouvre sa transaction par
+    BEGIN IMMEDIATE (voir _transaction).
+    """
+    with engine.connect() as connection:
+        if engine.dialect.name != 'postgresql':
+            yield connection
+            return
+        connection.execute(select(db.func.pg_advisory_lock(ADVISORY_LOCK_KEY)))
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            connection.execute(select(db.func.pg_advisory_unlock(ADVISORY_LOCK_KEY)))
+            connection.commit()
+
+
+@contextmanager
+def _transaction(connection):
+    if connection.dialect.name == 'sqlite':
+        _begin_immediate(connection)
+    try:
+        yield
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def upgrade(engine):
+    """
+    Applique les migrations manquantes, chacune dans sa propre transaction,
+    sous verrou : un process qui attendait derrière un autre relit les
+    versions appliquées et n'a plus rien à faire. Les étapes vérifient
+    l'existant (checkfirst, colonnes déjà là) : une migration interrompue
+    peut être rejouée. Retourne les versions appliquées.
+    """
+    applied = []
+    with _migration_lock(engine) as connection:
+        with _transaction(connection):
+            schema_migrations.create(connection, checkfirst=True)
+        for version, description, migrate in MIGRATIONS:
+            with _transaction(connection):
+                done = connection.execute(
+                    select(schema_migrations.c.version).where(schema_migrations.c.version == version)
+                ).first()
+                if done:
+                    continue
+                migrate(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+            logger.info('Migration %s appliquée : %s', version, description)
+            applied.append(version)
+    return applied
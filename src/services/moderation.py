@@ -0,0 +1,276 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from src.models.user import db, User, RepairRequest, Quote, USER_STATUSES, REQUEST_STATUSES
+from src.services.events import publish_many
+from src.services.identity import invalidate_user
+from src.services.matching import repairer_index
+from src.services.sessions import revoke_users_sessions
+from src.services.stats import record_bulk_change
+
+# Modération en masse : sélection par liste d'identifiants et/ou filtre,
+# puis UPDATE ensemblistes par lots de BULK_CHUNK_SIZE lignes, un commit par
+# lot (transactions courtes, verrou d'écriture rendu entre deux lots). Les
+# lignes ne sont jamais chargées dans l'ORM : seuls les identifiants (et ce
+# qu'il faut pour les compteurs et les événements) sont lus.
+CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 1000))
+MAX_IDS = int(os.getenv('BULK_MAX_IDS', 100000))
+
+
+class BulkError(Exception):
+    status_code = 400
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+# ---------------------------------------------------------------------------
+# Sélection : {"ids": [...]} et/ou {"filter": {...}}
+# ---------------------------------------------------------------------------
+
+def _values(value, allowed, field):
+    """Valeur ou liste de valeurs, toutes dans `allowed`"""
+    values = value if isinstance(value, list) else [value]
+    if not values or any(v not in allowed for v in values):
+        raise BulkError(f'Valeur invalide pour {field}')
+    return values
+
+
+def _text(value, field):
+    if not isinstance(value, str) or not value.strip():
+        raise BulkError(f'Valeur invalide pour {field}')
+    return value.strip()
+
+
+def _date(value, field):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise BulkError(f'Date invalide pour {field} (format ISO 8601 attendu)')
+
+
+def _days_ago(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise BulkError(f'Nombre de jours invalide pour {field}')
+    return datetime.utcnow() - timedelta(days=value)
+
+
+def _common_criteria(model, name, value):
+    if name == 'created_before':
+        return model.created_at < _date(value, name)
+    if name == 'created_after':
+        return model.created_at >= _date(value, name)
+    if name == 'older_than_days':
+        return model.created_at < _days_ago(value, name)
+    if name == 'city':
+        return func.lower(model.city) == _text(value, name).lower()
+    return None
+
+
+def _user_criterion(name, value):
+    if name == 'role':
+        # Les comptes administrateurs ne sont jamais modifiés en masse
+        return User.role.in_(_values(value, ['client', 'repairer'], name))
+    if name == 'status':
+        return User.status.in_(_values(value, USER_STATUSES, name))
+    if name == 'email_domain':
+        return User.email.like('%@' + _text(value, name).lstrip('@').lower())
+    return _common_criteria(User, name, value)
+
+
+def _request_criterion(name, value):
+    if name == 'status':
+        return RepairRequest.status.in_(_values(value, REQUEST_STATUSES, name))
+    if name == 'category':
+        return RepairRequest.category.in_([_text(v, name) for v in (value if isinstance(value, list) else [value])])
+    if name == 'client_id':
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise BulkError('Valeur invalide pour client_id')
+        return RepairRequest.client_id == value
+    return _common_criteria(RepairRequest, name, value)
+
+
+def parse_selection(data, criterion):
+    """
+    (ids triés ou None, conditions SQL) depuis le corps de la requête. Un
+    critère inconnu est une erreur : une faute de frappe ne doit pas élargir
+    la sélection à toute la table.
+    """
+    ids = data.get('ids')
+    filters = data.get('filter')
+    if ids is None and filters is None:
+        raise BulkError('ids ou filter requis')
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or any(isinstance(i, bool) or not isinstance(i, int) for i in ids):
+            raise BulkError('ids : liste d\'identifiants entiers attendue')
+        if len(ids) > MAX_IDS:
+            raise BulkError(f'Au plus {MAX_IDS} identifiants par appel, utilisez un filtre')
+        ids = sorted(set(ids))
+
+    criteria = []
+    if filters is not None:
+        if not isinstance(filters, dict) or not filters:
+            raise BulkError('filter : au moins un critère attendu')
+        for name, value in filters.items():
+            condition = criterion(name, value)
+            if condition is None:
+                raise BulkError(f'Critère inconnu : {name}')
+            criteria.append(condition)
+    return ids, criteria
+
+
+# ---------------------------------------------------------------------------
+# Parcours par lots
+# ---------------------------------------------------------------------------
+
+def _chunks(model, query, criteria, ids, chunk_size):
+    """
+    Lots de lignes (identifiant en premier) : tranches de la liste d'ids, ou
+    pagination par identifiant croissant sur le filtre. Les lignes déjà
+    modifiées sortent du filtre (statut différent du statut cible), une
+    relance après interruption reprend donc là où on s'était arrêté.
+    """
+    if ids is not None:
+        for start in range(0, len(ids), chunk_size):
+            part = ids[start:start + chunk_size]
+            rows = db.session.execute(query.where(model.id.in_(part), *criteria).order_by(model.id)).all()
+            yield rows, part[-1]
+        return
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            query.where(model.id > last_id, *criteria).order_by(model.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows, last_id
+
+
+def _update(model, ids, criteria, values):
+    """UPDATE ... WHERE id IN (lot) AND <critères> : identifiants réellement modifiés"""
+    statement = (
+        db.update(model).where(model.id.in_(ids), *criteria).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.engine.dialect.update_returning:
+        return [row_id for (row_id,) in db.session.execute(statement.returning(model.id))]
+    # Sans RETURNING : le lot vient d'être lu dans la même transaction
+    result = db.session.execute(statement)
+    if result.rowcount == len(ids):
+        return list(ids)
+    return [
+        row_id for (row_id,) in
+        db.session.execute(select(model.id).where(model.id.in_(ids), model.status == values['status']))
+    ]
+
+
+def _run(model, query, criteria, ids, apply_chunk, dry_run, chunk_size, after_commit=None):
+    """
+    Applique `apply_chunk(rows)` (identifiants modifiés) lot par lot, un
+    commit par lot, puis `after_commit(identifiants)`. Produit un état
+    d'avancement après chaque lot, puis le bilan (done=True).
+    """
+    started = time.perf_counter()
+    progress = {'chunks': 0, 'matched': 0, 'updated': 0, 'last_id': None}
+    try:
+        for rows, last_id in _chunks(model, query, criteria, ids, chunk_size):
+            changed = apply_chunk(rows) if rows and not dry_run else []
+            db.session.commit()
+            if changed and after_commit:
+                after_commit(changed)
+            progress['chunks'] += 1
+            progress['matched'] += len(rows)
+            progress['updated'] += len(changed)
+            progress['last_id'] = last_id
+            yield dict(progress, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+    except Exception:
+        # Les lots déjà commités restent appliqués : relancer reprend la suite
+        db.session.rollback()
+        raise
+    yield dict(progress, done=True, dry_run=dry_run, elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+
+
+# ---------------------------------------------------------------------------
+# Opérations
+# ---------------------------------------------------------------------------
+
+def bulk_user_status(data, status, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Change le statut des utilisateurs sélectionnés (jamais les administrateurs).
+    Suspension : sessions fermées ; activation : vérification datée.
+    """
+    if status not in USER_STATUSES:
+        raise BulkError('Statut invalide')
+    ids, criteria = parse_selection(data, _user_criterion)
+    criteria += [User.role != 'admin', User.status != status]
+
+    values = {'status': status}
+    if status == 'active':
+        values['verified_at'] = func.coalesce(User.verified_at, datetime.utcnow())
+
+    def apply_chunk(rows):
+        return _update(User, [row.id for row in rows], criteria, values)
+
+    def after_commit(changed):
+        for user_id in changed:
+            invalidate_user(user_id)
+        if status == 'suspended':
+            revoke_users_sessions(changed)
+        # Éligibilité aux nouvelles demandes : index reconstruit au besoin
+        repairer_index.invalidate()
+
+    return _run(User, select(User.id), criteria, ids, apply_chunk, dry_run, chunk_size, after_commit)
+
+
+def bulk_request_status(data, status, notify=True, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Change le statut des demandes sélectionnées : version incrémentée,
+    compteurs du tableau de bord ajustés, événement request.status au client
+    et au réparateur retenu (notify=False pour s'en passer).
+    """
+    if status not in REQUEST_STATUSES:
+        raise BulkError('Statut invalide')
+    ids, criteria = parse_selection(data, _request_criterion)
+    criteria.append(RepairRequest.status != status)
+
+    # Réparateur retenu : destinataire de l'événement lui aussi
+    query = (
+        select(RepairRequest.id, RepairRequest.status, RepairRequest.client_id, Quote.repairer_id)
+        .outerjoin(Quote, Quote.id == RepairRequest.accepted_quote_id)
+    )
+
+    def apply_chunk(rows):
+        now = datetime.utcnow()
+        by_status = {}
+        for row in rows:
+            by_status.setdefault(row.status, []).append(row)
+
+        changed = []
+        for old_status, group in by_status.items():
+            # Un UPDATE par statut d'origine : compteurs exacts même si une
+            # ligne a changé entre la lecture et l'écriture
+            updated = _update(
+                RepairRequest, [row.id for row in group], criteria + [RepairRequest.status == old_status],
+                {'status': status, 'updated_at': now, 'version': RepairRequest.version + 1},
+            )
+            record_bulk_change(RepairRequest, old_status, status, len(updated))
+            changed.extend(updated)
+
+        if notify and changed:
+            rows_by_id = {row.id: row for row in rows}
+            events = []
+            for request_id in changed:
+                row = rows_by_id[request_id]
+                for user_id in {row.client_id, row.repairer_id} - {None}:
+                    events.append((user_id, 'request.status', {'repair_request_id': request_id, 'status': status}))
+            publish_many(events)
+        return changed
+
+    return _run(RepairRequest, query, criteria, ids, apply_chunk, dry_run, chunk_size)
@@ -0,0 +1,35 @@
+from flask import current_app, request, stream_with_context
+
+from src.services.json_provider import dumps_bytes
+from src.services.pagination import keyset_page
+
+MIMETYPE = 'application/x-ndjson'
+BATCH_SIZE = 500
+
+
+def wants_ndjson():
+    """?format=ndjson ou Accept: application/x-ndjson"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == MIMETYPE
+
+
+def iter_query(query, model, serialize, rank=None, batch_size=BATCH_SIZE):
+    """
+    Parcourt tout le résultat par lots (pagination par curseur interne) et
+    produit une ligne JSON par élément : la mémoire reste bornée à un lot.
+    """
+    cursor = None
+    while True:
+        items, cursor = keyset_page(query, model, cursor, batch_size, rank=rank)
+        for item in serialize(items):
+            yield dumps_bytes(item) + b'\n'
+        if cursor is None:
+            return
+
+
+def ndjson_response(lines):
+    # stream_with_context : la session SQLAlchemy reste utilisable pendant l'envoi
+    response = current_app.response_class(stream_with_context(lines), mimetype=MIMETYPE)
+    response.headers['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par nginx
+    return response
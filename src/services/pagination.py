@@ -0,0 +1,111 @@
+import base64
+import json
+from datetime import datetime
+
+from src.models.user import db
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible ou falsifié"""
+
+
+def encode_cursor(position, row_id):
+    """Encode la position (created_at ou score, id) en curseur opaque"""
+    if isinstance(position, datetime):
+        position = position.isoformat()
+    raw = json.dumps([position, row_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, ranked=False):
+    """Décode un curseur opaque en tuple (created_at ou score, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if ranked:
+            position = float(position)
+        elif position is not None:
+            position = datetime.fromisoformat(position)
+        return position, int(row_id)
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def parse_limit(value, default=DEFAULT_LIMIT):
+    """Borne le paramètre ?limit= entre 1 et MAX_LIMIT"""
+    try:
+        limit = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def keyset_page(query, model, cursor=None, limit=DEFAULT_LIMIT, rank=None, with_rank=False):
+    """
+    Pagination par curseur sur (created_at DESC NULLS LAST, id DESC).
+
+    Pas de COUNT(*) ni d'OFFSET : on reprend juste après la dernière ligne
+    vue, ce qui s'appuie sur l'index composite (created_at, id) du modèle.
+    Si `rank` (pertinence, distance... : plus petit = meilleur) est fourni,
+    l'ordre devient (rank ASC, id DESC) ; avec `with_rank`, les items sont
+    des couples (objet, rank).
+    Retourne (items, next_cursor) ; next_cursor vaut None en fin de liste.
+    """
+    if rank is not None:
+        return _ranked_page(query, model, cursor, limit, rank, with_rank)
+
+    created_col, id_col = model.created_at, model.id
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.filter(created_col.is_(None), id_col < row_id)
+        else:
+            query = query.filter(db.or_(
+                created_col < created_at,
+                db.and_(created_col == created_at, id_col < row_id),
+                created_col.is_(None),
+            ))
+
+    # Une ligne de plus que demandé pour savoir s'il existe une page suivante.
+    # NULLS LAST explicite : c'est l'ordre par défaut de SQLite mais pas de
+    # PostgreSQL (NULLS FIRST en DESC), or le filtre du curseur place les
+    # lignes sans date après toutes les autres
+    rows = query.order_by(created_col.desc().nulls_last(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def _ranked_page(query, model, cursor, limit, rank, with_rank):
+    id_col = model.id
+
+    if cursor:
+        score, row_id = decode_cursor(cursor, ranked=True)
+        query = query.filter(db.or_(
+            rank > score,
+            db.and_(rank == score, id_col < row_id),
+        ))
+
+    rows = (
+        query.add_columns(rank.label('rank'))
+        .order_by(rank.asc(), id_col.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_item, last_score = rows[-1]
+        next_cursor = encode_cursor(last_score, last_item.id)
+    if with_rank:
+        return [(item, score) for item, score in rows], next_cursor
+    return [item for item, _ in rows], next_cursor
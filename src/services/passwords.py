@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Paramètres de hachage des nouveaux mots de passe (format Werkzeug).
+# Changer le coût ici : les anciens hachages sont refaits à la connexion suivante.
+HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+# Pool de process dédié (par worker web) ; 0 = hachage dans le thread de la requête
+MAX_WORKERS = int(os.getenv('PASSWORD_WORKERS', 2))
+# Au-delà de ce nombre de hachages en cours ou en attente : 429 immédiat
+MAX_PENDING = int(os.getenv('PASSWORD_MAX_PENDING', max(MAX_WORKERS, 1) * 4))
+TIMEOUT = float(os.getenv('PASSWORD_TIMEOUT_SECONDS', 10))
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+class HashingBusy(Exception):
+    """Trop de hachages en attente : la requête est refusée (429) plutôt que mise en file"""
+    status_code = 429
+    message = "Trop de connexions en cours, réessayez dans un instant"
+    retry_after = 1
+
+
+def canonical_method(method):
+    """
+    Méthode telle que Werkzeug l'écrit dans le hachage, paramètres par défaut
+    compris : 'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:1000000'
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return f'scrypt:{2 ** 15}:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f'pbkdf2:{args[0] if args else "sha256"}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+def needs_rehash(password_hash, method=HASH_METHOD):
+    """Vrai si le hachage a été produit avec d'autres paramètres que `method`"""
+    return password_hash.split('$', 1)[0] != canonical_method(method)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password, method):
+    # Exécuté dans le pool : vérification et, si besoin, nouveau hachage
+    # dans le même aller-retour
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if needs_rehash(password_hash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn : pas de fork d'un worker web multi-thread
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def _release_slot(_future):
+    _slots.release()
+
+
+def _run(function, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    if MAX_WORKERS <= 0:
+        try:
+            return function(*args)
+        finally:
+            _slots.release()
+    try:
+        future = _get_executor().submit(function, *args)
+    except Exception:
+        _slots.release()
+        raise
+    # Place rendue quand le calcul se termine (ou est annulé), pas quand la
+    # requête renonce à attendre : un hachage qui tourne encore compte
+    future.add_done_callback(_release_slot)
+    try:
+        return future.result(timeout=TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        raise HashingBusy()
+
+
+def hash_password(password):
+    """Hachage d'un nouveau mot de passe hors du thread de la requête"""
+    return _run(_hash, password, HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    """
+    Vérifie un mot de passe ; retourne (valide, nouveau_hachage). Le nouveau
+    hachage n'est fourni que si l'ancien utilise d'autres paramètres.
+    Lève HashingBusy quand le pool est saturé.
+    """
+    return _run(_verify, password_hash, password, HASH_METHOD)
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from src.models.user import User, RepairRequest, Quote, RepairImage, RepairImageVariant
+from src.services.db_routing import RoutingSession
+from src.services.ndjson import wants_ndjson
+
+CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 512))
+# Les écritures d'un autre worker ne sont pas vues avant cette durée
+CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 5))
+
+# Modèles dont la modification change le fil ou le détail d'une demande
+_WATCHED = (RepairRequest, Quote, RepairImage, RepairImageVariant, User)
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # clé -> (version, expiration, etag, body, mimetype)
+_version = 0
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+
+def invalidate():
+    """Rend caduques toutes les réponses en cache (nouvelle version des données)"""
+    global _version
+    with _lock:
+        _version += 1
+        _stats['invalidations'] += 1
+
+
+def cache_stats():
+    with _lock:
+        return {**_stats, 'entries': len(_entries), 'version': _version}
+
+
+def _key():
+    # Paramètres normalisés : ordre indifférent, valeurs vides ignorées
+    params = sorted((k, v) for k, v in request.args.items(multi=True) if v != '')
+    return (request.endpoint, tuple(sorted(request.view_args.items())), tuple(params))
+
+
+def _lookup(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] != _version or entry[1] <= time.monotonic():
+            _stats['misses'] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats['hits'] += 1
+        return entry
+
+
+def _store(key, version, etag, body, mimetype):
+    with _lock:
+        _entries[key] = (version, time.monotonic() + CACHE_TTL, etag, body, mimetype)
+        _entries.move_to_end(key)
+        while len(_entries) > CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def _conditional(response):
+    # Le navigateur revalide à chaque fois (If-None-Match) : 304 sans corps si inchangé
+    response.cache_control.no_cache = True
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        with _lock:
+            _stats['not_modified'] += 1
+    return response
+
+
+def cached_response(view):
+    """
+    GET public mis en cache (par paramètres normalisés) avec ETag fort.
+
+    Réponse en cache : ni requête SQL ni sérialisation. Toute écriture
+    commitée sur une demande, un devis, une photo ou un utilisateur change
+    la version et invalide tout le cache du worker.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if wants_ndjson():
+            return view(*args, **kwargs)  # flux : jamais mis en cache
+        key = _key()
+        entry = _lookup(key)
+        if entry is not None:
+            _, _, etag, body, mimetype = entry
+            response = current_app.response_class(body, mimetype=mimetype)
+            response.set_etag(etag)
+            return _conditional(response)
+
+        version = _version  # lue avant la requête : une écriture concurrente invalide l'entrée
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        body = response.get_data()
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        response.set_etag(etag)
+        _store(key, version, etag, body, response.mimetype)
+        return _conditional(response)
+    return wrapper
+
+
+def _mark(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['response_cache_dirty'] = True
+
+
+for _model in _WATCHED:
+    event.listen(_model, 'after_insert', _mark)
+    event.listen(_model, 'after_update', _mark)
+    event.listen(_model, 'after_delete', _mark)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_bulk(orm_execute_state):
+    # db.update / db.delete en masse : pas d'événements par objet
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        if orm_execute_state.bind_mapper.class_ in _WATCHED:
+            orm_execute_state.session.info['response_cache_dirty'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(db_session):
+    # Invalidation au commit : une lecture pendant la transaction voit encore
+    # l'ancien état, qu'elle met en cache sous l'ancienne version
+    if db_session.info.pop('response_cache_dirty', False):
+        invalidate()
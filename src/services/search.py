@@ -0,0 +1,175 @@
+import re
+import unicodedata
+
+from sqlalchemy import text, Float, Integer, func, literal_column
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.user import db, RepairRequest
+
+# Mots vides français ignorés dans la recherche (s'il reste d'autres mots)
+STOPWORDS = {
+    'le', 'la', 'les', 'l', 'un', 'une', 'des', 'de', 'du', 'd', 'et', 'ou',
+    'a', 'au', 'aux', 'en', 'dans', 'sur', 'pour', 'par', 'avec', 'sans',
+    'mon', 'ma', 'mes', 'ton', 'ta', 'tes', 'son', 'sa', 'ses', 'ne', 'pas',
+    'qui', 'que', 'est', 'je', 'j', 'il', 'elle', 'ce', 'cet', 'cette',
+}
+
+FTS_TABLE = 'repair_request_fts'
+PG_CONFIG = 'fr_unaccent'
+
+# Moteur actif : 'fts5' (SQLite), 'tsvector' (PostgreSQL) ou 'like' (repli)
+_backend = 'like'
+_pg_config = 'french'
+
+_SQLITE_DDL = [
+    # Table FTS5 « external content » : l'index ne duplique pas le texte.
+    # remove_diacritics 2 : « écran » == « ecran » ; prefix : index des préfixes 2/3 lettres
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='repair_request', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2",
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON repair_request BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON repair_request BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON repair_request BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+
+def _strip_accents(value):
+    normalized = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+def _stem(token):
+    # Pluriel français simple : « écrans » → « ecran » (la recherche est par préfixe)
+    if len(token) > 3 and token[-1] in 'sx':
+        return token[:-1]
+    return token
+
+
+def tokenize(search):
+    """Découpe la saisie utilisateur en termes normalisés (minuscules, sans accents)"""
+    tokens = re.findall(r'\w+', _strip_accents(search).lower())
+    meaningful = [t for t in tokens if t not in STOPWORDS]
+    return [_stem(t) for t in meaningful or tokens]
+
+
+def _install_sqlite(conn):
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first()
+    for ddl in _SQLITE_DDL:
+        conn.execute(text(ddl))
+    if not exists:
+        # Première installation : indexer les demandes déjà présentes
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _install_postgresql(conn):
+    global _pg_config
+    try:
+        # Configuration française insensible aux accents (extension unaccent)
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            has_config = conn.execute(
+                text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"), {'name': PG_CONFIG}
+            ).first()
+            if not has_config:
+                conn.execute(text(f"CREATE TEXT SEARCH CONFIGURATION {PG_CONFIG} (COPY = french)"))
+                conn.execute(text(
+                    f"ALTER TEXT SEARCH CONFIGURATION {PG_CONFIG} "
+                    "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem"
+                ))
+        _pg_config = PG_CONFIG
+    except SQLAlchemyError:
+        _pg_config = 'french'
+
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_repair_request_search ON repair_request USING GIN ("
+        f"to_tsvector('{_pg_config}'::regconfig, "
+        "coalesce(title, '') || ' ' || coalesce(description, '')))"
+    ))
+
+
+def install_search_index(engine):
+    """Crée (si besoin) l'index plein texte adapté au moteur de base de données"""
+    global _backend
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == 'sqlite':
+                _install_sqlite(conn)
+                _backend = 'fts5'
+            elif engine.dialect.name == 'postgresql':
+                _install_postgresql(conn)
+                _backend = 'tsvector'
+    except SQLAlchemyError:
+        # FTS5 absent de cette build SQLite, droits insuffisants... → ILIKE
+        _backend = 'like'
+    return _backend
+
+
+def search_requests(query, search):
+    """
+    Restreint `query` (sur RepairRequest) aux demandes correspondant à `search`.
+
+    Retourne (query, score) : `score` est une expression SQL de pertinence
+    (plus petit = plus pertinent, BM25 sur SQLite) à utiliser pour le tri,
+    ou None si aucun index plein texte n'est disponible.
+    """
+    tokens = tokenize(search)
+    if not tokens:
+        return query, None
+
+    if _backend == 'fts5':
+        # Recherche par préfixe : "ecran"* trouve aussi « écrans »
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        hits = (
+            text(
+                f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 1.0) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(rowid=Integer, score=Float)
+            .subquery('search_hits')
+        )
+        query = query.join(hits, hits.c.rowid == RepairRequest.id)
+        return query, hits.c.score
+
+    if _backend == 'tsvector':
+        config = literal_column(f"'{_pg_config}'::regconfig")
+        document = (
+            func.coalesce(RepairRequest.title, '') + ' ' + func.coalesce(RepairRequest.description, '')
+        )
+        vector = func.to_tsvector(config, document)
+        tsquery = func.to_tsquery(config, ' & '.join(f'{token}:*' for token in tokens))
+        query = query.filter(vector.op('@@')(tsquery))
+        return query, -func.ts_rank_cd(vector, tsquery)
+
+    query = query.filter(
+        db.or_(
+            RepairRequest.title.ilike(f'%{search}%'),
+            RepairRequest.description.ilike(f'%{search}%')
+        )
+    )
+    return query, None
@@ -0,0 +1,84 @@
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import configure_mappers, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.user import db, User, RepairRequest, Quote, RepairImage
+
+# Les backrefs (RepairRequest.client, Quote.repairer) n'existent qu'une fois
+# les mappers configurés
+configure_mappers()
+
+# Options à appliquer aux requêtes de liste : le client / réparateur est
+# chargé dans la même requête SQL au lieu d'un SELECT par ligne.
+REQUEST_LOAD_OPTIONS = (
+    joinedload(RepairRequest.client),
+    selectinload(RepairRequest.images).selectinload(RepairImage.variants),
+)
+QUOTE_LOAD_OPTIONS = (joinedload(Quote.repairer),)
+
+
+def _preload_users(objects, relation, fk):
+    """Charge en une requête les utilisateurs pas encore chargés par les options ci-dessus"""
+    missing = [obj for obj in objects if relation in inspect(obj).unloaded]
+    if not missing:
+        return
+    ids = {getattr(obj, fk) for obj in missing}
+    users = {user.id: user for user in User.query.filter(User.id.in_(ids))}
+    for obj in missing:
+        set_committed_value(obj, relation, users.get(getattr(obj, fk)))
+
+
+def _preload_images(requests):
+    """Charge en deux requêtes les photos (et miniatures) des demandes qui ne les ont pas"""
+    missing = [req for req in requests if 'images' in inspect(req).unloaded]
+    if not missing:
+        return
+    images = (
+        RepairImage.query.options(selectinload(RepairImage.variants))
+        .filter(RepairImage.repair_request_id.in_([req.id for req in missing]))
+        .order_by(RepairImage.id)
+        .all()
+    )
+    by_request = {}
+    for image in images:
+        by_request.setdefault(image.repair_request_id, []).append(image)
+    for req in missing:
+        set_committed_value(req, 'images', by_request.get(req.id, []))
+
+
+def quote_counts(request_ids):
+    """Nombre de devis par demande, en un seul COUNT groupé"""
+    if not request_ids:
+        return {}
+    rows = (
+        db.session.query(Quote.repair_request_id, func.count(Quote.id))
+        .filter(Quote.repair_request_id.in_(request_ids))
+        .group_by(Quote.repair_request_id)
+        .all()
+    )
+    return dict(rows)
+
+
+def serialize_requests(requests):
+    """Sérialise une liste de demandes avec un nombre constant de requêtes SQL"""
+    requests = list(requests)
+    if not requests:
+        return []
+    _preload_users(requests, 'client', 'client_id')
+    _preload_images(requests)
+    counts = quote_counts([req.id for req in requests])
+    return [req.to_dict(quotes_count=counts.get(req.id, 0)) for req in requests]
+
+
+def serialize_quotes(quotes):
+    """Sérialise une liste de devis avec un nombre constant de requêtes SQL"""
+    quotes = list(quotes)
+    if not quotes:
+        return []
+    _preload_users(quotes, 'repairer', 'repairer_id')
+    return [quote.to_dict() for quote in quotes]
+
+
+def serialize_users(users):
+    """Sérialise une liste d'utilisateurs (aucune relation chargée)"""
+    return [user.to_dict() for user in users]
@@ -0,0 +1,178 @@
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Sessions côté serveur : le cookie ne porte qu'un identifiant aléatoire,
+# les données vivent dans un fichier SQLite local (partagé par les workers
+# gunicorn d'une même machine). Activées par SESSION_STORE=sqlite ; par
+# défaut, cookies signés de Flask (plusieurs machines sans affinité).
+PURGE_PROBABILITY = 0.01  # nettoyage des sessions expirées, ~1 écriture sur 100
+
+_CREATE = """
+CREATE TABLE IF NOT EXISTS server_session (
+    sid TEXT PRIMARY KEY,
+    user_id INTEGER,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+_CREATE_INDEX = "CREATE INDEX IF NOT EXISTS ix_server_session_user_id ON server_session (user_id)"
+
+
+class SessionStore:
+    """Table server_session dans un fichier SQLite (WAL), une connexion par thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(_CREATE)
+        conn.execute(_CREATE_INDEX)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._conn().execute(
+            'SELECT data, expires_at FROM server_session WHERE sid = ? AND expires_at > ?',
+            (sid, time.time())
+        ).fetchone()
+        return row  # (data, expires_at) ou None
+
+    def save(self, sid, user_id, data, expires_at):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO server_session (sid, user_id, data, expires_at) VALUES (?, ?, ?, ?)',
+            (sid, user_id, data, expires_at)
+        )
+        if random.random() < PURGE_PROBABILITY:
+            self.purge_expired()
+
+    def delete(self, sid):
+        self._conn().execute('DELETE FROM server_session WHERE sid = ?', (sid,))
+
+    def revoke_user(self, user_id):
+        """Ferme toutes les sessions d'un utilisateur (compte suspendu...)"""
+        return self._conn().execute('DELETE FROM server_session WHERE user_id = ?', (user_id,)).rowcount
+
+    def revoke_users(self, user_ids):
+        """Idem pour une liste d'utilisateurs (modération en masse), un DELETE par tranche"""
+        user_ids = list(user_ids)
+        revoked = 0
+        for start in range(0, len(user_ids), 500):
+            part = user_ids[start:start + 500]
+            revoked += self._conn().execute(
+                f'DELETE FROM server_session WHERE user_id IN ({",".join("?" * len(part))})', part
+            ).rowcount
+        return revoked
+
+    def purge_expired(self):
+        return self._conn().execute('DELETE FROM server_session WHERE expires_at <= ?', (time.time(),)).rowcount
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.initial_user_id = self.get('user_id')
+        self.modified = False
+
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.store.load(sid)
+            if row is not None:
+                data, expires_at = row
+                return ServerSession(self.serializer.loads(data), sid=sid, expires_at=expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if not session:
+            # session.clear() (déconnexion) : on supprime l'enregistrement et le cookie
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        # Pas d'écriture à chaque requête : l'expiration n'est repoussée
+        # qu'une fois la moitié de la durée de vie écoulée
+        if not session.modified and session.expires_at and session.expires_at - now > lifetime / 2:
+            return
+
+        if session.sid is None or session.get('user_id') != session.initial_user_id:
+            # Nouvel identifiant à chaque connexion (pas de fixation de session)
+            if session.sid:
+                self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.initial_user_id = session.get('user_id')
+
+        session.expires_at = now + lifetime
+        self.store.save(session.sid, session.get('user_id'), self.serializer.dumps(dict(session)), session.expires_at)
+        # Le cookie expire avec l'enregistrement (PERMANENT_SESSION_LIFETIME),
+        # jamais avant ni après
+        response.set_cookie(
+            name, session.sid,
+            expires=session.expires_at,
+            httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite,
+        )
+
+
+def install_session_store(app, path=None):
+    """Remplace les cookies signés de Flask par le stockage serveur"""
+    path = path or os.getenv(
+        'SESSION_DB_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'sessions.db')
+    )
+    app.session_interface = ServerSessionInterface(SessionStore(path))
+    return app.session_interface
+
+
+def revoke_user_sessions(user_id):
+    """Déconnecte un utilisateur partout (sans effet avec les sessions cookie)"""
+    interface = current_app.session_interface
+    if isinstance(interface, ServerSessionInterface):
+        return interface.store.revoke_user(user_id)
+    return 0
+
+
+def revoke_users_sessions(user_ids):
+    """Déconnecte plusieurs utilisateurs partout (sans effet avec les sessions cookie)"""
+    interface = current_app.session_interface
+    if isinstance(interface, ServerSessionInterface):
+        return interface.store.revoke_users(user_ids)
+    return 0
@@ -0,0 +1,202 @@
+import queue
+import smtplib
+import socket
+import threading
+import time
+
+from src.services.instrumentation import SMTP_MESSAGES, SMTP_RECONNECTS, SMTP_BATCH_DURATION
+
+# Erreurs après lesquelles la connexion est jetée puis rouverte
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, socket.timeout, ConnectionError)
+RECONNECT_CODES = {421}
+
+
+class BatchStats:
+    """Mesures d'un envoi groupé (un lot du worker)"""
+
+    def __init__(self):
+        self.messages = 0
+        self.sent = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    @property
+    def per_second(self):
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            'messages': self.messages,
+            'sent': self.sent,
+            'failed': self.failed,
+            'reconnects': self.reconnects,
+            'seconds': round(self.seconds, 3),
+            'messages_per_second': round(self.per_second, 1),
+        }
+
+
+class SMTPTransport:
+    """
+    Pool de connexions SMTP authentifiées et réutilisées.
+
+    Une connexion sert plusieurs emails (plus de connexion TCP + STARTTLS +
+    AUTH par message) ; elle est recyclée après `max_messages` envois ou
+    `max_idle` secondes d'inactivité, et rouverte automatiquement sur
+    421 / déconnexion / timeout.
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=True,
+                 pool_size=2, max_messages=100, max_idle=60, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.last_batch = None
+        self.totals = {'batches': 0, 'sent': 0, 'failed': 0, 'reconnects': 0, 'connections': 0}
+
+    # -- connexions ----------------------------------------------------------
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        server.messages_sent = 0
+        server.last_used = time.monotonic()
+        with self._lock:
+            self.totals['connections'] += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _acquire(self):
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - server.last_used < self.max_idle:
+                return server
+            self._close(server)
+
+    def _release(self, server):
+        if server.messages_sent >= self.max_messages:
+            self._close(server)
+            return
+        server.last_used = time.monotonic()
+        try:
+            self._idle.put_nowait(server)
+        except queue.Full:
+            self._close(server)
+
+    def close(self):
+        """Ferme toutes les connexions inactives du pool"""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    # -- envoi ---------------------------------------------------------------
+
+    @staticmethod
+    def _needs_reconnect(error):
+        if isinstance(error, RECONNECT_ERRORS):
+            return True
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in RECONNECT_CODES
+
+    def _sendmail(self, server, from_addr, to_addr, message):
+        server.sendmail(from_addr, to_addr, message)
+        server.messages_sent += 1
+
+    def send(self, from_addr, to_addr, message):
+        """Envoie un message ; une reconnexion est tentée si la session est perdue"""
+        errors = self.send_batch(from_addr, [(to_addr, message)])
+        if errors[0] is not None:
+            raise errors[0]
+
+    def send_batch(self, from_addr, messages):
+        """
+        Envoie une liste de (destinataire, message) sur une même session SMTP.
+
+        Retourne une liste alignée sur `messages` : None si envoyé, sinon
+        l'exception rencontrée (les autres messages sont quand même tentés).
+        """
+        stats = BatchStats()
+        stats.messages = len(messages)
+        results = [None] * len(messages)
+        server = None
+        try:
+            for index, (to_addr, message) in enumerate(messages):
+                for attempt in range(2):
+                    try:
+                        if server is None:
+                            server = self._acquire()
+                        elif server.messages_sent >= self.max_messages:
+                            self._close(server)
+                            server = None
+                            server = self._connect()
+                        self._sendmail(server, from_addr, to_addr, message)
+                        stats.sent += 1
+                        break
+                    except Exception as e:
+                        if server is not None and self._needs_reconnect(e):
+                            self._close(server)
+                            server = None
+                            if attempt == 0:
+                                stats.reconnects += 1
+                                continue
+                        elif server is None:
+                            # Connexion impossible : inutile de tenter les suivants
+                            raise
+                        results[index] = e
+                        stats.failed += 1
+                        break
+        except Exception as e:
+            for index in range(len(messages)):
+                if results[index] is None and index >= stats.sent + stats.failed:
+                    results[index] = e
+            stats.failed = len(messages) - stats.sent
+        finally:
+            if server is not None:
+                self._release(server)
+            self._record(stats.finish())
+        return results
+
+    def _record(self, stats):
+        with self._lock:
+            self.last_batch = stats
+            self.totals['batches'] += 1
+            self.totals['sent'] += stats.sent
+            self.totals['failed'] += stats.failed
+            self.totals['reconnects'] += stats.reconnects
+        # Exposé sur /api/metrics ; le détail du lot est journalisé par le worker
+        SMTP_MESSAGES.inc('sent', amount=stats.sent)
+        SMTP_MESSAGES.inc('failed', amount=stats.failed)
+        SMTP_RECONNECTS.inc(amount=stats.reconnects)
+        SMTP_BATCH_DURATION.observe(stats.seconds)
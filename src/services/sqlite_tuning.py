@@ -0,0 +1,95 @@
+import os
+import threading
+
+from sqlalchemy import event, text
+
+# Profil « production » appliqué à chaque nouvelle connexion SQLite.
+# WAL : les lecteurs ne bloquent plus derrière l'écrivain (et inversement) ;
+# synchronous=NORMAL est sûr en WAL (seul le dernier commit peut être perdu
+# en cas de coupure de courant, jamais de corruption).
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', BUSY_TIMEOUT_MS),
+    ('mmap_size', int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+    ('cache_size', -int(os.getenv('SQLITE_CACHE_KB', 64 * 1024))),  # négatif = en Kio
+    ('temp_store', 'MEMORY'),
+    # Le fichier -wal est ramené à cette taille après chaque checkpoint
+    ('journal_size_limit', 64 * 1024 * 1024),
+)
+CHECKPOINT_INTERVAL = float(os.getenv('SQLITE_CHECKPOINT_SECONDS', 30))
+
+
+def _is_file_database(engine):
+    database = engine.url.database
+    return engine.dialect.name == 'sqlite' and database not in (None, '', ':memory:')
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in PRAGMAS:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(engine):
+    """
+    Branche le profil de pragmas sur l'engine (sans effet hors SQLite fichier).
+    À appeler avant toute autre utilisation de la base.
+    """
+    if not _is_file_database(engine):
+        return False
+    if not event.contains(engine, 'connect', _apply_pragmas):
+        event.listen(engine, 'connect', _apply_pragmas)
+        # Les connexions déjà ouvertes n'ont pas les pragmas : on repart à neuf
+        engine.dispose()
+    return True
+
+
+class WalCheckpointer:
+    """
+    Checkpoint WAL périodique hors du chemin des requêtes.
+
+    Mode PASSIVE : recopie dans la base ce qui peut l'être sans attendre ni
+    bloquer personne. L'autocheckpoint de SQLite (1000 pages) reste actif ;
+    ce thread évite surtout que le -wal grossisse pendant les rafales de
+    lectures longues, qui empêchent l'autocheckpoint d'aboutir.
+    """
+
+    def __init__(self, app, engine, interval=CHECKPOINT_INTERVAL):
+        self.app = app
+        self.engine = engine
+        self.interval = interval
+        self.last_result = None  # (busy, pages dans le WAL, pages recopiées)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not _is_file_database(self.engine):
+            return self
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='sqlite-checkpoint', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def checkpoint(self, mode='PASSIVE'):
+        with self.engine.connect() as conn:
+            self.last_result = tuple(conn.execute(text(f'PRAGMA wal_checkpoint({mode})')).one())
+        return self.last_result
+
+    def run_forever(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception:
+                self.app.logger.exception("Erreur checkpoint SQLite")
@@ -0,0 +1,197 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli absent : variantes gzip seulement
+    brotli = None
+
+# Fichiers dont le contenu ne change jamais sous un même nom : cache
+# navigateur d'un an sans revalidation.
+#   - fichiers du build Vite listés dans son manifeste (.vite/manifest.json) ;
+#     sans manifeste, assets/<nom>-<empreinte>.<ext> (empreinte Rollup : 8
+#     caractères base64url, index-BdCCvF70.js) ;
+#   - photos uploadées <sha256>.jpg : nettoyées avant le calcul de l'empreinte
+#     et jamais réécrites (src/services/uploads.py).
+# Les miniatures <sha256>_320.webp sont régénérées sous le même nom (réglages
+# d'encodage, version de Pillow) : cache court avec revalidation par ETag.
+VITE_ASSET = re.compile(r'^assets/[^/]+-(?=[A-Za-z0-9_-]*[A-Z0-9_-])[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+VITE_MANIFESTS = ('.vite/manifest.json', 'manifest.json')
+UPLOAD_ORIGINAL = re.compile(r'^[0-9a-f]{64}\.(jpg|png|webp)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+UPLOAD_VARIANT_MAX_AGE = int(os.getenv('UPLOAD_VARIANT_MAX_AGE', 86400))
+
+COMPRESSIBLE = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon',
+}
+MIN_COMPRESS_SIZE = 1024
+CACHE_DIR = os.getenv('STATIC_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'reparetout-static'))
+
+
+class StaticFile:
+    __slots__ = ('path', 'size', 'mtime', 'etag', 'mimetype', 'immutable', 'encodings')
+
+    def __init__(self, path, size, mtime, etag, mimetype, immutable):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.mimetype = mimetype
+        self.immutable = immutable
+        self.encodings = {}  # 'br' / 'gzip' -> chemin du fichier précompressé
+
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _precompress(entry, cache_dir):
+    """Variantes gzip / brotli écrites une fois (clé = empreinte du contenu)"""
+    with open(entry.path, 'rb') as f:
+        raw = None
+        for encoding, extension in (('br', 'br'), ('gzip', 'gz')):
+            if encoding == 'br' and brotli is None:
+                continue
+            # Variante fournie par le build (index.js.br / index.js.gz)
+            shipped = f'{entry.path}.{extension}'
+            if os.path.exists(shipped):
+                entry.encodings[encoding] = shipped
+                continue
+            target = os.path.join(cache_dir, f'{entry.etag}.{extension}')
+            if not os.path.exists(target):
+                if raw is None:
+                    raw = f.read()
+                data = brotli.compress(raw, quality=11) if encoding == 'br' else gzip.compress(raw, 9, mtime=0)
+                if len(data) >= len(raw):
+                    continue
+                tmp = f'{target}.{os.getpid()}.tmp'
+                with open(tmp, 'wb') as out:
+                    out.write(data)
+                os.replace(tmp, target)
+            entry.encodings[encoding] = target
+
+
+class StaticIndex:
+    """
+    Index en mémoire de l'arborescence statique, construit au démarrage :
+    type, taille, ETag (empreinte du contenu) et variantes précompressées.
+    Plus de os.path.exists par requête.
+    """
+
+    def __init__(self, root, exclude=('uploads',), cache_dir=CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.files = {}
+        if not os.path.isdir(self.root):
+            return
+        self.build_files = self._read_manifest()
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            cache_dir = None
+        for directory, dirnames, filenames in os.walk(self.root):
+            relative_dir = os.path.relpath(directory, self.root)
+            if relative_dir == '.':
+                dirnames[:] = [d for d in dirnames if d not in exclude]
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                self.files[key] = entry = self._entry(path, filename, self._immutable(key))
+                if cache_dir and entry.mimetype in COMPRESSIBLE and entry.size >= MIN_COMPRESS_SIZE:
+                    try:
+                        _precompress(entry, cache_dir)
+                    except OSError:
+                        pass
+
+    def _read_manifest(self):
+        """Fichiers produits par le build Vite (build.manifest), ou None sans manifeste"""
+        for name in VITE_MANIFESTS:
+            try:
+                with open(os.path.join(self.root, name), encoding='utf-8') as f:
+                    chunks = json.load(f).values()
+            except (OSError, ValueError, AttributeError):
+                continue
+            files = set()
+            for chunk in chunks:
+                if isinstance(chunk, dict):
+                    files.add(chunk.get('file'))
+                    files.update(chunk.get('css', ()))
+                    files.update(chunk.get('assets', ()))
+            # Les points d'entrée HTML (index.html) gardent un nom fixe
+            return {f for f in files if isinstance(f, str) and not f.endswith('.html')}
+        return None
+
+    def _immutable(self, key):
+        if self.build_files is not None:
+            return key in self.build_files
+        return bool(VITE_ASSET.match(key))
+
+    @staticmethod
+    def _entry(path, filename, immutable):
+        stat = os.stat(path)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return StaticFile(path, stat.st_size, stat.st_mtime, _digest(path), mimetype, immutable)
+
+    def get(self, path):
+        return self.files.get(path)
+
+
+def _negotiate(entry):
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in entry.encodings and accepted[encoding]:
+            return encoding
+    return None
+
+
+def send_static(entry):
+    """
+    Envoi d'un fichier indexé : variante compressée selon Accept-Encoding,
+    ETag / If-None-Match, Range, et sendfile (wsgi.file_wrapper) via send_file.
+    """
+    encoding = _negotiate(entry)
+    path = entry.encodings[encoding] if encoding else entry.path
+    response = send_file(
+        path, mimetype=entry.mimetype, conditional=True,
+        etag=f'{entry.etag}-{encoding}' if encoding else entry.etag,
+        last_modified=entry.mtime, max_age=None,
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry.encodings:
+        response.vary.add('Accept-Encoding')
+    if entry.immutable:
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def send_upload(directory, filename):
+    """
+    Photo uploadée, sans compression : original (nom = SHA-256 du contenu)
+    immuable, miniature en cache UPLOAD_VARIANT_MAX_AGE secondes puis revalidée.
+    """
+    path = os.path.abspath(os.path.join(directory, filename))
+    if not path.startswith(os.path.abspath(directory) + os.sep) or not os.path.isfile(path):
+        return None
+    response = send_file(path, conditional=True, max_age=None)
+    if UPLOAD_ORIGINAL.match(filename):
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = UPLOAD_VARIANT_MAX_AGE
+    return response
@@ -0,0 +1,254 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, event, func, inspect, literal, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.user import db, User, RepairRequest, Quote, StatCounter, REQUEST_STATUSES
+
+USER_ROLES = ['client', 'repairer', 'admin']
+RECENT_DAYS = 7
+CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 30))
+# Lignes par compteur : les transactions concurrentes qui créent des demandes
+# incrémentent des lignes différentes au lieu d'attendre toutes le verrou de
+# la même ligne « requests » (PostgreSQL). La lecture fait la somme.
+COUNTER_SHARDS = int(os.getenv('STATS_COUNTER_SHARDS', 8))
+
+_cache_lock = threading.Lock()
+_cache = {'expires': 0.0, 'payload': None}
+
+# Compteurs par modèle : (préfixe, colonne ventilée)
+_TRACKED = {
+    User: ('users', 'role'),
+    RepairRequest: ('requests', 'status'),
+    Quote: ('quotes', None),
+}
+_TRACKED_BY_TABLE = {prefix: column for prefix, column in _TRACKED.values()}
+
+
+# ---------------------------------------------------------------------------
+# Calcul complet (une requête groupée) et reconstruction des compteurs
+# ---------------------------------------------------------------------------
+
+def compute_aggregates(since=None):
+    """
+    Tous les agrégats du tableau de bord en une seule requête (UNION ALL de
+    trois GROUP BY) : {(table, clé): (total, récents)}.
+    """
+    since = since or datetime.utcnow() - timedelta(days=RECENT_DAYS)
+
+    def grouped(model, table, column):
+        key = column if column is not None else literal('')
+        recent = func.sum(case((model.created_at >= since, 1), else_=0))
+        query = db.select(literal(table).label('tbl'), key.label('key'), func.count(), recent)
+        if column is not None:
+            query = query.group_by(column)
+        return query.select_from(model)
+
+    statement = union_all(
+        grouped(User, 'users', User.role),
+        grouped(RepairRequest, 'requests', RepairRequest.status),
+        grouped(Quote, 'quotes', None),
+    )
+    return {
+        (table, key or ''): (total or 0, recent or 0)
+        for table, key, total, recent in db.session.execute(statement)
+    }
+
+
+def _lock_counters():
+    """
+    Verrou d'écriture pris avant de compter : une insertion concurrente est
+    soit déjà commitée (comptée par l'agrégat), soit bloquée jusqu'au commit
+    de la reconstruction (son incrément s'ajoute ensuite).
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(f'LOCK TABLE {StatCounter.__tablename__} IN EXCLUSIVE MODE')
+    elif connection.dialect.name == 'sqlite' and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def rebuild_counters():
+    """Recalcule les compteurs depuis les tables (forçage / premier démarrage)"""
+    _lock_counters()
+    aggregates = compute_aggregates()
+    values = {}
+    for (table, key), (total, _recent) in aggregates.items():
+        values[table] = values.get(table, 0) + total
+        if key:
+            column = _TRACKED_BY_TABLE[table]
+            values[f'{table}.{column}.{key}'] = total
+    for status in REQUEST_STATUSES:
+        values.setdefault(f'requests.status.{status}', 0)
+    for role in USER_ROLES:
+        values.setdefault(f'users.role.{role}', 0)
+    for table in _TRACKED_BY_TABLE:
+        values.setdefault(table, 0)
+
+    db.session.execute(db.delete(StatCounter))
+    db.session.execute(db.insert(StatCounter), [{'name': k, 'shard': 0, 'value': v} for k, v in values.items()])
+    db.session.commit()
+    invalidate()
+    return values
+
+
+def ensure_counters():
+    """Au démarrage : construit les compteurs s'ils n'existent pas encore"""
+    if db.session.query(StatCounter.name).first() is None:
+        rebuild_counters()
+
+
+# ---------------------------------------------------------------------------
+# Lecture O(1) pour le tableau de bord (avec cache TTL par process)
+# ---------------------------------------------------------------------------
+
+def read_counters():
+    """{nom: valeur} : somme des lignes de chaque compteur"""
+    return dict(
+        db.session.query(StatCounter.name, func.sum(StatCounter.value)).group_by(StatCounter.name).all()
+    )
+
+
+def invalidate():
+    with _cache_lock:
+        _cache['payload'] = None
+        _cache['expires'] = 0.0
+
+
+def _recent_counts(since):
+    # Trois comptages par intervalle sur les index (created_at, id), en une requête
+    def recent(model):
+        return (
+            db.select(func.count()).select_from(model)
+            .where(model.created_at >= since).scalar_subquery()
+        )
+    return db.session.execute(
+        db.select(recent(User), recent(RepairRequest), recent(Quote))
+    ).one()
+
+
+def dashboard_stats(force=False):
+    """Statistiques du tableau de bord ; `force` reconstruit les compteurs"""
+    now = time.monotonic()
+    if not force:
+        with _cache_lock:
+            if _cache['payload'] is not None and _cache['expires'] > now:
+                return _cache['payload']
+
+    if force:
+        counters = rebuild_counters()
+    else:
+        counters = read_counters()
+
+    since = datetime.utcnow() - timedelta(days=RECENT_DAYS)
+    new_users, new_requests, new_quotes = _recent_counts(since)
+
+    payload = {
+        'total_users': counters.get('users', 0),
+        'total_requests': counters.get('requests', 0),
+        'total_quotes': counters.get('quotes', 0),
+        'requests_by_status': {s: counters.get(f'requests.status.{s}', 0) for s in REQUEST_STATUSES},
+        'users_by_role': {r: counters.get(f'users.role.{r}', 0) for r in USER_ROLES},
+        'recent_activity': {
+            'new_users': new_users,
+            'new_requests': new_requests,
+            'new_quotes': new_quotes
+        }
+    }
+    with _cache_lock:
+        _cache['payload'] = payload
+        _cache['expires'] = time.monotonic() + CACHE_TTL
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# Mise à jour incrémentale : événements ORM, dans la même transaction
+# ---------------------------------------------------------------------------
+
+_UPSERT = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _bump(connection, name, delta):
+    """Ajoute `delta` à une ligne tirée au hasard parmi les COUNTER_SHARDS du compteur"""
+    table = StatCounter.__table__
+    shard = random.randrange(COUNTER_SHARDS)
+    insert = _UPSERT.get(connection.dialect.name)
+    if insert is not None:
+        statement = insert(table).values(name=name, shard=shard, value=delta)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.name, table.c.shard], set_={'value': table.c.value + delta}
+        ))
+        return
+    result = connection.execute(
+        table.update().where(table.c.name == name, table.c.shard == shard).values(value=table.c.value + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, shard=shard, value=delta))
+
+
+def _on_insert(mapper, connection, target):
+    prefix, column = _TRACKED[mapper.class_]
+    _bump(connection, prefix, 1)
+    if column and getattr(target, column) is not None:
+        _bump(connection, f'{prefix}.{column}.{getattr(target, column)}', 1)
+    invalidate()
+
+
+def _on_delete(mapper, connection, target):
+    prefix, column = _TRACKED[mapper.class_]
+    _bump(connection, prefix, -1)
+    if column and getattr(target, column) is not None:
+        _bump(connection, f'{prefix}.{column}.{getattr(target, column)}', -1)
+    invalidate()
+
+
+def _on_update(mapper, connection, target):
+    prefix, column = _TRACKED[mapper.class_]
+    if not column:
+        return
+    history = inspect(target).attrs[column].history
+    if not history.has_changes():
+        return
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    if old == new:
+        return
+    if old is not None:
+        _bump(connection, f'{prefix}.{column}.{old}', -1)
+    if new is not None:
+        _bump(connection, f'{prefix}.{column}.{new}', 1)
+    invalidate()
+
+
+def record_bulk_change(model, old, new, count=1):
+    """
+    UPDATE en masse (db.update, sans événements ORM) : `count` lignes passées
+    de `old` à `new` sur la colonne ventilée du modèle, dans la même transaction
+    """
+    prefix, column = _TRACKED[model]
+    if not column or not count or old == new:
+        return
+    connection = db.session.connection()
+    if old is not None:
+        _bump(connection, f'{prefix}.{column}.{old}', -count)
+    if new is not None:
+        _bump(connection, f'{prefix}.{column}.{new}', count)
+    invalidate()
+
+
+def _load_previous(target, value, oldvalue, initiator):
+    return value
+
+
+for _model, (_prefix, _column) in _TRACKED.items():
+    event.listen(_model, 'after_insert', _on_insert)
+    event.listen(_model, 'after_delete', _on_delete)
+    event.listen(_model, 'after_update', _on_update)
+    if _column:
+        # Ancienne valeur chargée même sur un objet expiré (après commit) :
+        # sans elle, _on_update ne saurait pas quel compteur décrémenter
+        event.listen(getattr(_model, _column), 'set', _load_previous, active_history=True, retval=True)
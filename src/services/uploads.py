@@ -0,0 +1,110 @@
+import hashlib
+import os
+import tempfile
+
+from src.services.image_metadata import InvalidImage, strip_metadata
+
+MAX_BYTES = 3 * 1024 * 1024  # ~3 Mo par photo
+MAX_FILES = 4
+CHUNK_SIZE = 64 * 1024
+
+# Plafond global d'une requête (toutes photos + champs du formulaire) :
+# Werkzeug coupe la lecture du corps dès qu'il est dépassé (413)
+MAX_CONTENT_LENGTH = MAX_FILES * MAX_BYTES + 512 * 1024
+
+
+class UploadError(Exception):
+    status_code = 400
+    message = "Fichier invalide"
+
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+    message = "Image trop volumineuse (> 3 Mo)"
+
+
+class UnsupportedImage(UploadError):
+    status_code = 415
+    message = "Format image non supporté (jpg, jpeg, png, webp)"
+
+
+def sniff_image_type(header):
+    """Type réel d'après les premiers octets (on ignore l'extension annoncée)"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if len(header) >= 12 and header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class StoredUpload:
+    def __init__(self, filename, path, sha256, size, created):
+        self.filename = filename
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.created = created  # False : contenu déjà présent (même photo renvoyée)
+
+
+def receive_upload(file, upload_dir, max_bytes=MAX_BYTES):
+    """
+    Copie un fichier uploadé par morceaux vers le stockage adressé par contenu.
+
+    La taille est vérifiée au fil de l'eau (abandon dès `max_bytes` dépassé)
+    et le type validé sur les octets magiques. Les métadonnées (EXIF, GPS...)
+    sont retirées avant le calcul du SHA-256 : le fichier final s'appelle
+    <sha256>.<ext>, son contenu ne change plus ensuite, et une photo
+    identique (réessai après un échec réseau...) n'est stockée qu'une fois.
+    """
+    stream = file.stream if hasattr(file, 'stream') else file
+    size = 0
+    header = b''
+    ext = None
+
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'w+b') as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                if ext is None:
+                    header += chunk[:16 - len(header)]
+                    if len(header) >= 12:
+                        ext = sniff_image_type(header)
+                        if ext is None:
+                            raise UnsupportedImage()
+                tmp.write(chunk)
+
+            if ext is None:
+                ext = sniff_image_type(header)
+                if ext is None:
+                    raise UnsupportedImage()
+
+            # Au plus MAX_BYTES en mémoire
+            tmp.seek(0)
+            try:
+                content = strip_metadata(tmp.read(), ext)
+            except InvalidImage:
+                raise UploadError()
+            tmp.seek(0)
+            tmp.truncate()
+            tmp.write(content)
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        filename = f'{sha256}.{ext}'
+        path = os.path.join(upload_dir, filename)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return StoredUpload(filename, path, sha256, len(content), created=False)
+        os.replace(tmp_path, path)
+        return StoredUpload(filename, path, sha256, len(content), created=True)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cache de réponses coupé : chaque appel doit faire son vrai travail SQL
+os.environ.setdefault('RESPONSE_CACHE_TTL', '0')
+
+from bench.app import create_app  # noqa: E402
+from bench.seed import seed  # noqa: E402
+from src.models.user import db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def make_app(tmp_path_factory):
+    """Fabrique d'apps de test : base SQLite jetable remplie par bench.seed"""
+    def factory(**volumes):
+        app = create_app(str(tmp_path_factory.mktemp('app')))
+        with app.app_context():
+            ids = seed(**volumes)
+        return app, ids
+    return factory
+
+
+def login(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+def count_queries(app, client, url):
+    """(réponse, nombre d'instructions SQL exécutées pendant l'appel)"""
+    queries = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: queries.append(args[2])  # noqa: E731
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return response, len(queries)
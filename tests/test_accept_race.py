@@ -0,0 +1,36 @@
+from collections import Counter
+
+import pytest
+
+from bench.race import _new_request, check_counters, run_round
+from src.models.user import db, RepairRequest, Quote
+
+ROUNDS = 4
+ACCEPTORS = 6
+
+
+@pytest.fixture(scope='module')
+def race_app(make_app):
+    return make_app(users=20, requests=5, quotes=0, images=0)
+
+
+@pytest.mark.parametrize('same_quote', [False, True], ids=['devis-differents', 'meme-devis'])
+def test_concurrent_accepts(race_app, same_quote):
+    app, ids = race_app
+    client_id = ids['clients'][0]
+    for _ in range(ROUNDS):
+        with app.app_context():
+            request_id, quote_ids = _new_request(client_id, ids['repairers'], ACCEPTORS)
+
+        statuses = run_round(app, client_id, quote_ids, same_quote)
+
+        assert Counter(statuses) == {200: 1, 409: ACCEPTORS - 1}
+        with app.app_context():
+            repair_request = db.session.get(RepairRequest, request_id)
+            assert (repair_request.status, repair_request.version) == ('accepted', 2)
+            quotes = dict(db.session.query(Quote.id, Quote.status).filter_by(repair_request_id=request_id).all())
+            assert Counter(quotes.values()) == {'accepted': 1, 'rejected': ACCEPTORS - 1}
+            assert quotes[repair_request.accepted_quote_id] == 'accepted'
+
+    with app.app_context():
+        assert check_counters() == []
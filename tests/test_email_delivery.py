@@ -0,0 +1,176 @@
+import socket
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from bench.app import create_app  # noqa: E402
+from src.models.user import db, EmailOutbox  # noqa: E402
+from src.services.email_service import EmailService  # noqa: E402
+from src.services.email_worker import OutboxWorker, MAX_ATTEMPTS, backoff  # noqa: E402
+from src.services.instrumentation import render_metrics  # noqa: E402
+
+
+class Mailbox:
+    """Serveur SMTP de test : refuse (451) les `flaky` premiers essais par destinataire"""
+
+    def __init__(self):
+        self.received = []
+        self.flaky = {}
+        self.disconnect_next = False
+        self.attempts = Counter()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        self.attempts[address] += 1
+        if self.attempts[address] <= self.flaky.get(address, 0):
+            return '451 Réessayez plus tard'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.disconnect_next:
+            self.disconnect_next = False
+            return '421 Service indisponible'
+        self.received.extend(envelope.rcpt_tos)
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def mailbox():
+    mailbox = Mailbox()
+    controller = Controller(mailbox, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    yield mailbox, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def worker(tmp_path, mailbox):
+    _, port = mailbox
+    app = create_app(str(tmp_path))
+    service = EmailService()
+    service.smtp_server, service.smtp_port = '127.0.0.1', port
+    service.smtp_starttls, service.admin_password = False, ''
+    with app.app_context():
+        yield OutboxWorker(app, service=service)
+    service.transport.close()
+
+
+def _enqueue(worker, *addresses):
+    for address in addresses:
+        worker.service._enqueue([worker.service._message(address, 'Sujet', 'Corps')])
+
+
+def _row(address):
+    db.session.expire_all()
+    return EmailOutbox.query.filter_by(to_email=address).one()
+
+
+def _due_now(address):
+    """Avance l'horloge : la prochaine tentative est due"""
+    db.session.execute(
+        db.update(EmailOutbox).where(EmailOutbox.to_email == address)
+        .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.session.commit()
+
+
+def test_batch_sent_over_one_connection(worker, mailbox):
+    box, _ = mailbox
+    addresses = [f'client{i}@example.com' for i in range(5)]
+    _enqueue(worker, *addresses)
+
+    assert worker.drain() == 5
+    assert sorted(box.received) == addresses
+    assert all(_row(address).status == 'sent' for address in addresses)
+    assert worker.service.transport.totals['connections'] == 1
+
+
+def test_temporary_failure_is_retried_after_backoff(worker, mailbox):
+    box, _ = mailbox
+    box.flaky['flaky@example.com'] = 2
+    _enqueue(worker, 'flaky@example.com', 'ok@example.com')
+
+    before = datetime.utcnow()
+    assert worker.drain() == 2
+    row = _row('flaky@example.com')
+    assert (row.status, row.attempts) == ('pending', 1)
+    assert '451' in row.last_error
+    assert row.next_attempt_at >= before + backoff(1)
+    assert _row('ok@example.com').status == 'sent'
+
+    # Pas de nouvelle tentative avant l'échéance
+    assert worker.drain() == 0
+
+    _due_now('flaky@example.com')
+    assert worker.drain() == 1
+    row = _row('flaky@example.com')
+    assert (row.status, row.attempts) == ('pending', 2)
+    assert row.next_attempt_at >= datetime.utcnow() + backoff(2) - timedelta(seconds=5)
+
+    _due_now('flaky@example.com')
+    assert worker.drain() == 1
+    row = _row('flaky@example.com')
+    assert (row.status, row.attempts, row.last_error) == ('sent', 3, None)
+    assert box.received.count('flaky@example.com') == 1
+
+
+def test_gives_up_after_max_attempts(worker, mailbox):
+    box, _ = mailbox
+    box.flaky['bounce@example.com'] = MAX_ATTEMPTS
+    _enqueue(worker, 'bounce@example.com')
+
+    for _ in range(MAX_ATTEMPTS):
+        _due_now('bounce@example.com')
+        assert worker.drain() == 1
+    row = _row('bounce@example.com')
+    assert (row.status, row.attempts) == ('failed', MAX_ATTEMPTS)
+    _due_now('bounce@example.com')
+    assert worker.drain() == 0
+
+
+def test_reconnects_after_421(worker, mailbox):
+    box, _ = mailbox
+    _enqueue(worker, 'a@example.com')
+    assert worker.drain() == 1
+
+    box.disconnect_next = True
+    _enqueue(worker, 'b@example.com', 'c@example.com')
+    assert worker.drain() == 2
+    assert sorted(box.received) == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert worker.service.transport.totals['reconnects'] == 1
+
+
+def _metric(name):
+    for line in render_metrics().splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_batch_stats_logged_and_exposed(worker, mailbox, caplog):
+    box, _ = mailbox
+    box.flaky['later@example.com'] = 1
+    sent, failed = _metric('smtp_messages_total{result="sent"}'), _metric('smtp_messages_total{result="failed"}')
+    _enqueue(worker, 'now@example.com', 'later@example.com')
+
+    with caplog.at_level('DEBUG', logger=worker.app.logger.name):
+        worker.drain()
+    assert any('Lot SMTP' in record.getMessage() and "'sent': 1" in record.getMessage() for record in caplog.records)
+    assert _metric('smtp_messages_total{result="sent"}') == sent + 1
+    assert _metric('smtp_messages_total{result="failed"}') == failed + 1
+    assert _metric('smtp_batch_duration_seconds_count') >= 1
+
+
+def test_backoff_schedule():
+    assert [backoff(n) for n in (1, 2, 3)] == [timedelta(seconds=30), timedelta(minutes=1), timedelta(minutes=2)]
+    assert backoff(20) == timedelta(hours=1)
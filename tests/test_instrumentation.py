@@ -0,0 +1,32 @@
+import pytest
+
+from bench.app import create_app
+from bench.seed import seed
+from src.services import instrumentation
+from tests.conftest import login
+
+
+@pytest.fixture(scope='module')
+def instrumented(tmp_path_factory):
+    app = create_app(str(tmp_path_factory.mktemp('metrics')), {'INSTRUMENTATION': 'on'})
+    with app.app_context():
+        ids = seed(users=4, requests=2, quotes=0, images=0)
+    return app, ids
+
+
+def test_metrics_need_admin_without_token(instrumented, monkeypatch):
+    app, ids = instrumented
+    monkeypatch.setattr(instrumentation, 'METRICS_TOKEN', None)
+    assert app.test_client().get('/api/metrics').status_code == 401
+    assert login(app, ids['clients'][0]).get('/api/metrics').status_code == 403
+    response = login(app, ids['admin']).get('/api/metrics')
+    assert response.status_code == 200 and b'http_request_duration_seconds' in response.data
+
+
+def test_metrics_token(instrumented, monkeypatch):
+    app, ids = instrumented
+    monkeypatch.setattr(instrumentation, 'METRICS_TOKEN', 's3cret')
+    client = app.test_client()
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer autre'}).status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
@@ -0,0 +1,121 @@
+import os
+import shutil
+import threading
+
+from sqlalchemy import create_engine, event, inspect, select
+
+from src.models.user import db
+from src.services.migrations import MIGRATIONS, schema_migrations, upgrade, _initial
+from src.services.sqlite_tuning import configure_sqlite
+from tests.conftest import login
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'database', 'app.db')
+
+
+def _engine(path):
+    engine = create_engine(f'sqlite:///{path}')
+    configure_sqlite(engine)
+    return engine
+
+
+def _assert_matches_models(engine):
+    inspector = inspect(engine)
+    for table in db.metadata.tables.values():
+        columns = {c['name'] for c in inspector.get_columns(table.name)}
+        assert columns == {c.name for c in table.columns}, table.name
+        indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+        assert {i.name for i in table.indexes} <= indexes, table.name
+
+
+def _versions(engine):
+    with engine.connect() as connection:
+        return list(connection.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version)).scalars())
+
+
+def test_fresh_database_reaches_model_schema(tmp_path):
+    engine = _engine(tmp_path / 'app.db')
+    assert upgrade(engine) == [version for version, _, _ in MIGRATIONS]
+    _assert_matches_models(engine)
+    assert upgrade(engine) == []
+
+
+def test_initial_migration_is_frozen(tmp_path):
+    # Migration 1 = schéma de départ, pas les modèles du moment
+    engine = _engine(tmp_path / 'app.db')
+    with engine.begin() as connection:
+        _initial(connection)
+    inspector = inspect(engine)
+    assert 'version' not in {c['name'] for c in inspector.get_columns('repair_request')}
+    assert 'user_event' not in inspector.get_table_names()
+
+
+def test_upgrades_the_original_database(tmp_path):
+    # Copie de la base livrée (schéma d'origine, sans schema_migrations)
+    path = tmp_path / 'app.db'
+    shutil.copy(BASELINE_DB, path)
+    engine = _engine(path)
+    upgrade(engine)
+    _assert_matches_models(engine)
+
+
+def test_concurrent_upgrades_apply_each_migration_once(tmp_path):
+    path = tmp_path / 'app.db'
+    results, errors = [], []
+    barrier = threading.Barrier(4)
+
+    def boot():
+        engine = _engine(path)
+        barrier.wait()
+        try:
+            results.append(upgrade(engine))
+        except Exception as e:  # pragma: no cover - remonté par l'assertion
+            errors.append(e)
+
+    threads = [threading.Thread(target=boot) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(v for applied in results for v in applied) == [version for version, _, _ in MIGRATIONS]
+    assert _versions(_engine(path)) == [version for version, _, _ in MIGRATIONS]
+
+
+# Formes de requêtes des listes : recherche par index, jamais de tri en mémoire
+QUERY_SHAPES = [
+    (None, '/api/repairs/requests'),
+    (None, '/api/repairs/requests?category=bike'),
+    (None, '/api/repairs/requests?status=quoted&category=bike'),
+    ('client', '/api/repairs/my-requests'),
+    ('repairer', '/api/repairs/my-quotes'),
+    ('admin', '/api/admin/users'),
+    ('admin', '/api/admin/users?role=client'),
+    ('admin', '/api/admin/requests?status=open'),
+    ('admin', '/api/admin/quotes?status=pending'),
+]
+
+
+def test_list_queries_use_indexes(make_app):
+    app, ids = make_app(users=40, requests=400, quotes=2, images=1)
+    users = {'admin': ids['admin'], 'client': ids['clients'][0], 'repairer': ids['repairers'][0]}
+    with app.app_context():
+        engine = db.engine
+
+    for who, url in QUERY_SHAPES:
+        client = login(app, users[who]) if who else app.test_client()
+        client.get(url)  # identité mise en cache
+        statements = []
+        listener = lambda conn, cursor, statement, params, context, many: statements.append((statement, params))  # noqa: E731
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            assert client.get(url).status_code == 200
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+        with engine.connect() as connection:
+            for statement, params in statements:
+                plan = [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, params)]
+                for step in plan:
+                    assert 'TEMP B-TREE' not in step, (url, plan)
+                    assert not step.startswith('SCAN') or 'USING' in step, (url, plan)
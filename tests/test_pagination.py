@@ -0,0 +1,48 @@
+from sqlalchemy.dialects import postgresql
+
+from src.models.user import db, RepairRequest
+from src.services.pagination import keyset_page
+
+
+def test_pages_through_rows_without_date(make_app):
+    app, _ids = make_app(users=10, requests=40, quotes=0, images=0)
+    with app.app_context():
+        all_ids = [r for (r,) in db.session.query(RepairRequest.id)]
+        # Un tiers des demandes sans date, réparties dans la table
+        db.session.execute(
+            db.update(RepairRequest).where(RepairRequest.id.in_(all_ids[::3])).values(created_at=None)
+        )
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(RepairRequest.query, RepairRequest, cursor, limit=7)
+            seen.extend(rows)
+            if cursor is None:
+                break
+
+        assert sorted(r.id for r in seen) == sorted(all_ids)
+        dated = [r for r in seen if r.created_at is not None]
+        assert seen[:len(dated)] == dated  # lignes sans date en fin de liste
+        assert [r.id for r in seen[len(dated):]] == sorted(all_ids[::3], reverse=True)
+
+
+def test_nulls_last_on_postgresql(make_app):
+    app, _ids = make_app(users=4, requests=1, quotes=0, images=0)
+    captured = []
+
+    class Query:
+        def order_by(self, *clauses):
+            captured.extend(clauses)
+            return self
+
+        def limit(self, _limit):
+            return self
+
+        def all(self):
+            return []
+
+    with app.app_context():
+        keyset_page(Query(), RepairRequest)
+    sql = ', '.join(str(c.compile(dialect=postgresql.dialect())) for c in captured)
+    assert sql == 'repair_request.created_at DESC NULLS LAST, repair_request.id DESC'
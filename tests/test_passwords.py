@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from src.services import passwords
+from src.services.passwords import HashingBusy, canonical_method, needs_rehash
+
+
+@pytest.mark.parametrize('method, stored', [
+    ('scrypt', 'scrypt:32768:8:1'),
+    ('scrypt:32768:8:1', 'scrypt:32768:8:1'),
+    ('pbkdf2', 'pbkdf2:sha256:1000000'),
+    ('pbkdf2:sha512', 'pbkdf2:sha512:1000000'),
+    ('pbkdf2:sha256:1000', 'pbkdf2:sha256:1000'),
+])
+def test_method_as_stored_by_werkzeug(method, stored):
+    assert canonical_method(method) == stored
+    password_hash = generate_password_hash('secret', method=method)
+    assert password_hash.split('$', 1)[0] == stored
+    assert not needs_rehash(password_hash, method)
+
+
+def test_other_parameters_need_rehash():
+    old = generate_password_hash('secret', method='pbkdf2:sha256:1000')
+    assert needs_rehash(old, 'scrypt')
+    assert needs_rehash(old, 'pbkdf2')
+    assert not needs_rehash(generate_password_hash('secret', method='scrypt'), 'scrypt:32768:8:1')
+
+
+def test_timed_out_job_keeps_its_slot(monkeypatch):
+    # Une seule place : tant que le calcul abandonné tourne, la suivante est refusée
+    monkeypatch.setattr(passwords, '_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(passwords, 'TIMEOUT', 0.05)
+    try:
+        passwords._get_executor().submit(time.sleep, 0).result()  # process démarrés
+
+        with pytest.raises(HashingBusy):
+            passwords._run(time.sleep, 0.5)
+        with pytest.raises(HashingBusy):
+            passwords._run(time.sleep, 0)
+
+        time.sleep(0.8)
+        monkeypatch.setattr(passwords, 'TIMEOUT', 5)
+        assert passwords._run(time.sleep, 0) is None
+        assert passwords._slots.acquire(blocking=False)
+        passwords._slots.release()
+    finally:
+        passwords.shutdown()
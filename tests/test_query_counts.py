@@ -0,0 +1,71 @@
+import pytest
+
+from tests.conftest import count_queries, login
+
+# Listes paginées : le nombre de requêtes SQL ne dépend ni du volume de la
+# base ni de la taille de la page (pas de N+1 dans la sérialisation)
+SIZES = [
+    {'users': 20, 'requests': 60, 'quotes': 1, 'images': 1},
+    {'users': 60, 'requests': 600, 'quotes': 3, 'images': 2},
+]
+
+ENDPOINTS = [
+    ('anonymous', '/api/repairs/requests', 'requests'),
+    ('client', '/api/repairs/requests/mine', 'items'),
+    ('client', '/api/repairs/my-requests', 'requests'),
+    ('repairer', '/api/repairs/my-quotes', 'quotes'),
+    ('admin', '/api/admin/users', 'users'),
+    ('admin', '/api/admin/requests', 'requests'),
+    ('admin', '/api/admin/quotes', 'quotes'),
+]
+
+
+@pytest.fixture(scope='module')
+def apps(make_app):
+    return [make_app(**size) for size in SIZES]
+
+
+def _client(app, ids, who):
+    if who == 'anonymous':
+        return app.test_client()
+    if who == 'admin':
+        return login(app, ids['admin'])
+    # Le plus gros client / réparateur : assez de lignes pour remplir une page
+    from src.models.user import db, RepairRequest, Quote
+    column = RepairRequest.client_id if who == 'client' else Quote.repairer_id
+    with app.app_context():
+        user_id = db.session.query(column).group_by(column).order_by(db.func.count().desc()).limit(1).scalar()
+    return login(app, user_id)
+
+
+@pytest.mark.parametrize('who, url, key', ENDPOINTS)
+def test_constant_query_count(apps, who, url, key):
+    counts = set()
+    for app, ids in apps:
+        client = _client(app, ids, who)
+        client.get(url)  # identité de l'utilisateur mise en cache au premier appel
+        for limit in (2, 20):
+            response, queries = count_queries(app, client, f'{url}?limit={limit}')
+            assert response.status_code == 200, response.get_data(as_text=True)
+            assert len(response.get_json()[key]) <= limit
+            counts.add(queries)
+    assert len(counts) == 1, f'{url} : {sorted(counts)} requêtes SQL selon le volume'
+
+
+def test_my_requests_pages(apps):
+    app, ids = apps[1]
+    client = _client(app, ids, 'client')
+    seen, cursor = [], None
+    while True:
+        url = '/api/repairs/my-requests?limit=5' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        seen.extend(item['id'] for item in body['requests'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) > 5
+
+
+def test_my_requests_requires_login(apps):
+    app, _ = apps[0]
+    assert app.test_client().get('/api/repairs/my-requests').status_code == 401
@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from bench.seed import PASSWORD
+from src.factory import create_app
+
+
+def _create_app(tmp_path, **config):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'UPLOAD_DIR': str(tmp_path / 'uploads'),
+        'SESSION_COOKIE_SECURE': False,
+        'BACKGROUND_TASKS': False,
+        **config,
+    })
+
+
+@pytest.fixture(params=['cookie', 'sqlite'])
+def app(request, tmp_path):
+    return _create_app(tmp_path, SESSION_STORE=request.param, SESSION_DB_PATH=str(tmp_path / 'sessions.db'))
+
+
+def _login(client):
+    from src.models.user import db, User
+    with client.application.app_context():
+        user = User(username='alice', email='alice@example.com', role='client', city='Lyon')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    response = client.post('/api/auth/login', json={'email': 'alice@example.com', 'password': PASSWORD})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response
+
+
+def test_cookie_sessions_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv('SESSION_STORE', raising=False)
+    app = _create_app(tmp_path)
+    assert type(app.session_interface).__name__ == 'SecureCookieSessionInterface'
+
+
+def test_login_cookie_lasts_session_lifetime(app):
+    client = app.test_client()
+    response = _login(client)
+    cookie = response.headers['Set-Cookie']
+    assert 'Expires=' in cookie
+    expires = client.get_cookie(app.config['SESSION_COOKIE_NAME']).expires.timestamp()
+    lifetime = app.permanent_session_lifetime
+    assert lifetime == timedelta(days=7)
+    assert abs(expires - (time.time() + lifetime.total_seconds())) < 60
+    assert client.get('/api/auth/me').status_code == 200
+
+
+def test_server_record_expires_with_cookie(tmp_path):
+    app = _create_app(tmp_path, SESSION_STORE='sqlite', SESSION_DB_PATH=str(tmp_path / 'sessions.db'))
+    client = app.test_client()
+    _login(client)
+    cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME'])
+    _, expires_at = app.session_interface.store.load(cookie.value)
+    assert abs(expires_at - cookie.expires.timestamp()) < 1
@@ -0,0 +1,45 @@
+import json
+import os
+
+from src.services.static_files import IMMUTABLE, StaticIndex, send_upload
+
+
+def _tree(root, files):
+    for name in files:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x')
+    return StaticIndex(str(root), cache_dir=str(root / '_cache'))
+
+
+def test_vite_hash_pattern(tmp_path):
+    index = _tree(tmp_path, [
+        'assets/index-BdCCvF70.js', 'assets/chair_broken-v5QZbdpv.jpg',
+        'assets/my-settings.js', 'logo-BdCCvF70.svg', 'index.html',
+    ])
+    immutable = {key for key, entry in index.files.items() if entry.immutable}
+    assert immutable == {'assets/index-BdCCvF70.js', 'assets/chair_broken-v5QZbdpv.jpg'}
+
+
+def test_vite_manifest_wins(tmp_path):
+    (tmp_path / '.vite').mkdir()
+    (tmp_path / '.vite' / 'manifest.json').write_text(json.dumps({
+        'index.html': {'file': 'assets/app.js', 'css': ['assets/app.css'], 'assets': ['assets/logo.svg']},
+    }))
+    index = _tree(tmp_path, ['assets/app.js', 'assets/app.css', 'assets/logo.svg', 'assets/index-BdCCvF70.js'])
+    immutable = {key for key, entry in index.files.items() if entry.immutable}
+    assert immutable == {'assets/app.js', 'assets/app.css', 'assets/logo.svg'}
+
+
+def test_only_upload_originals_immutable(make_app, tmp_path):
+    app, _ids = make_app(users=4, requests=1, quotes=0, images=0)
+    sha = 'a' * 64
+    for name in (f'{sha}.jpg', f'{sha}_320.webp', f'{sha}-old.jpg'):
+        (tmp_path / name).write_bytes(b'x')
+
+    with app.test_request_context():
+        assert send_upload(str(tmp_path), f'{sha}.jpg').headers['Cache-Control'] == IMMUTABLE
+        variant = send_upload(str(tmp_path), f'{sha}_320.webp')
+        assert 'immutable' not in variant.headers['Cache-Control'] and variant.cache_control.max_age > 0
+        assert 'immutable' not in send_upload(str(tmp_path), f'{sha}-old.jpg').headers['Cache-Control']
+        assert send_upload(str(tmp_path), os.path.join('..', 'secret.jpg')) is None
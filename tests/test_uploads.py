@@ -0,0 +1,133 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from src.models.user import db, RepairImage  # noqa: E402
+from src.services import image_metadata, image_pipeline  # noqa: E402
+from src.services.image_metadata import strip_metadata  # noqa: E402
+from src.services.uploads import UploadError, receive_upload  # noqa: E402
+from tests.conftest import login  # noqa: E402
+
+GPS_IFD = 0x8825
+
+
+def _photo(fmt='JPEG', orientation=1, size=(64, 32), color=(200, 30, 30)):
+    image = Image.new('RGB', size, color)
+    exif = Image.Exif()
+    exif[0x010F] = 'AppareilSecret'  # Make
+    exif[0x0112] = orientation
+    exif.get_ifd(GPS_IFD).update({1: 'N', 2: (48.0, 51.0, 24.0), 3: 'E', 4: (2.0, 21.0, 7.0)})
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def _receive(tmp_path, data):
+    return receive_upload(io.BytesIO(data), str(tmp_path))
+
+
+@pytest.mark.parametrize('fmt, ext', [('JPEG', 'jpg'), ('PNG', 'png'), ('WEBP', 'webp')])
+def test_metadata_removed_before_hashing(tmp_path, fmt, ext):
+    data = _photo(fmt)
+    assert b'AppareilSecret' in data
+
+    stored = _receive(tmp_path, data)
+    with open(stored.path, 'rb') as f:
+        content = f.read()
+    assert stored.filename == f'{hashlib.sha256(content).hexdigest()}.{ext}'
+    assert b'AppareilSecret' not in content and b'Exif' not in content
+    with Image.open(stored.path) as image:
+        assert image.size == (64, 32)
+        assert not image.getexif()
+
+
+def test_jpeg_scan_data_untouched(tmp_path):
+    data = _photo()
+    stored = _receive(tmp_path, data)
+    with open(stored.path, 'rb') as f:
+        content = f.read()
+    # Métadonnées seulement : les données compressées sont recopiées à l'octet près
+    assert content[content.index(b'\xff\xda'):] == data[data.index(b'\xff\xda'):]
+
+
+def test_orientation_applied(tmp_path):
+    stored = _receive(tmp_path, _photo(orientation=6))
+    with Image.open(stored.path) as image:
+        assert image.size == (32, 64)
+        assert not image.getexif()
+
+
+def test_orientation_kept_alone_without_pillow(monkeypatch):
+    monkeypatch.setattr(image_metadata, 'Image', None)
+    content = strip_metadata(_photo(orientation=6), 'jpg')
+    assert b'AppareilSecret' not in content
+    with Image.open(io.BytesIO(content)) as image:
+        assert dict(image.getexif()) == {0x0112: 6}
+        assert not image.getexif().get_ifd(GPS_IFD)
+
+
+def test_same_photo_stored_once(tmp_path):
+    data = _photo()
+    first, second = _receive(tmp_path, data), _receive(tmp_path, data)
+    assert (first.filename, first.created, second.created) == (second.filename, True, False)
+
+
+def test_truncated_image_rejected(tmp_path):
+    data = _photo()
+    with pytest.raises(UploadError):
+        _receive(tmp_path, data[:data.index(b'\xff\xda') - 3])
+    assert os.listdir(tmp_path) == []
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_pipeline_never_rewrites_original(make_app):
+    app, ids = make_app(users=6, requests=2, quotes=0, images=0)
+    client = login(app, ids['clients'][0])
+    photo = _photo(size=(800, 600))
+    form = {'title': 'Chaise', 'description': 'Pied cassé', 'category': 'furniture', 'city': 'Lyon'}
+
+    responses = [
+        client.post('/api/repairs/requests', data={**form, 'photo': (io.BytesIO(photo), 'chaise.jpg')},
+                    content_type='multipart/form-data')
+        for _ in range(2)
+    ]
+    assert [r.status_code for r in responses] == [201, 201]
+    image_pipeline.shutdown(wait=True)  # traitements en cours terminés
+
+    with app.app_context():
+        images = RepairImage.query.order_by(RepairImage.id.desc()).limit(2).all()
+        assert images[0].filename == images[1].filename
+        path = os.path.join(app.config['UPLOAD_DIR'], images[0].filename)
+        assert images[0].filename == f'{_digest(path)}.jpg'
+        for image in images:
+            db.session.refresh(image)
+            keys = [(v.label, v.format) for v in image.variants]
+            assert keys and len(keys) == len(set(keys))
+            assert (image.width, image.height) == (800, 600)
+
+
+def test_store_result_is_idempotent(make_app, tmp_path):
+    app, ids = make_app(users=6, requests=1, quotes=0, images=1)
+    stored = _receive(tmp_path, _photo(size=(500, 400)))
+    result = image_pipeline.process_image(stored.path)
+    assert _digest(stored.path) == stored.sha256
+
+    class Done:
+        def result(self):
+            return result
+
+    with app.app_context():
+        image_id = RepairImage.query.first().id
+    image_pipeline._store_result(app, image_id, Done())
+    image_pipeline._store_result(app, image_id, Done())
+    with app.app_context():
+        variants = db.session.get(RepairImage, image_id).variants
+        assert len(variants) == len(result['variants'])